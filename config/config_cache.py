@@ -0,0 +1,78 @@
+"""Cache of resolved and validated configurations, for fast job launch.
+
+Composing the configuration with Hydra and validating it against `Config` is done once per set of
+command line overrides: the resolved configuration is saved as json in the cache directory, under
+a key hashing the overrides, the content of the yaml files of the config directory and the fields
+of `Config`. Any change of these invalidates the cached entries.
+"""
+
+import dataclasses
+import hashlib
+import json
+import os
+
+from omegaconf import DictConfig, OmegaConf
+
+from config.config_schema import Config
+
+CONFIG_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_NAME = "defaults"
+# The cache can be moved, e.g. to a directory shared by the jobs of a sweep.
+DEFAULT_CACHE_DIR = os.environ.get(
+    "PROTEIN_DESIGN_CONFIG_CACHE", os.path.join(os.path.dirname(CONFIG_DIR), ".config_cache")
+)
+
+
+def cache_key(overrides: list[str], config_dir: str = CONFIG_DIR) -> str:
+    """Return the key of the cached configuration for the given overrides."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(overrides).encode())
+    for root, dirs, files in os.walk(config_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith(".yaml"):
+                path = os.path.join(root, name)
+                digest.update(os.path.relpath(path, config_dir).encode())
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+    fields = [(f.name, str(f.type), repr(f.default)) for f in dataclasses.fields(Config)]
+    digest.update(repr(fields).encode())
+    return digest.hexdigest()
+
+
+def compose_config(overrides: list[str], config_dir: str = CONFIG_DIR) -> DictConfig:
+    """Compose the configuration with Hydra and validate it against `Config`.
+
+    Raises:
+        omegaconf.errors.ValidationError: If a value has the wrong type.
+        omegaconf.errors.ConfigKeyError: If a key is not a field of `Config`.
+    """
+    from hydra import compose, initialize_config_dir
+
+    with initialize_config_dir(config_dir=config_dir, version_base=None):
+        cfg = compose(config_name=CONFIG_NAME, overrides=overrides)
+    return OmegaConf.merge(OmegaConf.structured(Config), cfg)
+
+
+def load_config(
+    overrides: list[str], cache_dir: str = DEFAULT_CACHE_DIR, config_dir: str = CONFIG_DIR
+) -> DictConfig:
+    """Return the resolved configuration for the overrides, composed only on cache misses.
+
+    The returned configuration is in struct mode, as the one given by `hydra.main`.
+    """
+    path = os.path.join(cache_dir, f"{cache_key(overrides, config_dir)}.json")
+    if os.path.exists(path):
+        with open(path) as f:
+            cfg = OmegaConf.create(json.load(f))
+    else:
+        cfg = compose_config(overrides, config_dir)
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write to a temporary file first, as concurrent jobs may read the same entry.
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(OmegaConf.to_container(cfg, resolve=True), f)
+        os.replace(tmp_path, path)
+        cfg = OmegaConf.create(OmegaConf.to_container(cfg, resolve=True))
+    OmegaConf.set_struct(cfg, True)
+    return cfg
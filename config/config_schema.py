@@ -1,6 +1,9 @@
 """Configuration schemas using dataclasses for type safety."""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from config.logging.logging_schema import LoggingConfig
 
 
 @dataclass
@@ -11,11 +14,46 @@ class Config:
     timesteps: int = 50000
     mode: int = 1  # 1: train, 2: test
     seed: int = 0
+    n_envs: int = 1  # Number of training env workers
+    subproc_envs: bool = False  # Run env workers in subprocesses when n_envs > 1
+    torch_threads: Optional[int] = None  # Torch intra-op threads of the learner
+    torch_interop_threads: Optional[int] = None
+    blas_threads: Optional[int] = None
+    cpu_affinity: str = "none"  # Options: none, split (learner and env workers on disjoint CPUs)
+    cpu_list: Optional[List[int]] = None  # CPUs of the run, disjoint for parallel jobs of a sweep
+    sweep_jobs: Optional[int] = None  # Jobs of a main.py -m sweep running at once
+    thread_autotune: bool = False  # Benchmark thread layouts at startup and keep the fastest
     env_name: str = "Protein-Design-v0"
     variable_motif: bool = False
     variable_length: bool = False
+    held_out_motif_fraction: float = 0.0
+    residue_table: Optional[str] = None  # Residue alphabet yaml file, see config/residues
+    target_motifs: Optional[List[str]] = None  # Fixed target motifs, e.g. ["RI", "DEK"]
+    motif_reward: str = "presence"  # Options: presence, count (reward per occurrence)
+    motif_weights: Optional[List[float]] = None
     manual: bool = False
+    compact_replay_buffer: bool = True  # DQN only: int8 replay buffer
+    features_extractor: str = "mlp"  # Options: mlp, embedding, onehot_fused
+    embedding_dim: int = 16
+    features_dim: int = 128
     model_save_bool: bool = True
-    dir: str = None
+    dir: Optional[str] = None
     test_episodes: int = 2
     take_best_model: bool = False
+    metrics_port: Optional[int] = None  # Serve live metrics in Prometheus format on this port
+    metrics_sample_every: int = 100
+    logging: LoggingConfig = field(default_factory=LoggingConfig)
+    pbt_population_size: int = 4  # Population-based training, see scripts/pbt.py
+    pbt_generation_timesteps: int = 5000
+    pbt_exploit_fraction: float = 0.25
+    pbt_eval_episodes: int = 10
+    pbt_target_reward: Optional[float] = None
+    bc_dataset: Optional[str] = None  # Offline dataset to pretrain on, see learner/offline.py
+    bc_source: str = "solver"  # Actions of built datasets: solver, or path of a saved `algo` model
+    bc_episodes: int = 20000
+    bc_epochs: int = 3
+    bc_batch_size: int = 512
+    bc_learning_rate: float = 1e-3
+    bc_value_coef: float = 0.5
+    bc_target_reward: Optional[float] = None
+    bc_eval_freq: int = 2048
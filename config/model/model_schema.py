@@ -8,4 +8,7 @@ class ModelConfig:
     name: str = "default_model"
     manual: bool = False
     manual_save_bool: bool = True
+    features_extractor: str = "mlp"  # Options: mlp, embedding, onehot_fused
+    embedding_dim: int = 16
+    features_dim: int = 128
     dir: str = None
@@ -0,0 +1,54 @@
+"""Configuration fields of the protein design env and their conversion to env arguments.
+
+The env configuration is the part of a training configuration which changes the episodes of the
+env: models, evaluation results and offline datasets are only comparable for the same one.
+"""
+
+from collections.abc import Mapping, Sequence
+
+from protein_design_env.residues import STANDARD_RESIDUES, load_residue_table
+
+# Configuration fields which change the episodes of the env for a given seed.
+ENV_CONFIG_FIELDS = (
+    "env_name",
+    "variable_motif",
+    "variable_length",
+    "held_out_motif_fraction",
+    "residue_table",
+    "target_motifs",
+    "motif_reward",
+    "motif_weights",
+)
+
+
+def env_config(args) -> dict:
+    """Return the ENV_CONFIG_FIELDS of a configuration, with plain lists so it is json friendly."""
+    config = {}
+    for name in ENV_CONFIG_FIELDS:
+        value = args[name]
+        # Hydra configs hold lists as ListConfig.
+        is_list = isinstance(value, Sequence) and not isinstance(value, str)
+        config[name] = list(value) if is_list else value
+    return config
+
+
+def env_kwargs(config: Mapping) -> dict:
+    """Return the residues and target motifs keyword arguments of the envs of a configuration.
+
+    The residue alphabet is loaded from the "residue_table" yaml file if given, else it is the
+    standard one. The "target_motifs", strings of one-letter codes, replace the single motif if
+    given.
+    """
+    residue_table = config.get("residue_table")
+    residues = load_residue_table(residue_table) if residue_table else None
+    target_motifs = config.get("target_motifs")
+    motifs = None
+    if target_motifs:
+        motifs = [(residues or STANDARD_RESIDUES).encode(motif) for motif in target_motifs]
+    motif_weights = config.get("motif_weights")
+    return {
+        "residues": residues,
+        "motifs": motifs,
+        "motif_reward": config.get("motif_reward") or "presence",
+        "motif_weights": list(motif_weights) if motif_weights else None,
+    }
@@ -0,0 +1,325 @@
+"""On-disk cache of evaluation results, keyed by model weights, env config, seeds and determinism.
+
+An episode of the protein design env is fully determined by the weights of the model, the env
+configuration, the seed given to `env.reset` and, for stochastic actions, the torch seed of the
+action sampling, which is set to the same seed. The cache stores the return and the length of each
+evaluated seed in one compressed `.npz` file per (weights, env config, deterministic) entry, so a
+model is only rolled out on the seeds it was never evaluated on.
+
+The entries are evicted in least recently used order, the access time of an entry being the
+modification time of its file, when the total size of the cache exceeds `max_bytes`.
+"""
+
+import functools
+import hashlib
+import io
+import json
+import os
+import time
+import zipfile
+
+import numpy as np
+import torch
+from numpy._typing import NDArray
+
+from learner.env_config import ENV_CONFIG_FIELDS, env_config  # noqa: F401 - Re-exported
+from learner.export import ALGOS
+from learner.learner import make_protein_env
+from protein_design_env.residues import ResidueTable, load_residue_table
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, "saved-model", "eval_cache")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def state_dict_hash(state_dict: dict[str, torch.Tensor]) -> str:
+    """Return the sha256 of the names, dtypes, shapes and values of the tensors of a state dict."""
+    digest = hashlib.sha256()
+    for name in sorted(state_dict):
+        tensor = state_dict[name].detach().cpu().contiguous()
+        digest.update(f"{name}:{tensor.dtype}:{tuple(tensor.shape)}".encode())
+        digest.update(tensor.numpy().tobytes())
+    return digest.hexdigest()
+
+
+def residue_table_hash(residues: ResidueTable) -> str:
+    """Return the sha256 of the names, codes, pH, charges and properties of a residue table."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([residues.names, residues.codes, residues.ph]).encode())
+    digest.update(residues.charges.tobytes())
+    digest.update(residues.properties.tobytes())
+    return digest.hexdigest()
+
+
+def weights_hash(model) -> str:
+    """Return the hash of the policy weights of an SB3 model."""
+    return state_dict_hash(model.policy.state_dict())
+
+
+def checkpoint_weights_hash(model_path: str) -> str:
+    """Return the hash of the policy weights of a saved SB3 model, without loading the model.
+
+    It is equal to `weights_hash` of the loaded model.
+    """
+    with zipfile.ZipFile(model_path) as archive:
+        policy = archive.read("policy.pth")
+    return state_dict_hash(torch.load(io.BytesIO(policy), map_location="cpu", weights_only=True))
+
+
+def evaluation_seeds(n_episodes: int, seed: int = 0) -> list[int]:
+    """Return the env seeds of `n_episodes` evaluation episodes derived from a root seed.
+
+    The first seeds do not depend on `n_episodes`, so evaluating more episodes only adds seeds.
+    """
+    return [int(s) for s in np.random.SeedSequence(seed).generate_state(n_episodes)]
+
+
+def run_episode(model, env, seed: int, deterministic: bool = True) -> tuple[float, int]:
+    """Play one episode reset with `seed` and return its return and length."""
+    if not deterministic:
+        torch.manual_seed(seed)
+    obs, _ = env.reset(seed=seed)
+    episode_return, length, done = 0.0, 0, False
+    while not done:
+        action, _ = model.predict(obs, deterministic=deterministic)
+        obs, reward, terminated, truncated, _ = env.step(int(action))
+        episode_return += float(reward)
+        length += 1
+        done = terminated or truncated
+    return episode_return, length
+
+
+class EvalCache:
+    """Per-seed evaluation results stored in `cache_dir`.
+
+    Parameters:
+    - cache_dir: Directory of the entries.
+    - max_bytes: Maximum total size of the entries, the least recently used ones are removed when
+      it is exceeded.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(weights: str, env: dict, deterministic: bool) -> str:
+        """Return the key of the entry of a model, env configuration and determinism.
+
+        The residue table file of the env configuration is keyed by the residues it defines, so
+        editing the file changes the key.
+        """
+        residue_table = env.get("residue_table")
+        if residue_table:
+            env = env | {"residue_table": residue_table_hash(load_residue_table(residue_table))}
+        description = json.dumps([weights, env, deterministic], sort_keys=True)
+        return hashlib.sha256(description.encode()).hexdigest()[:32]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def load(self, key: str) -> dict | None:
+        """Return the entry of a key and mark it as used, or None if it is not cached.
+
+        Returns:
+        - The "seeds", "returns" and "lengths" arrays and the "metadata" of the entry.
+        """
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                entry = {name: data[name] for name in ("seeds", "returns", "lengths")}
+                entry["metadata"] = json.loads(str(data["metadata"]))
+            os.utime(path)
+        except (FileNotFoundError, zipfile.BadZipFile, KeyError, ValueError):
+            # Missing, or removed or half written by a concurrent process.
+            return None
+        return entry
+
+    def lookup(self, key: str, seeds: list[int]) -> dict[int, tuple[float, int]]:
+        """Return the cached (return, length) of the seeds evaluated in an entry."""
+        entry = self.load(key)
+        if entry is None:
+            return {}
+        cached = {
+            int(seed): (float(r), int(n))
+            for seed, r, n in zip(entry["seeds"], entry["returns"], entry["lengths"], strict=True)
+        }
+        return {seed: cached[seed] for seed in seeds if seed in cached}
+
+    def store(self, key: str, results: dict[int, tuple[float, int]], metadata: dict) -> None:
+        """Add the (return, length) of new seeds to an entry, then evict entries if needed."""
+        entry = self.load(key)
+        if entry is not None:
+            for seed, r, n in zip(entry["seeds"], entry["returns"], entry["lengths"], strict=True):
+                results.setdefault(int(seed), (float(r), int(n)))
+        seeds = sorted(results)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Write to a temporary file first, as concurrent processes may read the same entry.
+        tmp_path = f"{self._path(key)}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            seeds=np.array(seeds, dtype=np.uint32),
+            returns=np.array([results[seed][0] for seed in seeds], dtype=np.float64),
+            lengths=np.array([results[seed][1] for seed in seeds], dtype=np.int32),
+            metadata=np.array(json.dumps(metadata)),
+        )
+        os.replace(tmp_path, self._path(key))
+        self.evict()
+
+    def entries(self) -> list[dict]:
+        """Return the key, size and last access time of the entries, least recently used first."""
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".npz") or ".tmp" in name:
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                continue
+            key = name[: -len(".npz")]
+            entries.append({"key": key, "size": stat.st_size, "atime": stat.st_mtime})
+        return sorted(entries, key=lambda entry: entry["atime"])
+
+    def evict(self) -> list[str]:
+        """Remove the least recently used entries until the cache fits in `max_bytes`.
+
+        Returns:
+        - The keys of the removed entries.
+        """
+        entries = self.entries()
+        total = sum(entry["size"] for entry in entries)
+        removed = []
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(entry["key"]))
+            except FileNotFoundError:
+                pass
+            total -= entry["size"]
+            removed.append(entry["key"])
+        return removed
+
+
+def evaluate_cached(
+    load_model,
+    make_env,
+    seeds: list[int],
+    env: dict,
+    deterministic: bool = True,
+    cache: EvalCache | None = None,
+    weights: str | None = None,
+    label: str | None = None,
+) -> dict:
+    """Evaluate a model on one episode per seed, rolling out only the seeds missing in the cache.
+
+    Parameters:
+    - load_model: Callable returning the SB3 model, only called if it is needed.
+    - make_env: Callable returning a (non vectorized) env of configuration `env`.
+    - seeds: Env seeds of the episodes.
+    - env: Env configuration of the key, see `env_config`.
+    - deterministic: Whether the actions are deterministic.
+    - cache: Cache of the results, by default in DEFAULT_CACHE_DIR.
+    - weights: Hash of the model weights, computed from the model if not given.
+    - label: Description of the model saved in the metadata of the entry, e.g. its path.
+
+    Returns:
+    - The "returns" and "lengths" of the episodes in the order of the seeds, the number of
+      episodes rolled out ("n_new") and the rollout time in seconds.
+    """
+    cache = cache or EvalCache()
+    model = None
+    if weights is None:
+        model = load_model()
+        weights = weights_hash(model)
+    key = EvalCache.key(weights, env, deterministic)
+    results = cache.lookup(key, seeds)
+    missing = [seed for seed in dict.fromkeys(seeds) if seed not in results]
+    start = time.perf_counter()
+    if missing:
+        model = model or load_model()
+        eval_env = make_env()
+        new_results = {seed: run_episode(model, eval_env, seed, deterministic) for seed in missing}
+        eval_env.close()
+        metadata = {"weights": weights, "env": env, "deterministic": deterministic, "label": label}
+        cache.store(key, dict(new_results), metadata)
+        results |= new_results
+    return {
+        "returns": np.array([results[seed][0] for seed in seeds]),
+        "lengths": np.array([results[seed][1] for seed in seeds]),
+        "n_new": len(missing),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def summarize(returns: NDArray) -> dict[str, float]:
+    """Return the mean, standard deviation and standard error of episode returns."""
+    return {
+        "mean_return": float(np.mean(returns)),
+        "std_return": float(np.std(returns)),
+        "stderr_return": float(np.std(returns) / np.sqrt(len(returns))),
+    }
+
+
+def compare_checkpoints(
+    algo: str,
+    model_paths: list[str],
+    seeds: list[int],
+    env: dict,
+    deterministic: bool = True,
+    cache: EvalCache | None = None,
+) -> list[dict]:
+    """Evaluate saved models on the same seeds, loading only the ones with seeds not cached.
+
+    Parameters:
+    - algo: Algorithm of the saved models.
+    - model_paths: Paths of the saved models.
+    - seeds: Env seeds of the evaluation episodes.
+    - env: Env configuration, see `env_config`.
+    - deterministic: Whether the actions are deterministic.
+    - cache: Cache of the results, by default in DEFAULT_CACHE_DIR.
+
+    Returns:
+    - For each model, its path, weights hash, return statistics, number of episodes rolled out and
+      evaluation time, sorted by decreasing mean return.
+    """
+    cache = cache or EvalCache()
+    make_env = functools.partial(
+        make_protein_env,
+        env["env_name"],
+        env["variable_motif"],
+        env["variable_length"],
+        0,
+        held_out_motif_fraction=env["held_out_motif_fraction"],
+        residue_table=env.get("residue_table"),
+        target_motifs=env.get("target_motifs"),
+        motif_reward=env.get("motif_reward", "presence"),
+        motif_weights=env.get("motif_weights"),
+    )
+    rows = []
+    for model_path in model_paths:
+        start = time.perf_counter()
+        weights = checkpoint_weights_hash(model_path)
+        results = evaluate_cached(
+            functools.partial(ALGOS[algo].load, model_path, device="cpu"),
+            make_env,
+            seeds,
+            env,
+            deterministic,
+            cache,
+            weights=weights,
+            label=os.path.abspath(model_path),
+        )
+        rows.append(
+            {
+                "model": model_path,
+                "weights": weights[:16],
+                **summarize(results["returns"]),
+                "n_episodes": len(seeds),
+                "n_new": results["n_new"],
+                "seconds": time.perf_counter() - start,
+            }
+        )
+    return sorted(rows, key=lambda row: row["mean_return"], reverse=True)
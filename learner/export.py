@@ -0,0 +1,114 @@
+"""Export of the policy network of a saved model to TorchScript, ONNX and NumPy weights.
+
+The exported networks map a batch of float32 observations to the action logits (PPO, A2C) or
+Q-values (DQN): the deterministic action is their argmax, as in `model.predict(obs,
+deterministic=True)`. The NumPy weights are executed by `learner.numpy_policy.NumpyPolicy`, which
+only needs NumPy.
+"""
+
+import copy
+import os
+
+import numpy as np
+import torch
+import torch.nn as nn
+from stable_baselines3 import A2C, DQN, PPO
+from stable_baselines3.common.torch_layers import FlattenExtractor
+
+ALGOS = {"PPO": PPO, "DQN": DQN, "A2C": A2C}
+EXPORT_FORMATS = ("torchscript", "onnx", "numpy")
+EXPORT_FILENAMES = {"torchscript": "policy.pt", "onnx": "policy.onnx", "numpy": "policy.npz"}
+ACTIVATIONS = {nn.Tanh: "tanh", nn.ReLU: "relu"}
+
+
+class PolicyNetwork(nn.Module):
+    """Deterministic part of a SB3 policy: features extractor, hidden layers and output layer."""
+
+    def __init__(self, features_extractor: nn.Module, layers: list[nn.Module]) -> None:
+        super().__init__()
+        self.features_extractor = features_extractor
+        self.layers = nn.Sequential(*layers)
+
+    def forward(self, observations: torch.Tensor) -> torch.Tensor:
+        """Return the action logits or Q-values of a batch of observations."""
+        return self.layers(self.features_extractor(observations.float()))
+
+
+def extract_policy_network(model) -> PolicyNetwork:
+    """Return a copy of the network computing the action logits or Q-values of a SB3 model."""
+    policy = model.policy
+    if isinstance(model, DQN):
+        network = PolicyNetwork(policy.q_net.features_extractor, list(policy.q_net.q_net))
+    else:
+        network = PolicyNetwork(
+            policy.pi_features_extractor,
+            [*policy.mlp_extractor.policy_net, policy.action_net],
+        )
+    return copy.deepcopy(network).to("cpu").eval().requires_grad_(False)
+
+
+def numpy_weights(network: PolicyNetwork) -> dict[str, np.ndarray]:
+    """Return the arrays saved for `NumpyPolicy`: weights, biases and activation of each layer.
+
+    Raises:
+        ValueError: If the network is not an MLP on the flattened observations.
+    """
+    if not isinstance(network.features_extractor, FlattenExtractor):
+        raise ValueError(
+            f"NumPy export only supports MLP policies, got {type(network.features_extractor)}"
+        )
+    arrays: dict[str, np.ndarray] = {}
+    activations: list[str] = []
+    for layer in network.layers:
+        if isinstance(layer, nn.Linear):
+            arrays[f"weight_{len(activations)}"] = layer.weight.detach().numpy().T.copy()
+            arrays[f"bias_{len(activations)}"] = layer.bias.detach().numpy().copy()
+            activations.append("identity")
+        elif type(layer) in ACTIVATIONS and activations:
+            activations[-1] = ACTIVATIONS[type(layer)]
+        else:
+            raise ValueError(f"Unsupported layer for the NumPy export: {layer}")
+    arrays["activations"] = np.array(activations)
+    return arrays
+
+
+def export_policy(
+    algo: str, model_path: str, output_dir: str, formats: tuple[str, ...] = EXPORT_FORMATS
+) -> dict[str, str]:
+    """Export the policy network of a saved model.
+
+    Parameters:
+    - algo: Algorithm of the saved model, one of ALGOS.
+    - model_path: Path of the saved SB3 model.
+    - output_dir: Directory of the exported files, created if needed.
+    - formats: Exported formats, among EXPORT_FORMATS.
+
+    Returns:
+    - The path of the exported file of each format.
+    """
+    if algo not in ALGOS:
+        raise ValueError(f"Unknown algorithm: {algo}")
+    unknown_formats = set(formats) - set(EXPORT_FORMATS)
+    if unknown_formats:
+        raise ValueError(f"Unknown export formats: {sorted(unknown_formats)}")
+
+    model = ALGOS[algo].load(model_path, device="cpu")
+    network = extract_policy_network(model)
+    example = torch.zeros((1, *model.observation_space.shape))
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {name: os.path.join(output_dir, EXPORT_FILENAMES[name]) for name in formats}
+    if "torchscript" in paths:
+        torch.jit.trace(network, example).save(paths["torchscript"])
+    if "onnx" in paths:
+        torch.onnx.export(
+            network,
+            (example,),
+            paths["onnx"],
+            input_names=["observations"],
+            output_names=["logits"],
+            dynamic_axes={"observations": {0: "batch"}, "logits": {0: "batch"}},
+            dynamo=False,
+        )
+    if "numpy" in paths:
+        np.savez(paths["numpy"], **numpy_weights(network))
+    return paths
@@ -1,17 +1,73 @@
+import functools
 import os
 import sys
+import time
 
 import gymnasium as gym
 import torch.nn as nn
 from stable_baselines3 import A2C, DQN, PPO
-from stable_baselines3.common.callbacks import EvalCallback
+from stable_baselines3.common.callbacks import BaseCallback, CallbackList, EvalCallback
 from stable_baselines3.common.monitor import Monitor
-from stable_baselines3.common.utils import get_schedule_fn
+from stable_baselines3.common.utils import get_schedule_fn, set_random_seed
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecEnv
 
 # Add src directory to path for protein_design_env import
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, os.path.join(BASE_DIR, "src"))
 
+from learner.env_config import env_config, env_kwargs  # noqa: E402
+from learner.metrics import (  # noqa: E402
+    EvalMetricsCallback,
+    MetricsCallback,
+    MetricsRecorder,
+    PrometheusExporter,
+    WandbFileSink,
+)
+from learner.offline import OfflineDataset, behavior_cloning  # noqa: E402
+from learner.replay_buffer import ProteinReplayBuffer  # noqa: E402
+from learner.seeding import SeedPlan  # noqa: E402
+from learner.threads import ThreadLayout, autotune_layout  # noqa: E402
+from networks import make_policy_kwargs  # noqa: E402
+from protein_design_env.constants import OBS_SIZE  # noqa: E402
+from protein_design_env.residues import load_residue_table  # noqa: E402
+
+
+def make_protein_env(
+    env_name,
+    variable_motif,
+    variable_length,
+    seed,
+    monitor=False,
+    held_out_motif_fraction=0.0,
+    residue_table=None,
+    target_motifs=None,
+    motif_reward="presence",
+    motif_weights=None,
+):
+    """Create a seeded protein design environment, optionally wrapped in a Monitor.
+
+    This is a module level function so that it can be sent to subprocess env workers. The residue
+    alphabet is loaded from the `residue_table` yaml file if given, else it is the standard one.
+    The `target_motifs`, strings of one-letter codes, replace the single motif if given.
+    """
+    import protein_design_env  # noqa: F401 - Register the environment in subprocess workers
+
+    config = {
+        "residue_table": residue_table,
+        "target_motifs": target_motifs,
+        "motif_reward": motif_reward,
+        "motif_weights": motif_weights,
+    }
+    env = gym.make(
+        env_name,
+        change_motif_at_each_episode=variable_motif,
+        change_sequence_length_at_each_episode=variable_length,
+        seed=seed,
+        held_out_motif_fraction=held_out_motif_fraction,
+        **env_kwargs(config),
+    )
+    return Monitor(env) if monitor else env
+
 
 class Agent:
     """This class defines a reinforcement learning agent for protein design.
@@ -24,27 +80,72 @@ class Agent:
     - args: Command line arguments used to initialize the agent.
     - env: The environment in which the agent will be trained.
     - model: The reinforcement learning model used by the agent.
+    - seed_plan: Seeds of the env workers, eval env and torch derived from `args.seed`.
+    - thread_layout: Threads and CPUs of the learner and env workers, autotuned if
+      `thread_autotune`, and `thread_benchmark` the time of each autotuning candidate.
 
     Methods:
     - __init__(self, args): Initialize the agent with the command line arguments.
+    - make_env(self, seeds): Create the environment, vectorized if there are several seeds.
     - initialize_model(self): Initialize the model based on the algorithm specified in the command line arguments.
     - callback(self): Create an evaluation callback for the agent.
+    - pretrain(self): Pretrain the policy on the offline dataset `bc_dataset` by behavior cloning.
     - train(self): Train the reinforcement learning agent.
+    - start_metrics_sinks(self, recorder): Start the live metrics sinks enabled in the configuration.
     - save_model(self): Save the trained model to a specified directory.
 
     """
 
     def __init__(self, args):
         self.args = args
-        self.env = gym.make(
-            args.env_name,
-            change_motif_at_each_episode=args.variable_motif,
-            change_sequence_length_at_each_episode=args.variable_length,
-        )
+        self.seed_plan = SeedPlan.from_seed(args.seed, n_envs=args.n_envs)
+        # Seed torch, numpy and random here: the model is not given a seed since SB3 would
+        # re-seed the envs with consecutive seeds instead of the independent env streams.
+        set_random_seed(self.seed_plan.torch_seed)
+        self.thread_layout = ThreadLayout.from_config(args)
+        self.thread_layout.apply()
+        self.env = self.make_env(self.seed_plan.env_seeds)
         self.initialize_model()
+        self.thread_benchmark = None
+        if args.thread_autotune:
+            # The benchmark envs are separate, so the training envs keep their seeded streams.
+            self.thread_layout, self.thread_benchmark = autotune_layout(
+                self.thread_layout,
+                functools.partial(self.make_env, self.seed_plan.env_seeds),
+                self.model.policy,
+                args.subproc_envs,
+            )
+        self.thread_layout.pin_env_workers(self.env)
+        print(f"Thread layout: {self.thread_layout.manifest()}")
+
+    def make_env(self, seeds):
+        """Create the environment, vectorized with one worker per seed if there are several."""
+        make_single_env = functools.partial(
+            make_protein_env,
+            self.args.env_name,
+            self.args.variable_motif,
+            self.args.variable_length,
+            held_out_motif_fraction=self.args.held_out_motif_fraction,
+            residue_table=self.args.residue_table,
+            target_motifs=self.args.target_motifs,
+            motif_reward=self.args.motif_reward,
+            motif_weights=self.args.motif_weights,
+        )
+        if len(seeds) == 1:
+            return make_single_env(seeds[0])
+        env_fns = [functools.partial(make_single_env, seed, monitor=True) for seed in seeds]
+        if self.args.subproc_envs:
+            return SubprocVecEnv(env_fns)
+        return DummyVecEnv(env_fns)
 
     def initialize_model(self):
         """Initialize the model based on the algorithm specified in the command line arguments."""
+        policy_kwargs = make_policy_kwargs(
+            self.args.features_extractor,
+            embedding_dim=self.args.embedding_dim,
+            features_dim=self.args.features_dim,
+            n_residues=self.env.action_space.n,
+        )
         if self.args.algo == "PPO":
             if self.args.manual:
                 """ Defined a speicifed model if required. We use that to experiment new settings """
@@ -63,6 +164,7 @@ class Agent:
                     "policy_kwargs": {  # Policy network architecture
                         "net_arch": [128, 128],  # 2-layer MLP with 128 units each
                         "activation_fn": activation_fn,  # Activation function
+                        **policy_kwargs,  # Features extractor
                     },
                 }
                 # Create the PPO agent
@@ -80,13 +182,26 @@ class Agent:
                     self.env,
                     verbose=1,
                     tensorboard_log=f"./saved-model/{self.args.algo}_Protein_Design",
+                    policy_kwargs=policy_kwargs,
                 )
         elif self.args.algo == "DQN":
+            # Store int8 observations instead of float64 obs and next obs pairs, the layout of the
+            # observations of target motifs is not supported.
+            compact = self.args.compact_replay_buffer
+            compact = compact and self.env.observation_space.shape == (OBS_SIZE,)
+            replay_buffer_class = ProteinReplayBuffer if compact else None
+            replay_buffer_kwargs = None
+            if compact and self.args.residue_table:
+                residues = load_residue_table(self.args.residue_table)
+                replay_buffer_kwargs = {"charges": residues.charges}
             self.model = DQN(
                 "MlpPolicy",
                 self.env,
                 verbose=1,
                 tensorboard_log=f"./saved-model/{self.args.algo}_Protein_Design",
+                replay_buffer_class=replay_buffer_class,
+                replay_buffer_kwargs=replay_buffer_kwargs,
+                policy_kwargs=policy_kwargs,
             )
         elif self.args.algo == "A2C":
             self.model = A2C(
@@ -94,17 +209,21 @@ class Agent:
                 self.env,
                 verbose=1,
                 tensorboard_log=f"./saved-model/{self.args.algo}_Protein_Design",
+                policy_kwargs=policy_kwargs,
             )
         else:
             raise ValueError(f"Unsupported algorithm: {self.args.algo}")
 
-    def callback(self):
+    def callback(self, callback_after_eval: BaseCallback | None = None):
         """Create an evaluation callback for the agent.
 
         This method sets up an evaluation callback that will be used during training to periodically evaluate the performance of the agent.
         The evaluation results are saved to a specified directory.
         The directory path is determined based on whether the environment has variable motifs and/or variable sequence lengths.
 
+        Parameters:
+        - callback_after_eval: Callback run after each evaluation.
+
         Returns:
         - eval_callback: An instance of EvalCallback configured with the evaluation environment and save paths.
         """
@@ -116,13 +235,10 @@ class Agent:
             best_model_save_path = f"./saved-model/{self.args.algo}_Protein_Design"
 
         os.makedirs(best_model_save_path, exist_ok=True)
-        env = Monitor(self.env, best_model_save_path)
+        if not isinstance(self.env, VecEnv):
+            env = Monitor(self.env, best_model_save_path)
 
-        eval_env = gym.make(
-            self.args.env_name,
-            change_motif_at_each_episode=self.args.variable_motif,
-            change_sequence_length_at_each_episode=self.args.variable_length,
-        )
+        eval_env = self.make_env(self.seed_plan.eval_seeds)
         eval_env = Monitor(eval_env, os.path.join(best_model_save_path, "eval"))
         eval_callback = EvalCallback(
             eval_env,
@@ -131,22 +247,105 @@ class Agent:
             eval_freq=5000,
             deterministic=True,
             render=False,
+            callback_after_eval=callback_after_eval,
         )
         return eval_callback
 
-    def train(self):
-        """Train a reinforcement learning agent to solve Problem 1, 2, 3"""
+    def pretrain(self):
+        """Pretrain the policy on the offline dataset `bc_dataset` by behavior cloning.
+
+        Returns:
+        - The losses and throughput of each epoch, see `learner.offline.behavior_cloning`.
+
+        Raises:
+        - ValueError: If the dataset was recorded in another env configuration.
+        """
+        dataset = OfflineDataset(self.args.bc_dataset)
+        dataset_env = dataset.metadata.get("env")
+        if dataset_env != env_config(self.args):
+            raise ValueError(
+                f"The offline dataset {self.args.bc_dataset} was recorded with the env "
+                f"configuration {dataset_env}, not {env_config(self.args)}"
+            )
+        print(f"Pretraining {self.args.algo} on {len(dataset)} offline transitions...")
+        history = behavior_cloning(
+            self.model,
+            dataset,
+            n_epochs=self.args.bc_epochs,
+            batch_size=self.args.bc_batch_size,
+            learning_rate=self.args.bc_learning_rate,
+            value_coef=self.args.bc_value_coef,
+            seed=self.seed_plan.torch_seed,
+        )
+        print(f"Behavior cloning: {history[-1]}")
+        return history
+
+    def train(self, callbacks: list[BaseCallback] | None = None):
+        """Train a reinforcement learning agent to solve Problem 1, 2, 3
+
+        The policy is first pretrained offline if `bc_dataset` is set.
+
+        Parameters:
+        - callbacks: Additional callbacks run along with the evaluation callback.
+        """
+        if self.args.dir is not None:
+            self.seed_plan.save_manifest(os.path.join(self.args.dir, "seed_manifest.json"))
+            self.thread_layout.save(
+                os.path.join(self.args.dir, "thread_layout.json"), self.thread_benchmark
+            )
+        if self.args.bc_dataset is not None:
+            self.pretrain()
+
         # Train the model
         print(
             f"Training {self.args.algo} on {self.args.env_name} for {self.args.timesteps} timesteps..."
         )
-        self.model.learn(
-            total_timesteps=self.args.timesteps, callback=self.callback(), progress_bar=True
-        )
+        recorder = MetricsRecorder()
+        sinks = self.start_metrics_sinks(recorder)
+        metrics_callbacks = []
+        if sinks:
+            metrics_callbacks.append(MetricsCallback(recorder, self.args.metrics_sample_every))
+        try:
+            self.model.learn(
+                total_timesteps=self.args.timesteps,
+                callback=CallbackList(
+                    [
+                        self.callback(EvalMetricsCallback(recorder) if sinks else None),
+                        *metrics_callbacks,
+                        *(callbacks or []),
+                    ]
+                ),
+                progress_bar=True,
+            )
+        finally:
+            for sink in sinks:
+                sink.stop()
 
         if self.args.model_save_bool:
             self.save_model()
 
+    def start_metrics_sinks(self, recorder):
+        """Start the metrics sinks enabled in the configuration.
+
+        The Prometheus endpoint is served if `metrics_port` is set. The metrics are written as
+        wandb run files in `dir`/wandb unless `logging.wandb.mode` is "disabled": wandb itself is
+        not a dependency, so the "online" mode also writes offline files, to sync afterwards.
+
+        Returns:
+        - The started sinks, to stop at the end of the training.
+        """
+        sinks = []
+        if self.args.metrics_port is not None:
+            exporter = PrometheusExporter(recorder, self.args.metrics_port).start()
+            print(f"Serving metrics on http://127.0.0.1:{exporter.port}/metrics")
+            sinks.append(exporter)
+        wandb_config = self.args.logging.wandb
+        if wandb_config.mode != "disabled":
+            run_name = f"offline-run-{time.strftime('%Y%m%d_%H%M%S')}"
+            run_dir = os.path.join(self.args.dir or ".", "wandb", run_name)
+            sinks.append(WandbFileSink(recorder, run_dir, wandb_config).start())
+        return sinks
+
     def save_model(self):
         """Save the model"""
         if self.args.variable_motif and self.args.variable_length:
@@ -0,0 +1,362 @@
+"""Monte Carlo tree search (MCTS) design with the prior of a trained actor-critic policy.
+
+The dynamics of `Environment` are deterministic given the actions, so a design can be planned by
+searching the tree of the sequences from the current state. The search follows PUCT (as in
+AlphaZero): the policy gives the prior probability of each amino acid and the value network the
+value of the new leaves, the value of an edge being the discounted sum of the env rewards along
+the path plus the value of the leaf. Values are normalized by the min and max values of the tree
+(as in MuZero), since the returns are not bounded in [0, 1].
+
+Each worker thread selects `batch_size` leaves before evaluating them with one batched network
+call: the edges on the path to a selected leaf get a virtual loss, which steers the next selections
+(of this thread and of the other ones) away from it until the leaf is evaluated. The children of a
+node are created by restoring the snapshot of the node in the env of the thread and stepping it.
+"""
+
+import math
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import torch
+from numpy._typing import NDArray
+from stable_baselines3.common.policies import ActorCriticPolicy
+
+from protein_design_env.constants import NUM_AMINO_ACIDS
+from protein_design_env.environment import Environment, EnvironmentSnapshot
+from protein_design_env.residues import ResidueTable
+
+
+class Node:
+    """Node of the search tree, with the statistics of its outgoing edges, one per action.
+
+    Attributes:
+        snapshot: State of the episode at the node, None until the node is created in the env.
+        observation: Observation of the env at the node.
+        reward: Reward of the edge leading to the node.
+        terminal: Whether the episode ends at the node.
+        priors: Prior probability of each action, None until the node is expanded.
+        visits: Number of backed up simulations through each edge.
+        value_sums: Sum of the values backed up through each edge.
+        virtual_losses: Number of pending simulations through each edge.
+        children: Child node of each tried action.
+    """
+
+    __slots__ = (
+        "snapshot",
+        "observation",
+        "reward",
+        "terminal",
+        "priors",
+        "visits",
+        "value_sums",
+        "virtual_losses",
+        "children",
+    )
+
+    def __init__(self, n_actions: int = NUM_AMINO_ACIDS) -> None:
+        self.snapshot: EnvironmentSnapshot | None = None
+        self.observation: NDArray | None = None
+        self.reward = 0.0
+        self.terminal = False
+        self.priors: NDArray | None = None
+        self.visits = np.zeros(n_actions)
+        self.value_sums = np.zeros(n_actions)
+        self.virtual_losses = np.zeros(n_actions)
+        self.children: dict[int, Node] = {}
+
+
+@dataclass
+class SearchStats:
+    """Statistics of the searches of a design.
+
+    Attributes:
+        simulations: Number of backed up simulations.
+        collisions: Number of selections of a leaf already pending in another batch.
+        network_calls: Number of batched network calls.
+    """
+
+    simulations: int = 0
+    collisions: int = 0
+    network_calls: int = 0
+
+
+class MCTSPlanner:
+    """Plan designs with a parallel batched MCTS guided by an SB3 actor-critic policy.
+
+    Parameters:
+    - model: PPO or A2C model, whose policy gives the priors and the leaf values.
+    - residues: Residue table of the design env, the standard amino acids by default.
+    - motifs, motif_reward, motif_weights: Target motifs of the design env and their reward, see
+      `Environment`. The envs of the worker threads must have the same dynamics as the design env.
+    - n_threads: Number of worker threads searching the same tree.
+    - batch_size: Number of leaves evaluated by each network call of a thread.
+    - c_puct: Weight of the prior exploration term of PUCT.
+    - virtual_loss: Number of virtual visits of minimal value added to an edge per pending leaf.
+    - gamma: Discount factor of the values, by default the one of the model.
+    """
+
+    def __init__(
+        self,
+        model,
+        residues: ResidueTable | None = None,
+        motifs: list[list[int]] | None = None,
+        motif_reward: str = "presence",
+        motif_weights: list[float] | None = None,
+        n_threads: int = 1,
+        batch_size: int = 16,
+        c_puct: float = 1.5,
+        virtual_loss: float = 1.0,
+        gamma: float | None = None,
+    ) -> None:
+        if not isinstance(model.policy, ActorCriticPolicy):
+            raise ValueError("MCTS requires an actor-critic policy (PPO or A2C)")
+        self.env_kwargs = {
+            "residues": residues,
+            "motifs": motifs,
+            "motif_reward": motif_reward,
+            "motif_weights": motif_weights,
+        }
+        env = Environment(**self.env_kwargs)
+        self.n_actions = env.action_space.n
+        if model.action_space.n != self.n_actions:
+            raise ValueError("The actions of the model are not the residues of the env")
+        if model.observation_space.shape != env.observation_space.shape:
+            raise ValueError("The observations of the model are not the ones of the env")
+        self.policy = model.policy
+        self.n_threads = n_threads
+        self.batch_size = batch_size
+        self.c_puct = c_puct
+        self.virtual_loss = virtual_loss
+        self.gamma = model.gamma if gamma is None else gamma
+        self._lock = threading.Lock()
+        self._min_value = math.inf
+        self._max_value = -math.inf
+
+    def evaluate(self, observations: NDArray) -> tuple[NDArray, NDArray]:
+        """Return the action probabilities and the values of a batch of observations."""
+        with torch.no_grad():
+            obs_tensor, _ = self.policy.obs_to_tensor(observations)
+            features = self.policy.extract_features(obs_tensor)
+            latent_pi, latent_vf = self.policy.mlp_extractor(features)
+            distribution = self.policy._get_action_dist_from_latent(latent_pi)
+            probabilities = distribution.distribution.probs.cpu().numpy()
+            values = self.policy.value_net(latent_vf).squeeze(-1).cpu().numpy()
+        return probabilities, values
+
+    def design(
+        self, env: Environment, time_budget: float, seed: int | None = None
+    ) -> tuple[float, list[int], SearchStats]:
+        """Play an episode of `env` from its reset, searching before each action.
+
+        The time budget of the design is shared equally between its remaining actions, and the
+        subtree of the chosen action is kept for the next search.
+
+        Returns:
+        - The return of the episode, the designed sequence and the search statistics.
+        """
+        obs, _ = env.reset(seed=seed)
+        stats = SearchStats()
+        deadline = time.perf_counter() + time_budget
+        root = Node(self.n_actions)
+        root.snapshot, root.observation = env.snapshot(), obs
+        episode_return, done = 0.0, False
+        while not done:
+            n_remaining = env.sequence_length - len(env.state)
+            budget = (deadline - time.perf_counter()) / n_remaining
+            action = self.search(root, budget, stats)
+            _, reward, terminated, truncated, _ = env.step(action)
+            episode_return += float(reward)
+            done = terminated or truncated
+            root = root.children.get(action)
+            if root is None or root.priors is None:
+                # Unexpanded node: start a new tree from the current state.
+                root = Node(self.n_actions)
+                root.snapshot, root.observation = env.snapshot(), env._get_observation()
+        return episode_return, list(env.state), stats
+
+    def search(self, root: Node, time_budget: float, stats: SearchStats | None = None) -> int:
+        """Search from the root for `time_budget` seconds and return the most visited action.
+
+        At least one batch of simulations is run, to expand the root.
+        """
+        stats = stats or SearchStats()
+        self._min_value, self._max_value = math.inf, -math.inf
+        if root.priors is None:
+            priors, _ = self.evaluate(root.observation[None])
+            root.priors = priors[0]
+            stats.network_calls += 1
+        deadline = time.perf_counter() + time_budget
+        threads = [
+            threading.Thread(target=self._work, args=(root, deadline, stats))
+            for _ in range(self.n_threads - 1)
+        ]
+        for thread in threads:
+            thread.start()
+        self._work(root, deadline, stats, run_once=True)
+        for thread in threads:
+            thread.join()
+        visits = root.visits
+        q_values = np.where(visits > 0, root.value_sums / np.maximum(visits, 1), -math.inf)
+        # Most visited action, ties broken by the mean value.
+        return int(np.lexsort((q_values, visits))[-1])
+
+    def _work(self, root: Node, deadline: float, stats: SearchStats, run_once: bool = False):
+        """Run batches of simulations in the thread until the deadline."""
+        env = Environment(**self.env_kwargs)
+        while run_once or time.perf_counter() < deadline:
+            run_once = False
+            paths = []
+            with self._lock:
+                # A collision means that the next selections would mostly reach pending leaves.
+                while len(paths) < self.batch_size:
+                    path = self._select(root, stats)
+                    if not path:
+                        break
+                    paths.append(path)
+            leaves = [path[-1][0].children[path[-1][1]] for path in paths]
+            # Create the new leaves in the env of the thread, outside of the lock.
+            for (parent, action), leaf in zip((path[-1] for path in paths), leaves, strict=True):
+                if leaf.snapshot is not None:
+                    continue  # Terminal leaf selected again.
+                env.restore(parent.snapshot)
+                observation, reward, terminated, truncated, _ = env.step(action)
+                leaf.observation, leaf.reward = observation, float(reward)
+                leaf.terminal = terminated or truncated
+                leaf.snapshot = env.snapshot()
+            values = np.zeros(len(leaves))
+            to_evaluate = [i for i, leaf in enumerate(leaves) if not leaf.terminal]
+            priors = None
+            if to_evaluate:
+                observations = np.stack([leaves[i].observation for i in to_evaluate])
+                priors, values[to_evaluate] = self.evaluate(observations)
+            with self._lock:
+                if priors is not None:
+                    stats.network_calls += 1
+                    for i, prior in zip(to_evaluate, priors, strict=True):
+                        leaves[i].priors = prior
+                for path, value in zip(paths, values, strict=True):
+                    self._backup(path, float(value))
+                stats.simulations += len(paths)
+
+    def _select(self, root: Node, stats: SearchStats) -> list[tuple[Node, int]]:
+        """Descend from the root to a new leaf, adding a virtual loss to the edges of the path.
+
+        Returns:
+        - The (node, action) edges of the path, the last one leading to the new leaf, or an empty
+          path if the selection reached a leaf pending in another batch.
+        """
+        path = []
+        node = root
+        while True:
+            action = self._puct_action(node)
+            path.append((node, action))
+            node.virtual_losses[action] += self.virtual_loss
+            child = node.children.get(action)
+            if child is None:
+                node.children[action] = Node(self.n_actions)
+                return path
+            if child.priors is None and not child.terminal:
+                # The child is being evaluated in another batch.
+                for parent, parent_action in path:
+                    parent.virtual_losses[parent_action] -= self.virtual_loss
+                stats.collisions += 1
+                return []
+            if child.terminal:
+                return path
+            node = child
+
+    def _puct_action(self, node: Node) -> int:
+        """Return the action of maximal normalized value plus prior exploration bonus."""
+        visits = node.visits + node.virtual_losses
+        # Virtual visits count as the minimal value of the tree.
+        min_value = self._min_value if self._min_value < math.inf else 0.0
+        value_sums = node.value_sums + node.virtual_losses * min_value
+        q_values = np.zeros(self.n_actions)
+        visited = visits > 0
+        q_values[visited] = self._normalize(value_sums[visited] / visits[visited])
+        exploration = self.c_puct * node.priors * math.sqrt(visits.sum() + 1) / (1 + visits)
+        return int(np.argmax(q_values + exploration))
+
+    def _normalize(self, values: NDArray) -> NDArray:
+        if self._max_value > self._min_value:
+            return (values - self._min_value) / (self._max_value - self._min_value)
+        return np.zeros_like(values)
+
+    def _backup(self, path: list[tuple[Node, int]], value: float) -> None:
+        """Back up the value of a leaf along its path and remove the virtual losses."""
+        for node, action in reversed(path):
+            value = node.children[action].reward + self.gamma * value
+            node.visits[action] += 1
+            node.value_sums[action] += value
+            node.virtual_losses[action] -= self.virtual_loss
+            self._min_value = min(self._min_value, value)
+            self._max_value = max(self._max_value, value)
+
+
+def greedy_design(model, env: Environment, seed: int | None = None) -> tuple[float, list[int]]:
+    """Play an episode of `env` from its reset with the deterministic actions of the model."""
+    obs, _ = env.reset(seed=seed)
+    episode_return, done = 0.0, False
+    while not done:
+        action, _ = model.predict(obs, deterministic=True)
+        obs, reward, terminated, truncated, _ = env.step(int(action))
+        episode_return += float(reward)
+        done = terminated or truncated
+    return episode_return, list(env.state)
+
+
+def compare_with_greedy(
+    model,
+    env_kwargs: dict,
+    seeds: list[int],
+    time_budget: float,
+    **planner_kwargs,
+) -> dict:
+    """Compare the returns of MCTS designs at a fixed time budget with the greedy designs.
+
+    Parameters:
+    - model: PPO or A2C model.
+    - env_kwargs: Keyword arguments of the `Environment` of the designs.
+    - seeds: Reset seed of each design.
+    - time_budget: Search time of each MCTS design, in seconds.
+    - planner_kwargs: Keyword arguments of `MCTSPlanner`.
+
+    Returns:
+    - The greedy and MCTS returns of each design, their means, and the search statistics.
+    """
+    planner = MCTSPlanner(
+        model,
+        residues=env_kwargs.get("residues"),
+        motifs=env_kwargs.get("motifs"),
+        motif_reward=env_kwargs.get("motif_reward", "presence"),
+        motif_weights=env_kwargs.get("motif_weights"),
+        **planner_kwargs,
+    )
+    env = Environment(**env_kwargs)
+    greedy_returns, mcts_returns, seconds = [], [], []
+    stats = SearchStats()
+    for seed in seeds:
+        greedy_returns.append(greedy_design(model, env, seed)[0])
+        start = time.perf_counter()
+        mcts_return, _, design_stats = planner.design(env, time_budget, seed)
+        seconds.append(time.perf_counter() - start)
+        mcts_returns.append(mcts_return)
+        stats.simulations += design_stats.simulations
+        stats.collisions += design_stats.collisions
+        stats.network_calls += design_stats.network_calls
+    greedy_returns, mcts_returns = np.array(greedy_returns), np.array(mcts_returns)
+    return {
+        "greedy_mean_return": float(greedy_returns.mean()),
+        "mcts_mean_return": float(mcts_returns.mean()),
+        "mean_improvement": float((mcts_returns - greedy_returns).mean()),
+        "fraction_improved": float(np.mean(mcts_returns > greedy_returns)),
+        "fraction_worse": float(np.mean(mcts_returns < greedy_returns)),
+        "mean_design_seconds": float(np.mean(seconds)),
+        "simulations_per_design": stats.simulations / len(seeds),
+        "collisions_per_design": stats.collisions / len(seeds),
+        "network_calls_per_design": stats.network_calls / len(seeds),
+        "greedy_returns": greedy_returns.tolist(),
+        "mcts_returns": mcts_returns.tolist(),
+    }
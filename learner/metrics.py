@@ -0,0 +1,324 @@
+"""Live metrics of training and inference processes.
+
+Metrics are recorded in a `MetricsRecorder`, a ring buffer of preallocated NumPy arrays written by
+a single thread without locks, and read by the sinks from other threads:
+- `PrometheusExporter` serves the latest values on a local HTTP endpoint in Prometheus format,
+- `WandbFileSink` periodically appends the new values to offline files laid out as the files of a
+  wandb run (`wandb-history.jsonl`, `wandb-summary.json`, `wandb-metadata.json`).
+
+During training, `MetricsCallback` records the env steps per second, the process RSS and the
+timesteps every `sample_every` steps, the reward of each episode, the duration of each update,
+and `EvalMetricsCallback` records the evaluation results.
+"""
+
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from stable_baselines3.common.callbacks import BaseCallback
+
+PROMETHEUS_PREFIX = "protein_design_"
+# Quantiles of the distribution metrics exported to Prometheus.
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+# Metrics exported to Prometheus as distributions over the recent values instead of gauges.
+DISTRIBUTION_METRICS = ("episode_reward",)
+
+
+# File descriptor of /proc/self/statm, kept open since opening it is much slower than reading it.
+_statm_fd: int | None = None
+
+
+def process_rss_bytes() -> int:
+    """Return the resident set size of the process, or its maximum if it is not available."""
+    global _statm_fd
+    try:
+        if _statm_fd is None:
+            _statm_fd = os.open("/proc/self/statm", os.O_RDONLY)
+        return int(os.pread(_statm_fd, 256, 0).split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes on Linux.
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+class MetricsRecorder:
+    """Ring buffer of (timestamp, step, metric, value) records.
+
+    `record` must be called from a single thread. Readers copy the records without locking: a
+    record may be overwritten while it is read if the writer laps the reader, which only loses
+    that record.
+
+    Parameters:
+    - capacity: Number of records kept in the ring buffer.
+    """
+
+    def __init__(self, capacity: int = 65536) -> None:
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity)
+        self.steps = np.zeros(capacity, dtype=np.int64)
+        self.metric_ids = np.zeros(capacity, dtype=np.int32)
+        self.values = np.zeros(capacity)
+        self.names: list[str] = []
+        self._ids: dict[str, int] = {}
+        # Total number of records, the next one is written at n_records % capacity.
+        self.n_records = 0
+        # Latest value and running count and sum of each metric, over all the records.
+        self.latest: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+        self.sums: dict[str, float] = {}
+        self.start_time = time.time()
+
+    def record(self, name: str, value: float, step: int = 0) -> None:
+        """Record the value of a metric at a training step."""
+        metric_id = self._ids.get(name)
+        new_metric = metric_id is None
+        if new_metric:
+            metric_id = len(self.names)
+            self.counts[name] = 0
+            self.sums[name] = 0.0
+        index = self.n_records % self.capacity
+        self.timestamps[index] = time.time()
+        self.steps[index] = step
+        self.metric_ids[index] = metric_id
+        self.values[index] = value
+        self.latest[name] = value
+        self.counts[name] += 1
+        self.sums[name] += value
+        if new_metric:
+            # Published last, so readers iterating over `names` find the entries of the metric.
+            self._ids[name] = metric_id
+            self.names.append(name)
+        self.n_records += 1
+
+    def records_since(self, n_records: int) -> tuple[dict[str, np.ndarray], int]:
+        """Return the records written after the first `n_records`, in order.
+
+        Records overwritten since are skipped.
+
+        Returns:
+        - The arrays "timestamps", "steps", "metric_ids" and "values" of the records, and the total
+          number of records at the time of the copy, to pass to the next call.
+        """
+        end = self.n_records
+        start = max(n_records, end - self.capacity)
+        indices = np.arange(start, end) % self.capacity
+        records = {
+            "timestamps": self.timestamps[indices],
+            "steps": self.steps[indices],
+            "metric_ids": self.metric_ids[indices],
+            "values": self.values[indices],
+        }
+        return records, end
+
+    def recent_values(self, name: str) -> np.ndarray:
+        """Return the values of a metric still in the ring buffer."""
+        if name not in self._ids:
+            return np.zeros(0)
+        records, _ = self.records_since(0)
+        return records["values"][records["metric_ids"] == self._ids[name]]
+
+
+class MetricsCallback(BaseCallback):
+    """Record training metrics in a `MetricsRecorder`.
+
+    Parameters:
+    - recorder: Recorder of the metrics.
+    - sample_every: Number of calls between two records of the sampled metrics (env steps per
+      second, RSS and timesteps).
+    """
+
+    def __init__(self, recorder: MetricsRecorder, sample_every: int = 100, verbose: int = 0):
+        super().__init__(verbose)
+        self.recorder = recorder
+        self.sample_every = sample_every
+        self._sample_time = 0.0
+        self._sample_timesteps = 0
+        self._rollout_end_time: float | None = None
+
+    def _on_training_start(self) -> None:
+        self._sample_time = time.perf_counter()
+        self._sample_timesteps = self.num_timesteps
+
+    def _on_rollout_start(self) -> None:
+        # The model is updated between the end of a rollout and the start of the next one.
+        if self._rollout_end_time is not None:
+            self.recorder.record(
+                "update_seconds", time.perf_counter() - self._rollout_end_time, self.num_timesteps
+            )
+
+    def _on_rollout_end(self) -> None:
+        self._rollout_end_time = time.perf_counter()
+
+    def _on_step(self) -> bool:
+        # The Monitor wrapper adds the "episode" entry to the info dict of finished episodes.
+        for info in self.locals["infos"]:
+            if "episode" in info:
+                self.recorder.record("episode_reward", info["episode"]["r"], self.num_timesteps)
+        if self.n_calls % self.sample_every == 0:
+            now = time.perf_counter()
+            steps_per_second = (self.num_timesteps - self._sample_timesteps) / (
+                now - self._sample_time
+            )
+            self.recorder.record("env_steps_per_second", steps_per_second, self.num_timesteps)
+            self.recorder.record("rss_bytes", process_rss_bytes(), self.num_timesteps)
+            self.recorder.record("timesteps", self.num_timesteps, self.num_timesteps)
+            self._sample_time, self._sample_timesteps = now, self.num_timesteps
+        return True
+
+
+class EvalMetricsCallback(BaseCallback):
+    """Record the results of an `EvalCallback`, to use as its `callback_after_eval`."""
+
+    def __init__(self, recorder: MetricsRecorder, verbose: int = 0):
+        super().__init__(verbose)
+        self.recorder = recorder
+
+    def _on_step(self) -> bool:
+        self.recorder.record("eval_mean_reward", self.parent.last_mean_reward, self.num_timesteps)
+        return True
+
+
+class PrometheusExporter:
+    """Serve the metrics of a recorder in Prometheus text format on http://host:port/metrics.
+
+    Metrics of DISTRIBUTION_METRICS are exported as summaries of their values in the ring buffer,
+    the other ones as gauges of their latest value. The server runs in a daemon thread.
+    """
+
+    def __init__(self, recorder: MetricsRecorder, port: int, host: str = "127.0.0.1") -> None:
+        self.recorder = recorder
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802 - Name of the http.server API
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                pass  # Scrapes are not logged.
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def render(self) -> str:
+        """Return the metrics in Prometheus text format."""
+        lines = []
+        for name in list(self.recorder.names):
+            metric = PROMETHEUS_PREFIX + name
+            if name in DISTRIBUTION_METRICS:
+                lines.append(f"# TYPE {metric} summary")
+                values = self.recorder.recent_values(name)
+                if len(values):
+                    for q, value in zip(QUANTILES, np.quantile(values, QUANTILES), strict=True):
+                        lines.append(f'{metric}{{quantile="{q}"}} {value}')
+                lines.append(f"{metric}_sum {self.recorder.sums[name]}")
+                lines.append(f"{metric}_count {self.recorder.counts[name]}")
+            else:
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {self.recorder.latest[name]}")
+        return "\n".join(lines) + "\n"
+
+    def start(self) -> "PrometheusExporter":
+        """Start serving the metrics."""
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the server."""
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class WandbFileSink:
+    """Periodically append the new records of a recorder to offline wandb-like run files.
+
+    Each flush writes one row per training step to `files/wandb-history.jsonl`, with the "_step",
+    "_runtime" and "_timestamp" keys of wandb history rows, and rewrites `files/wandb-summary.json`
+    with the latest value of each metric. The rows can be replayed with `wandb.log` once online.
+
+    Parameters:
+    - recorder: Recorder of the metrics.
+    - run_dir: Directory of the run files.
+    - wandb_config: `LoggingConfig.wandb` configuration (project, entity, tags), saved in
+      `files/wandb-metadata.json`.
+    - flush_seconds: Time between two flushes of the background thread.
+    """
+
+    def __init__(
+        self,
+        recorder: MetricsRecorder,
+        run_dir: str,
+        wandb_config=None,
+        flush_seconds: float = 10.0,
+    ) -> None:
+        self.recorder = recorder
+        self.files_dir = os.path.join(run_dir, "files")
+        self.flush_seconds = flush_seconds
+        self.n_flushed = 0
+        self.n_dropped = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        os.makedirs(self.files_dir, exist_ok=True)
+        metadata = {"startedAt": self.recorder.start_time}
+        if wandb_config is not None:
+            metadata |= {
+                "project": wandb_config.project,
+                "entity": wandb_config.entity,
+                "tags": list(wandb_config.tags),
+            }
+        with open(os.path.join(self.files_dir, "wandb-metadata.json"), "w") as f:
+            json.dump(metadata, f)
+
+    def flush(self) -> int:
+        """Write the records added since the last flush and return the number of new rows."""
+        records, n_records = self.recorder.records_since(self.n_flushed)
+        self.n_dropped += n_records - self.n_flushed - len(records["values"])
+        self.n_flushed = n_records
+        rows: list[dict] = []
+        names = list(self.recorder.names)
+        for timestamp, step, metric_id, value in zip(*records.values(), strict=True):
+            name = names[metric_id]
+            # A new row starts at each step, or when a metric is recorded twice in a step.
+            if not rows or rows[-1]["_step"] != step or name in rows[-1]:
+                rows.append({"_step": int(step)})
+            rows[-1][name] = float(value)
+            rows[-1]["_timestamp"] = float(timestamp)
+            rows[-1]["_runtime"] = float(timestamp) - self.recorder.start_time
+        with open(os.path.join(self.files_dir, "wandb-history.jsonl"), "a") as f:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
+        with open(os.path.join(self.files_dir, "wandb-summary.json"), "w") as f:
+            json.dump(dict(self.recorder.latest), f)
+        return len(rows)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_seconds):
+            self.flush()
+
+    def start(self) -> "WandbFileSink":
+        """Start flushing in the background."""
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the background thread and flush the remaining records."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.flush()
+        if self.n_dropped:
+            logging.warning(f"{self.n_dropped} metric records were overwritten before a flush")
@@ -0,0 +1,137 @@
+"""Benchmark of the generalization of a trained model to motifs held out from training.
+
+The model is evaluated on every (held-out motif, sequence length) pair with deterministic actions.
+Episodes of the same sequence length are played together in a `BatchedEnvironment`, with one
+`predict` call per step for the whole batch, and the motifs are split across worker processes.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import torch
+from numpy._typing import NDArray
+
+from learner.export import ALGOS
+from protein_design_env.batched_environment import BatchedEnvironment
+from protein_design_env.constants import MAX_SEQUENCE_LENGTH, MIN_SEQUENCE_LENGTH
+from protein_design_env.motifs import (
+    MOTIF_SPLIT_SEED,
+    held_out_motifs,
+    motifs_from_ids,
+    optimal_sequences,
+)
+from protein_design_env.scoring import score_sequences
+
+SEQUENCE_LENGTHS = np.arange(MIN_SEQUENCE_LENGTH, MAX_SEQUENCE_LENGTH + 1)
+
+# Model loaded once in each worker process by `_load_worker_model`.
+_worker_model = None
+
+
+def sample_held_out_motifs(
+    fraction: float, n_motifs: int | None = None, seed: int = 0, split_seed: int = MOTIF_SPLIT_SEED
+) -> NDArray[np.int64]:
+    """Return `n_motifs` held-out motifs drawn uniformly without replacement, or all of them."""
+    ids = np.flatnonzero(held_out_motifs(fraction, split_seed))
+    if n_motifs is not None and n_motifs < len(ids):
+        ids = np.sort(np.random.default_rng(seed).choice(ids, n_motifs, replace=False))
+    return motifs_from_ids(ids)
+
+
+def rollout_returns(model, motifs: NDArray, sequence_length: int) -> tuple[NDArray, NDArray]:
+    """Play one deterministic episode per motif and return the returns and final sequences."""
+    env = BatchedEnvironment(len(motifs))
+    observations = env.set_episodes(motifs, sequence_length)
+    returns = np.zeros(len(motifs))
+    for _ in range(sequence_length):
+        actions, _ = model.predict(observations, deterministic=True)
+        observations, rewards, _, infos = env.step(actions)
+        returns += rewards
+    return returns, infos["final_sequences"]
+
+
+def evaluate_motifs(
+    model, motifs: NDArray, sequence_lengths=SEQUENCE_LENGTHS
+) -> dict[str, NDArray]:
+    """Evaluate a model on every pair of motif and sequence length.
+
+    Returns:
+        Arrays of shape (len(sequence_lengths), n_motifs) of the returns of the model, the returns
+        of `optimal_sequences` and whether the model designed the motif with a neutral charge.
+    """
+    results: dict[str, list] = {"returns": [], "optimal_returns": [], "successes": []}
+    for sequence_length in sequence_lengths:
+        returns, sequences = rollout_returns(model, motifs, int(sequence_length))
+        scores = score_sequences(sequences, motifs, sequence_length)
+        optimal = score_sequences(
+            optimal_sequences(motifs, sequence_length), motifs, sequence_length
+        )
+        results["returns"].append(returns)
+        results["optimal_returns"].append(optimal.returns)
+        results["successes"].append(scores.motif_hits & (scores.charges == 0))
+    return {name: np.array(values) for name, values in results.items()}
+
+
+def _load_worker_model(algo: str, model_path: str) -> None:
+    """Load the model in a worker process, which runs single threaded next to the other workers."""
+    global _worker_model
+    torch.set_num_threads(1)
+    _worker_model = ALGOS[algo].load(model_path, device="cpu")
+
+
+def _evaluate_in_worker(motifs: NDArray, sequence_lengths: NDArray) -> dict[str, NDArray]:
+    return evaluate_motifs(_worker_model, motifs, sequence_lengths)
+
+
+def run_benchmark(
+    algo: str,
+    model_path: str,
+    motifs: NDArray,
+    sequence_lengths=SEQUENCE_LENGTHS,
+    n_workers: int = 1,
+) -> dict:
+    """Evaluate a saved model on held-out motifs and summarize the results.
+
+    Parameters:
+    - algo: Algorithm of the saved model, one of ALGOS.
+    - model_path: Path of the saved model.
+    - motifs: Array of shape (n_motifs, MAX_MOTIF_LENGTH) of the evaluated motifs.
+    - sequence_lengths: Evaluated sequence lengths.
+    - n_workers: Number of worker processes, each evaluating a chunk of the motifs.
+
+    Returns:
+    - The overall metrics and the metrics per motif length and sequence length: number of
+      episodes, success rate (motif designed with a neutral charge), mean return, mean return of
+      the optimal sequences and mean optimality gap.
+    """
+    if algo not in ALGOS:
+        raise ValueError(f"Unknown algorithm: {algo}")
+    sequence_lengths = np.asarray(sequence_lengths)
+    chunks = np.array_split(motifs, min(n_workers, len(motifs)))
+    with ProcessPoolExecutor(
+        n_workers, initializer=_load_worker_model, initargs=(algo, model_path)
+    ) as executor:
+        results = list(executor.map(_evaluate_in_worker, chunks, [sequence_lengths] * len(chunks)))
+    merged = {name: np.concatenate([r[name] for r in results], axis=1) for name in results[0]}
+
+    motif_lengths = np.broadcast_to(np.count_nonzero(motifs, axis=1), merged["returns"].shape)
+    lengths = np.broadcast_to(sequence_lengths[:, None], merged["returns"].shape)
+    groups = [
+        _summarize(merged, (motif_lengths == motif_length) & (lengths == sequence_length))
+        | {"motif_length": int(motif_length), "sequence_length": int(sequence_length)}
+        for motif_length in np.unique(motif_lengths)
+        for sequence_length in sequence_lengths
+    ]
+    return {"overall": _summarize(merged, np.ones_like(lengths, dtype=bool)), "groups": groups}
+
+
+def _summarize(results: dict[str, NDArray], mask: NDArray[np.bool_]) -> dict:
+    returns = results["returns"][mask]
+    optimal_returns = results["optimal_returns"][mask]
+    return {
+        "n_episodes": int(mask.sum()),
+        "success_rate": float(results["successes"][mask].mean()),
+        "mean_return": float(returns.mean()),
+        "mean_optimal_return": float(optimal_returns.mean()),
+        "mean_optimality_gap": float((optimal_returns - returns).mean()),
+    }
@@ -0,0 +1,62 @@
+"""NumPy-only runner of the policy networks exported by `learner.export`.
+
+This module only imports NumPy, so that scoring workers can run a trained policy without loading
+torch nor stable_baselines3.
+"""
+
+import numpy as np
+from numpy._typing import ArrayLike, NDArray
+
+ACTIVATION_FUNCTIONS = {
+    "identity": lambda x: x,
+    "tanh": np.tanh,
+    "relu": lambda x: np.maximum(x, 0.0),
+}
+
+
+class NumpyPolicy:
+    """MLP policy executed with batched float32 matmuls.
+
+    Parameters:
+    - weights: Matrix of shape (input size, output size) of each linear layer.
+    - biases: Bias of each linear layer.
+    - activations: Name of the activation following each linear layer, in ACTIVATION_FUNCTIONS.
+    """
+
+    def __init__(
+        self, weights: list[NDArray], biases: list[NDArray], activations: list[str]
+    ) -> None:
+        if not len(weights) == len(biases) == len(activations):
+            raise ValueError("There must be one bias and one activation per weight matrix")
+        unknown_activations = set(activations) - set(ACTIVATION_FUNCTIONS)
+        if unknown_activations:
+            raise ValueError(f"Unknown activations: {sorted(unknown_activations)}")
+        self.weights = [np.ascontiguousarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.asarray(b, dtype=np.float32) for b in biases]
+        self.activations = [ACTIVATION_FUNCTIONS[name] for name in activations]
+
+    @classmethod
+    def load(cls, path: str) -> "NumpyPolicy":
+        """Load a policy saved by `learner.export.export_policy` in the "numpy" format."""
+        with np.load(path) as arrays:
+            activations = arrays["activations"].tolist()
+            return cls(
+                [arrays[f"weight_{i}"] for i in range(len(activations))],
+                [arrays[f"bias_{i}"] for i in range(len(activations))],
+                activations,
+            )
+
+    def logits(self, observations: ArrayLike) -> NDArray[np.float32]:
+        """Return the action logits or Q-values of a batch of observations."""
+        x = np.asarray(observations, dtype=np.float32)
+        for weight, bias, activation in zip(
+            self.weights, self.biases, self.activations, strict=True
+        ):
+            x = activation(x @ weight + bias)
+        return x
+
+    def predict(self, observations: ArrayLike) -> NDArray[np.int64]:
+        """Return the deterministic action of each observation of a batch, or of one observation."""
+        observations = np.asarray(observations)
+        actions = self.logits(np.atleast_2d(observations)).argmax(axis=1)
+        return actions if observations.ndim > 1 else actions[0]
@@ -0,0 +1,303 @@
+"""Offline datasets of protein design transitions and behavior cloning of SB3 policies.
+
+A dataset is a directory of NumPy files written and read as memory maps, so it can be larger than
+the memory: the int8 "observations" of shape (n_transitions, *observation shape), the uint8
+zero-based "actions" and the float32 discounted "returns" to go of each transition, with the
+episodes stored one after the other. The actions are the ones of `optimal_sequences` (the "solver"
+source) or of a saved model rolled out in a `BatchedEnvironment`. The env configuration of the
+episodes is recorded in the metadata, and a model is only pretrained on a dataset of its own env.
+
+Behavior cloning streams the dataset in chunks of contiguous transitions, visited in random order
+and shuffled in memory, and fits the policy of an actor-critic model to the actions by maximum
+likelihood and its value network to the returns, before the online training of the model.
+"""
+
+import json
+import os
+import time
+from collections.abc import Iterator
+
+import numpy as np
+import torch
+from numpy._typing import NDArray
+from stable_baselines3.common.evaluation import evaluate_policy
+from stable_baselines3.common.policies import ActorCriticPolicy
+
+from learner.env_config import env_kwargs
+from protein_design_env.batched_environment import BatchedEnvironment
+from protein_design_env.constants import (
+    DEFAULT_MOTIF,
+    DEFAULT_SEQUENCE_LENGTH,
+    MAX_MOTIF_LENGTH,
+    MAX_SEQUENCE_LENGTH,
+    MIN_MOTIF_LENGTH,
+    MIN_SEQUENCE_LENGTH,
+    NUM_AMINO_ACIDS,
+)
+from protein_design_env.motifs import held_out_motifs, motif_ids, optimal_sequences
+
+DATASET_FIELDS = {"observations": np.int8, "actions": np.uint8, "returns": np.float32}
+METADATA_FILE = "metadata.json"
+
+
+def sample_episodes(
+    n_episodes: int,
+    variable_motif: bool,
+    variable_length: bool,
+    held_out_motif_fraction: float = 0.0,
+    seed: int = 0,
+) -> tuple[NDArray[np.int64], NDArray[np.int64]]:
+    """Draw the motifs and sequence lengths of episodes as the training environment does.
+
+    Returns:
+        The motifs, of shape (n_episodes, MAX_MOTIF_LENGTH) padded with zeros, and the sequence
+        lengths of the episodes.
+    """
+    rng = np.random.default_rng(seed)
+    if variable_length:
+        lengths = rng.integers(MIN_SEQUENCE_LENGTH, MAX_SEQUENCE_LENGTH + 1, n_episodes)
+    else:
+        lengths = np.full(n_episodes, DEFAULT_SEQUENCE_LENGTH)
+    motifs = np.zeros((n_episodes, MAX_MOTIF_LENGTH), dtype=np.int64)
+    if not variable_motif:
+        motifs[:, : len(DEFAULT_MOTIF)] = [amino_acid.value for amino_acid in DEFAULT_MOTIF]
+        return motifs, lengths
+
+    held_out = held_out_motifs(held_out_motif_fraction) if held_out_motif_fraction > 0 else None
+    redraw = np.ones(n_episodes, dtype=bool)
+    while redraw.any():
+        n_redraws = int(redraw.sum())
+        motif_lengths = rng.integers(MIN_MOTIF_LENGTH, MAX_MOTIF_LENGTH + 1, n_redraws)
+        new_motifs = rng.integers(1, NUM_AMINO_ACIDS + 1, (n_redraws, MAX_MOTIF_LENGTH))
+        new_motifs[np.arange(MAX_MOTIF_LENGTH) >= motif_lengths[:, None]] = 0
+        motifs[redraw] = new_motifs
+        # Draw again the motifs kept for evaluation, as `Environment` does.
+        redraw[redraw] = held_out[motif_ids(new_motifs)] if held_out is not None else False
+    return motifs, lengths
+
+
+class OfflineDataset:
+    """Memory-mapped transitions of a dataset directory written by `build_dataset`.
+
+    Parameters:
+    - path: Directory of the dataset.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, METADATA_FILE)) as f:
+            self.metadata = json.load(f)
+        self.observations, self.actions, self.returns = (
+            np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in DATASET_FIELDS
+        )
+
+    def __len__(self) -> int:
+        """Return the number of transitions of the dataset."""
+        return len(self.actions)
+
+    def iter_batches(
+        self, batch_size: int, chunk_size: int = 65536, rng: np.random.Generator | None = None
+    ) -> Iterator[tuple[NDArray, NDArray, NDArray]]:
+        """Yield shuffled batches of (observations, actions, returns) covering the dataset once.
+
+        Only one chunk of `chunk_size` contiguous transitions is read in memory at a time. The
+        chunks are visited in random order and their transitions are shuffled, so consecutive
+        transitions of an episode end up in different batches.
+        """
+        rng = rng or np.random.default_rng()
+        starts = np.arange(0, len(self), chunk_size)
+        for start in rng.permutation(starts):
+            stop = min(start + chunk_size, len(self))
+            order = rng.permutation(stop - start)
+            observations = np.asarray(self.observations[start:stop])[order]
+            actions = np.asarray(self.actions[start:stop])[order]
+            returns = np.asarray(self.returns[start:stop])[order]
+            for i in range(0, len(order), batch_size):
+                batch = slice(i, i + batch_size)
+                yield observations[batch], actions[batch], returns[batch]
+
+
+def build_dataset(
+    path: str,
+    motifs: NDArray,
+    sequence_lengths: NDArray,
+    env_config: dict,
+    model=None,
+    deterministic: bool = True,
+    gamma: float = 0.99,
+    batch_size: int = 4096,
+) -> OfflineDataset:
+    """Record one episode per motif and sequence length into a dataset directory.
+
+    Parameters:
+    - path: Directory of the dataset, created if needed. Existing files are overwritten.
+    - motifs: Array of shape (n_episodes, MAX_MOTIF_LENGTH) of motifs padded with zeros.
+    - sequence_lengths: Sequence length of each episode.
+    - env_config: Env configuration of the episodes, see `learner.env_config.env_config`. Its
+      residues and target motifs are the ones of the recorded env, and it is saved in the metadata.
+    - model: SB3 model whose actions are recorded. By default, the actions are the ones of the
+      optimal sequences of `optimal_sequences`.
+    - deterministic: Whether the actions of the model are deterministic.
+    - gamma: Discount factor of the returns to go, the one of the model to pretrain.
+    - batch_size: Number of episodes played at once.
+
+    Returns:
+    - The dataset.
+
+    Raises:
+    - ValueError: If the actions of the solver are recorded for target motifs, which it does not
+      solve.
+    """
+    kwargs = env_kwargs(env_config)
+    if model is None and kwargs["motifs"] is not None:
+        raise ValueError("The solver source only supports the single motif env, not target motifs")
+    observation_shape = BatchedEnvironment(1, **kwargs).observation_space.shape
+    motifs = np.asarray(motifs, dtype=np.int64)
+    sequence_lengths = np.asarray(sequence_lengths, dtype=np.int64)
+    ends = np.cumsum(sequence_lengths)
+    os.makedirs(path, exist_ok=True)
+    arrays = {
+        name: np.lib.format.open_memmap(
+            os.path.join(path, f"{name}.npy"),
+            "w+",
+            dtype,
+            (int(ends[-1]), *(observation_shape if name == "observations" else ())),
+        )
+        for name, dtype in DATASET_FIELDS.items()
+    }
+    discounts = gamma ** np.arange(MAX_SEQUENCE_LENGTH)
+    rewards_total = 0.0
+    for batch_start in range(0, len(motifs), batch_size):
+        batch = slice(batch_start, batch_start + batch_size)
+        batch_motifs, lengths = motifs[batch], sequence_lengths[batch]
+        starts = ends[batch] - lengths
+        env = BatchedEnvironment(len(batch_motifs), **kwargs)
+        observations = env.set_episodes(batch_motifs, lengths)
+        if model is None:
+            solver_actions = optimal_sequences(batch_motifs, lengths) - 1
+        rewards = np.zeros((len(batch_motifs), lengths.max()))
+        for t in range(lengths.max()):
+            # Finished episodes are reset by the env, their transitions are not recorded.
+            active = t < lengths
+            if model is None:
+                actions = np.maximum(solver_actions[:, t], 0)
+            else:
+                actions, _ = model.predict(observations, deterministic=deterministic)
+            arrays["observations"][starts[active] + t] = observations[active]
+            arrays["actions"][starts[active] + t] = actions[active]
+            observations, step_rewards, _, _ = env.step(actions)
+            rewards[active, t] = step_rewards[active]
+        # Discounted sums of the rewards from each step to the end of the episode.
+        for t in range(lengths.max()):
+            active = t < lengths
+            returns = (rewards[:, t:] * discounts[: rewards.shape[1] - t]).sum(axis=1)
+            arrays["returns"][starts[active] + t] = returns[active]
+        rewards_total += rewards.sum()
+
+    for array in arrays.values():
+        array.flush()
+    metadata = {
+        "source": "solver" if model is None else "model",
+        "n_episodes": len(motifs),
+        "n_transitions": int(ends[-1]),
+        "gamma": gamma,
+        "mean_episode_return": rewards_total / len(motifs),
+        "env": env_config,
+    }
+    with open(os.path.join(path, METADATA_FILE), "w") as f:
+        json.dump(metadata, f, indent=2)
+    return OfflineDataset(path)
+
+
+def behavior_cloning(
+    model,
+    dataset: OfflineDataset,
+    n_epochs: int = 3,
+    batch_size: int = 512,
+    learning_rate: float = 1e-3,
+    value_coef: float = 0.5,
+    chunk_size: int = 65536,
+    seed: int = 0,
+) -> list[dict]:
+    """Pretrain the policy of an actor-critic SB3 model (PPO, A2C) on an offline dataset.
+
+    The loss is the negative log-likelihood of the dataset actions plus `value_coef` times the
+    squared error of the values to the dataset returns, minimized with Adam. The optimizer of the
+    model is not used, so its state does not carry over to the online training.
+
+    Returns:
+    - For each epoch, the mean loss, negative log-likelihood and value loss, the accuracy of the
+      most likely actions and the number of transitions per second.
+    """
+    policy = model.policy
+    if not isinstance(policy, ActorCriticPolicy):
+        raise ValueError("Behavior cloning requires an actor-critic policy (PPO or A2C)")
+    optimizer = torch.optim.Adam(policy.parameters(), lr=learning_rate)
+    rng = np.random.default_rng(seed)
+    policy.set_training_mode(True)
+    history = []
+    for epoch in range(n_epochs):
+        start = time.perf_counter()
+        sums = {"loss": 0.0, "nll": 0.0, "value_loss": 0.0, "accuracy": 0.0}
+        for observations, actions, returns in dataset.iter_batches(batch_size, chunk_size, rng):
+            observations = torch.as_tensor(observations, device=policy.device).float()
+            actions = torch.as_tensor(actions, device=policy.device).long()
+            returns = torch.as_tensor(returns, device=policy.device)
+            distribution = policy.get_distribution(observations)
+            nll = -distribution.log_prob(actions).mean()
+            value_loss = torch.nn.functional.mse_loss(
+                policy.predict_values(observations).flatten(), returns
+            )
+            loss = nll + value_coef * value_loss
+            optimizer.zero_grad()
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(policy.parameters(), model.max_grad_norm)
+            optimizer.step()
+
+            n = len(actions)
+            accuracy = (distribution.mode() == actions).float().mean()
+            for name, value in zip(sums, (loss, nll, value_loss, accuracy), strict=True):
+                sums[name] += value.item() * n
+        seconds = time.perf_counter() - start
+        history.append(
+            {
+                "epoch": epoch,
+                **{name: value / len(dataset) for name, value in sums.items()},
+                "transitions_per_second": len(dataset) / seconds,
+            }
+        )
+    policy.set_training_mode(False)
+    return history
+
+
+def timesteps_to_target(
+    model, eval_env, target_reward: float, max_timesteps: int, eval_freq: int, n_eval_episodes: int
+) -> dict:
+    """Train a model online until its mean evaluation reward reaches `target_reward`.
+
+    The model is evaluated before training, then after every `eval_freq` timesteps (rounded up to
+    whole rollouts by SB3) with deterministic actions.
+
+    Returns:
+    - The number of online timesteps to the target reward (None if it is not reached within
+      `max_timesteps`), the training time and the evaluation reward at each evaluation.
+    """
+    start = time.perf_counter()
+    history = []
+    timesteps = None
+    while True:
+        eval_reward, _ = evaluate_policy(
+            model, eval_env, n_eval_episodes=n_eval_episodes, deterministic=True
+        )
+        history.append({"timesteps": model.num_timesteps, "eval_reward": float(eval_reward)})
+        if eval_reward >= target_reward:
+            timesteps = model.num_timesteps
+            break
+        if model.num_timesteps >= max_timesteps:
+            break
+        model.learn(total_timesteps=eval_freq, reset_num_timesteps=False)
+    return {
+        "timesteps_to_target": timesteps,
+        "seconds": time.perf_counter() - start,
+        "history": history,
+    }
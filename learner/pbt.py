@@ -0,0 +1,282 @@
+"""Population-based training (PBT) of PPO agents in a local process pool.
+
+The members of the population are trained concurrently for `pbt_generation_timesteps` timesteps,
+then ranked by their mean evaluation reward. Each of the worst members copies the weights of one
+of the best members (exploit) and perturbs its hyperparameters (explore). Weights are exchanged
+through the checkpoint files of the members.
+"""
+
+import copy
+import math
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+import torch
+from stable_baselines3 import PPO
+from stable_baselines3.common.evaluation import evaluate_policy
+from stable_baselines3.common.utils import get_schedule_fn
+
+from learner.learner import Agent
+from learner.threads import PROCESS_CPUS
+
+# Hyperparameters explored by PBT, with the range of their log-uniform initial distribution.
+HYPERPARAMETER_RANGES = {
+    "learning_rate": (1e-4, 3e-3),
+    "ent_coef": (1e-4, 5e-2),
+    "clip_range": (0.1, 0.3),
+}
+PERTURBATION_FACTORS = (0.8, 1.2)
+
+
+@dataclass
+class Member:
+    """Member of the population.
+
+    Attributes:
+        member_id: Index of the member in the population.
+        hyperparameters: Current value of each hyperparameter of HYPERPARAMETER_RANGES.
+        checkpoint: Path of the saved model of the member.
+        num_timesteps: Number of timesteps of the model, including the ones of copied members.
+        eval_reward: Mean evaluation reward after the last generation.
+        history: Evaluation reward and hyperparameters of the member at each generation.
+    """
+
+    member_id: int
+    hyperparameters: dict[str, float]
+    checkpoint: str
+    num_timesteps: int = 0
+    eval_reward: float = -math.inf
+    history: list[dict] = field(default_factory=list)
+
+
+def sample_hyperparameters(rng: np.random.Generator) -> dict[str, float]:
+    """Draw hyperparameters log-uniformly in HYPERPARAMETER_RANGES."""
+    return {
+        name: float(np.exp(rng.uniform(np.log(low), np.log(high))))
+        for name, (low, high) in HYPERPARAMETER_RANGES.items()
+    }
+
+
+def perturb_hyperparameters(
+    hyperparameters: dict[str, float], rng: np.random.Generator
+) -> dict[str, float]:
+    """Multiply each hyperparameter by a random factor of PERTURBATION_FACTORS."""
+    return {
+        name: value * float(rng.choice(PERTURBATION_FACTORS))
+        for name, value in hyperparameters.items()
+    }
+
+
+def set_hyperparameters(model: PPO, hyperparameters: dict[str, float]) -> None:
+    """Set the PBT hyperparameters of a PPO model, which apply from its next update."""
+    model.learning_rate = hyperparameters["learning_rate"]
+    model._setup_lr_schedule()
+    model.ent_coef = hyperparameters["ent_coef"]
+    model.clip_range = get_schedule_fn(hyperparameters["clip_range"])
+
+
+def member_config(args, member: Member, seed: int):
+    """Return the configuration of the agent of a member, with its seed and thread layout.
+
+    Members share the cores of the machine: each one keeps a single torch thread, and with the
+    "split" affinity it is pinned to one CPU of the run, a different one for each member while
+    there are enough CPUs, rather than all of them to the first `torch_threads` CPUs.
+    """
+    args = copy.deepcopy(args)
+    args.seed = seed
+    args.torch_threads = 1
+    args.thread_autotune = False
+    if args.cpu_affinity == "split":
+        cpus = args.cpu_list or PROCESS_CPUS
+        args.cpu_list = [cpus[member.member_id % len(cpus)]]
+    return args
+
+
+def train_member(args, member: Member, seed: int) -> tuple[int, float]:
+    """Train a member for one generation from its checkpoint, evaluate it and save it.
+
+    Parameters:
+    - args: Configuration of the agents, with `pbt_generation_timesteps` and `pbt_eval_episodes`.
+    - member: Member to train. Its checkpoint is created if it does not exist.
+    - seed: Seed of the environments and of torch for this generation.
+
+    Returns:
+    - The number of timesteps of the model and its mean evaluation reward.
+    """
+    args = member_config(args, member, seed)
+    agent = Agent(args)
+    if os.path.exists(member.checkpoint):
+        agent.model = PPO.load(member.checkpoint, env=agent.env, device="cpu")
+    # Members run concurrently: no console nor tensorboard output.
+    agent.model.verbose = 0
+    agent.model.tensorboard_log = None
+    set_hyperparameters(agent.model, member.hyperparameters)
+
+    agent.model.learn(total_timesteps=args.pbt_generation_timesteps, reset_num_timesteps=False)
+    eval_reward, _ = evaluate_policy(
+        agent.model,
+        agent.make_env(agent.seed_plan.eval_seeds),
+        n_eval_episodes=args.pbt_eval_episodes,
+        deterministic=True,
+    )
+    agent.model.save(member.checkpoint)
+    return agent.model.num_timesteps, float(eval_reward)
+
+
+def _remove_checkpoints(population: list[Member]) -> None:
+    # Members start from scratch, not from the checkpoints of a previous run.
+    for member in population:
+        if os.path.exists(member.checkpoint):
+            os.remove(member.checkpoint)
+
+
+def _init_worker() -> None:
+    # Members share the cores of the machine.
+    torch.set_num_threads(1)
+
+
+def exploit_and_explore(
+    population: list[Member], exploit_fraction: float, rng: np.random.Generator
+) -> list[tuple[int, int]]:
+    """Replace the worst members by perturbed copies of the best ones.
+
+    Returns:
+    - The (replaced member, copied member) pairs.
+    """
+    ranking = sorted(population, key=lambda member: member.eval_reward, reverse=True)
+    n_replaced = min(max(1, int(exploit_fraction * len(population))), len(population) // 2)
+    copies = []
+    for member in ranking[len(ranking) - n_replaced :]:
+        source = ranking[rng.integers(n_replaced)]
+        shutil.copyfile(source.checkpoint, member.checkpoint)
+        member.hyperparameters = perturb_hyperparameters(source.hyperparameters, rng)
+        member.num_timesteps = source.num_timesteps
+        member.eval_reward = source.eval_reward
+        copies.append((member.member_id, source.member_id))
+    return copies
+
+
+def run_pbt(args, output_dir: str, initial_hyperparameters: list[dict] | None = None) -> dict:
+    """Train a population of PPO agents with PBT until the target reward or `args.timesteps`.
+
+    Parameters:
+    - args: Configuration of the agents and of PBT (`pbt_*` fields). Each member is trained for at
+      most `args.timesteps` timesteps.
+    - output_dir: Directory of the checkpoints of the members.
+    - initial_hyperparameters: Initial hyperparameters of each member. By default, they are drawn
+      with `sample_hyperparameters`.
+
+    Returns:
+    - The history of the generations, the wall-clock time to the target reward (None if it is not
+      reached) and the best member.
+
+    Raises:
+    - ValueError: If the algorithm is not PPO, or if there is no member or no generation to train.
+    """
+    if args.algo != "PPO":
+        raise ValueError(f"Population-based training only supports PPO, got {args.algo}")
+    n_generations = math.ceil(args.timesteps / args.pbt_generation_timesteps)
+    if n_generations < 1:
+        raise ValueError(
+            f"{args.timesteps} timesteps are not enough for one generation of "
+            f"{args.pbt_generation_timesteps} timesteps"
+        )
+    rng = np.random.default_rng(args.seed)
+    if initial_hyperparameters is None:
+        initial_hyperparameters = [
+            sample_hyperparameters(rng) for _ in range(args.pbt_population_size)
+        ]
+    if not initial_hyperparameters:
+        raise ValueError("The population has no member")
+    os.makedirs(output_dir, exist_ok=True)
+    population = [
+        Member(i, dict(hyperparameters), os.path.join(output_dir, f"member_{i}.zip"))
+        for i, hyperparameters in enumerate(initial_hyperparameters)
+    ]
+    _remove_checkpoints(population)
+    seeds = np.random.SeedSequence(args.seed).generate_state(n_generations * len(population))
+    seeds = seeds.reshape(n_generations, len(population))
+
+    start = time.perf_counter()
+    seconds_to_target = None
+    generations = []
+    with ProcessPoolExecutor(
+        len(population), multiprocessing.get_context("spawn"), initializer=_init_worker
+    ) as executor:
+        for generation in range(n_generations):
+            futures = [
+                executor.submit(train_member, args, member, int(seed))
+                for member, seed in zip(population, seeds[generation], strict=True)
+            ]
+            for member, future in zip(population, futures, strict=True):
+                member.num_timesteps, member.eval_reward = future.result()
+                member.history.append(
+                    {
+                        "generation": generation,
+                        "eval_reward": member.eval_reward,
+                        **member.hyperparameters,
+                    }
+                )
+            best = max(population, key=lambda member: member.eval_reward)
+            record = {
+                "generation": generation,
+                "seconds": time.perf_counter() - start,
+                "eval_rewards": [member.eval_reward for member in population],
+                "best_member": best.member_id,
+            }
+            generations.append(record)
+            if args.pbt_target_reward is not None and best.eval_reward >= args.pbt_target_reward:
+                seconds_to_target = record["seconds"]
+                break
+            if generation < n_generations - 1:
+                record["copies"] = exploit_and_explore(population, args.pbt_exploit_fraction, rng)
+
+    return {
+        "seconds_to_target": seconds_to_target,
+        "seconds": time.perf_counter() - start,
+        "generations": generations,
+        "best_member": {
+            "member_id": best.member_id,
+            "eval_reward": best.eval_reward,
+            "num_timesteps": best.num_timesteps,
+            "hyperparameters": best.hyperparameters,
+            "checkpoint": best.checkpoint,
+        },
+        "members": [member.history for member in population],
+    }
+
+
+def run_single(args, output_dir: str, hyperparameters: dict[str, float]) -> dict:
+    """Train one agent with fixed hyperparameters in this process, evaluated as a PBT member.
+
+    This is the sequential baseline of `run_pbt`: the agent is evaluated every
+    `pbt_generation_timesteps` timesteps until the target reward or `args.timesteps`.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    member = Member(0, dict(hyperparameters), os.path.join(output_dir, "single.zip"))
+    _remove_checkpoints([member])
+    n_generations = math.ceil(args.timesteps / args.pbt_generation_timesteps)
+    seeds = np.random.SeedSequence(args.seed).generate_state(n_generations)
+    start = time.perf_counter()
+    seconds_to_target = None
+    for seed in seeds:
+        member.num_timesteps, member.eval_reward = train_member(args, member, int(seed))
+        member.history.append(
+            {"seconds": time.perf_counter() - start, "eval_reward": member.eval_reward}
+        )
+        if args.pbt_target_reward is not None and member.eval_reward >= args.pbt_target_reward:
+            seconds_to_target = time.perf_counter() - start
+            break
+    return {
+        "seconds_to_target": seconds_to_target,
+        "seconds": time.perf_counter() - start,
+        "eval_reward": member.eval_reward,
+        "num_timesteps": member.num_timesteps,
+        "hyperparameters": member.hyperparameters,
+        "history": member.history,
+    }
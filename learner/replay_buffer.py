@@ -0,0 +1,138 @@
+"""Compact replay buffer for the protein design environment."""
+
+from typing import Any
+
+import numpy as np
+import torch as th
+from gymnasium import spaces
+from stable_baselines3.common.buffers import BaseBuffer, ReplayBuffer
+from stable_baselines3.common.type_aliases import ReplayBufferSamples
+from stable_baselines3.common.vec_env import VecNormalize
+
+from protein_design_env.amino_acids import AMINO_ACIDS_TO_CHARGES_ARRAY
+from protein_design_env.constants import (
+    OBS_CHARGE_INDEX,
+    OBS_SEQUENCE_LENGTH_INDEX,
+    OBS_SIZE,
+)
+
+
+class ProteinReplayBuffer(ReplayBuffer):
+    """Replay buffer storing protein design observations as int8 arrays.
+
+    Every entry of a protein design observation is a small integer (amino acid ids, lengths and
+    charge), so observations are stored as int8 instead of float64. The next observation is not
+    stored at all: a step only appends one amino acid to the sequence, so it is rebuilt from the
+    observation and the action when sampling. Terminal transitions are stored by SB3 with the
+    terminal observation as next observation, so the reconstruction also holds at episode ends.
+
+    Sampling draws the same random indices as `ReplayBuffer` and decodes observations back to the
+    observation space dtype, so training is identical to the default buffer.
+
+    Args:
+        buffer_size: Max number of transitions in the buffer.
+        observation_space: Observation space of the protein design environment.
+        action_space: Discrete action space of the protein design environment.
+        device: PyTorch device to which sampled tensors are moved.
+        n_envs: Number of parallel environments.
+        optimize_memory_usage: Ignored, the buffer never stores next observations.
+        handle_timeout_termination: Handle timeout termination separately.
+        charges: Formal charge of each one-based residue id, by default the standard amino acids
+            ones. Must be given for envs with another residue table.
+    """
+
+    def __init__(
+        self,
+        buffer_size: int,
+        observation_space: spaces.Space,
+        action_space: spaces.Space,
+        device: th.device | str = "auto",
+        n_envs: int = 1,
+        optimize_memory_usage: bool = False,
+        handle_timeout_termination: bool = True,
+        charges: np.ndarray | None = None,
+    ) -> None:
+        # Skip `ReplayBuffer.__init__` which allocates float64 obs and next obs arrays.
+        BaseBuffer.__init__(self, buffer_size, observation_space, action_space, device, n_envs)
+        if self.obs_shape != (OBS_SIZE,) or not isinstance(action_space, spaces.Discrete):
+            raise ValueError(
+                "ProteinReplayBuffer only supports the protein design observation and action spaces"
+            )
+
+        self.buffer_size = max(buffer_size // n_envs, 1)
+        self.optimize_memory_usage = False
+        self.handle_timeout_termination = handle_timeout_termination
+        self.charges = AMINO_ACIDS_TO_CHARGES_ARRAY if charges is None else np.asarray(charges)
+
+        self.observations = np.zeros((self.buffer_size, self.n_envs, OBS_SIZE), dtype=np.int8)
+        self.actions = np.zeros((self.buffer_size, self.n_envs), dtype=np.uint8)
+        self.rewards = np.zeros((self.buffer_size, self.n_envs), dtype=np.float32)
+        self.dones = np.zeros((self.buffer_size, self.n_envs), dtype=bool)
+        self.timeouts = np.zeros((self.buffer_size, self.n_envs), dtype=bool)
+
+    @property
+    def nbytes(self) -> int:
+        """Total memory allocated by the buffer arrays."""
+        return (
+            self.observations.nbytes
+            + self.actions.nbytes
+            + self.rewards.nbytes
+            + self.dones.nbytes
+            + self.timeouts.nbytes
+        )
+
+    def add(
+        self,
+        obs: np.ndarray,
+        next_obs: np.ndarray,
+        action: np.ndarray,
+        reward: np.ndarray,
+        done: np.ndarray,
+        infos: list[dict[str, Any]],
+    ) -> None:
+        """Add a transition, `next_obs` is dropped since it is rebuilt when sampling."""
+        self.observations[self.pos] = np.asarray(obs).reshape(self.n_envs, OBS_SIZE)
+        self.actions[self.pos] = np.asarray(action).reshape(self.n_envs)
+        self.rewards[self.pos] = np.asarray(reward)
+        self.dones[self.pos] = np.asarray(done)
+
+        if self.handle_timeout_termination:
+            self.timeouts[self.pos] = [info.get("TimeLimit.truncated", False) for info in infos]
+
+        self.pos += 1
+        if self.pos == self.buffer_size:
+            self.full = True
+            self.pos = 0
+
+    def _get_samples(
+        self, batch_inds: np.ndarray, env: VecNormalize | None = None
+    ) -> ReplayBufferSamples:
+        # Sample randomly the env idx, same draw as `ReplayBuffer._get_samples`.
+        env_indices = np.random.randint(0, high=self.n_envs, size=(len(batch_inds),))
+
+        obs = self.observations[batch_inds, env_indices]
+        actions = self.actions[batch_inds, env_indices]
+        dones = self.dones[batch_inds, env_indices] & ~self.timeouts[batch_inds, env_indices]
+
+        data = (
+            self._normalize_obs(self._decode(obs), env),
+            actions.astype(self.action_space.dtype).reshape(-1, 1),
+            self._normalize_obs(self._decode(self._next_observations(obs, actions)), env),
+            dones.astype(np.float32).reshape(-1, 1),
+            self._normalize_reward(self.rewards[batch_inds, env_indices].reshape(-1, 1), env),
+        )
+        return ReplayBufferSamples(*tuple(map(self.to_torch, data)))
+
+    def _decode(self, obs: np.ndarray) -> np.ndarray:
+        """Convert compact observations back to the observation space dtype."""
+        return obs.astype(self.observation_space.dtype)
+
+    def _next_observations(self, obs: np.ndarray, actions: np.ndarray) -> np.ndarray:
+        """Rebuild the next observations by appending the zero-based actions to the sequences."""
+        next_obs = obs.copy()
+        rows = np.arange(len(obs))
+        amino_acids = actions.astype(np.int8) + 1
+        next_obs[rows, obs[:, OBS_SEQUENCE_LENGTH_INDEX]] = amino_acids
+        next_obs[:, OBS_SEQUENCE_LENGTH_INDEX] += 1
+        next_obs[:, OBS_CHARGE_INDEX] += self.charges[amino_acids]
+        return next_obs
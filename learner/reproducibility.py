@@ -0,0 +1,70 @@
+"""Harness checking that training runs are reproducible from their seed."""
+
+import numpy as np
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.evaluation import evaluate_policy
+
+from learner.learner import Agent
+
+
+class RewardCurveCallback(BaseCallback):
+    """Record the return of every training episode, in the order they finish."""
+
+    def _on_training_start(self) -> None:
+        self.episode_returns: list[float] = []
+        self._running_returns = np.zeros(self.training_env.num_envs)
+
+    def _on_step(self) -> bool:
+        self._running_returns += self.locals["rewards"]
+        for env_idx in np.flatnonzero(self.locals["dones"]):
+            self.episode_returns.append(float(self._running_returns[env_idx]))
+            self._running_returns[env_idx] = 0.0
+        return True
+
+
+def run_training(args, n_eval_episodes: int = 10) -> dict[str, list[float]]:
+    """Train an agent without evaluation callback nor saving and return its reward curves.
+
+    Parameters:
+    - args: Configuration of the training job.
+    - n_eval_episodes: Number of episodes of the final evaluation on the eval env.
+
+    Returns:
+    - The training episode returns and the final evaluation episode returns.
+    """
+    agent = Agent(args)
+    recorder = RewardCurveCallback()
+    agent.model.learn(total_timesteps=args.timesteps, callback=recorder)
+    eval_returns, _ = evaluate_policy(
+        agent.model,
+        agent.make_env(agent.seed_plan.eval_seeds),
+        n_eval_episodes=n_eval_episodes,
+        deterministic=True,
+        return_episode_rewards=True,
+    )
+    return {"train": recorder.episode_returns, "eval": [float(r) for r in eval_returns]}
+
+
+def check_reproducibility(args, n_runs: int = 2) -> dict[str, list[float]]:
+    """Run the same training job `n_runs` times and assert that the reward curves are identical.
+
+    Raises:
+    - AssertionError: If a run differs from the first one, with the first differing episode.
+
+    Returns:
+    - The reward curves of the first run.
+    """
+    reference = run_training(args)
+    for run in range(1, n_runs):
+        curves = run_training(args)
+        for name, expected in reference.items():
+            actual = curves[name]
+            mismatches = [
+                i for i, (a, b) in enumerate(zip(expected, actual, strict=False)) if a != b
+            ]
+            if len(expected) != len(actual) or mismatches:
+                first = mismatches[0] if mismatches else min(len(expected), len(actual))
+                raise AssertionError(
+                    f"Run {run} differs from run 0: {name} curves diverge at episode {first}"
+                )
+    return reference
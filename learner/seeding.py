@@ -0,0 +1,66 @@
+"""Seed derivation for reproducible training runs."""
+
+import json
+import os
+import platform
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+import numpy as np
+import stable_baselines3
+import torch
+
+
+def _int_seed(seed_sequence: np.random.SeedSequence) -> int:
+    """Draw a 32 bits integer seed from a seed sequence."""
+    return int(seed_sequence.generate_state(1)[0])
+
+
+@dataclass(frozen=True)
+class SeedPlan:
+    """Independent seeds of the random streams of a training run.
+
+    The streams are derived from the root seed with `np.random.SeedSequence.spawn`, so the seed of
+    an env worker only depends on the root seed and on its index: adding env or eval workers does
+    not change the seeds of the other ones.
+
+    Parameters:
+    - root_seed: Seed from which all the streams are derived (`Config.seed`).
+    - env_seeds: Seed of each training env worker.
+    - eval_seeds: Seed of each evaluation env worker.
+    - torch_seed: Seed of torch, numpy and python global random generators.
+    """
+
+    root_seed: int
+    env_seeds: list[int] = field(default_factory=list)
+    eval_seeds: list[int] = field(default_factory=list)
+    torch_seed: int = 0
+
+    @classmethod
+    def from_seed(cls, seed: int, n_envs: int = 1, n_eval_envs: int = 1) -> "SeedPlan":
+        """Derive the seeds of `n_envs` env workers, `n_eval_envs` eval workers and torch."""
+        env_sequence, eval_sequence, torch_sequence = np.random.SeedSequence(seed).spawn(3)
+        return cls(
+            root_seed=seed,
+            env_seeds=[_int_seed(child) for child in env_sequence.spawn(n_envs)],
+            eval_seeds=[_int_seed(child) for child in eval_sequence.spawn(n_eval_envs)],
+            torch_seed=_int_seed(torch_sequence),
+        )
+
+    def manifest(self) -> dict[str, Any]:
+        """Return the run manifest: the seeds and the versions of the libraries drawing from them."""
+        return {
+            "seeds": asdict(self),
+            "versions": {
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "torch": torch.__version__,
+                "stable_baselines3": stable_baselines3.__version__,
+            },
+        }
+
+    def save_manifest(self, path: str) -> None:
+        """Write the run manifest as json."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.manifest(), f, indent=2)
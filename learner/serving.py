@@ -0,0 +1,626 @@
+"""Design request backends of a trained policy and a load generator measuring them.
+
+A design request is a motif of one-based amino acid ids and a sequence length. It is answered by
+the one-based amino acids of the sequence designed by the deterministic actions of the policy,
+through one of the generation backends, callables `generate(motif, sequence_length)`. The designs
+are played in the env of the `env_kwargs` keyword arguments of `BatchedEnvironment`, e.g. of
+`learner.env_config.env_kwargs`, with its residue alphabet and target motifs; the backends are:
+- "predict": `PredictDesigner`, one env and one policy call per amino acid for each request,
+- "batched": `BatchedDesigner`, which gathers the concurrent requests for up to `max_wait`
+  seconds or `max_batch_size` requests and designs them at once in a `BatchedEnvironment`,
+- "server": `http_designer`, the client of a local `DesignServer` answering with one of the other
+  backends.
+
+`run_load` replays requests against a backend, either at a fixed concurrency (closed loop: each
+client sends its next request when the previous one is answered) or at a Poisson arrival rate
+(open loop: latencies are measured from the scheduled arrivals, so a saturated backend is not
+hidden by clients waiting for it), and reports the throughput and the latency percentiles.
+"""
+
+import json
+import queue
+import resource
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from collections import Counter
+from collections.abc import Callable, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from numpy._typing import NDArray
+
+from learner.env_config import env_kwargs as config_env_kwargs
+from learner.export import ALGOS, export_policy
+from learner.metrics import process_rss_bytes
+from learner.offline import sample_episodes
+from protein_design_env.batched_environment import BatchedEnvironment
+from protein_design_env.constants import MAX_MOTIF_LENGTH, MAX_SEQUENCE_LENGTH
+from protein_design_env.residues import STANDARD_RESIDUES
+from protein_design_env.scoring import score_sequences
+
+POLICY_FORMATS = ("sb3", "torchscript", "numpy")
+LATENCY_PERCENTILES = (50, 90, 95, 99)
+# Number of failed requests whose errors are reported by `run_load`.
+MAX_REPORTED_ERRORS = 10
+
+DesignRequest = tuple[list[int], int]
+
+
+def load_predictor(
+    algo: str, model_path: str, policy_format: str = "sb3", env_kwargs: dict | None = None
+) -> Callable[[NDArray], NDArray]:
+    """Return the batched deterministic actions of a saved model run by one of POLICY_FORMATS.
+
+    The torchscript and numpy formats are exported from the saved model in a temporary directory.
+
+    Raises:
+    - ValueError: If the policy format is unknown, or if the observations or actions of the model
+      are not the ones of the env of `env_kwargs`.
+    """
+    if policy_format not in POLICY_FORMATS:
+        raise ValueError(f"Unknown policy format: {policy_format}")
+    model = ALGOS[algo].load(model_path, device="cpu")
+    env = BatchedEnvironment(1, **(env_kwargs or {}))
+    if (
+        model.observation_space.shape != env.observation_space.shape
+        or model.action_space.n != env.action_space.n
+    ):
+        raise ValueError(
+            f"The model of {model.observation_space.shape} observations and "
+            f"{model.action_space.n} actions is not one of the env of "
+            f"{env.observation_space.shape} observations and {env.action_space.n} actions"
+        )
+    if policy_format == "sb3":
+        # The policy stores the action distribution of its last call, so the calls of the client
+        # threads are serialized.
+        lock = threading.Lock()
+
+        def predict_sb3(observations: NDArray) -> NDArray:
+            with lock:
+                return model.predict(observations, deterministic=True)[0]
+
+        return predict_sb3
+    with tempfile.TemporaryDirectory() as export_dir:
+        path = export_policy(algo, model_path, export_dir, (policy_format,))[policy_format]
+        if policy_format == "numpy":
+            from learner.numpy_policy import NumpyPolicy
+
+            policy = NumpyPolicy.load(path)
+            return lambda observations: policy.predict(observations.astype(np.float32))
+        import torch
+
+        network = torch.jit.load(path)
+
+    def predict_torchscript(observations: NDArray) -> NDArray:
+        with torch.no_grad():
+            logits = network(torch.as_tensor(observations, dtype=torch.float32))
+        return logits.argmax(dim=1).numpy()
+
+    return predict_torchscript
+
+
+def check_request(motif: Sequence[int], sequence_length: int, env: BatchedEnvironment) -> None:
+    """Raise a ValueError if a design request is not valid in the env.
+
+    The motif must be made of the residues of the env, and be its first target motif if it has
+    target motifs.
+    """
+    if not 1 <= len(motif) <= MAX_MOTIF_LENGTH or not all(
+        1 <= residue <= env.residues.n_residues for residue in motif
+    ):
+        raise ValueError(f"Invalid motif: {motif}")
+    if env.targets is not None and list(motif) != list(env.targets.motifs[0]):
+        raise ValueError(f"The motif {motif} is not the first target motif of the env")
+    if not 1 <= sequence_length <= MAX_SEQUENCE_LENGTH:
+        raise ValueError(f"Invalid sequence length: {sequence_length}")
+
+
+def design_sequences(
+    predict: Callable[[NDArray], NDArray],
+    motifs: Sequence[Sequence[int]],
+    sequence_lengths: Sequence[int],
+    env: BatchedEnvironment | None = None,
+) -> list[list[int]]:
+    """Design one sequence per motif and sequence length with the actions of a policy.
+
+    Parameters:
+    - predict: Batched deterministic actions of the policy, e.g. of `load_predictor`.
+    - motifs: Motifs of one-based amino acid ids.
+    - sequence_lengths: Sequence length of each design.
+    - env: Batched env of one episode per design, reused across calls. A new one by default.
+    """
+    env = env or BatchedEnvironment(len(motifs))
+    padded = np.zeros((len(motifs), max(len(motif) for motif in motifs)), dtype=np.int64)
+    for i, motif in enumerate(motifs):
+        padded[i, : len(motif)] = motif
+    lengths = np.asarray(sequence_lengths, dtype=np.int64)
+    observations = env.set_episodes(padded, lengths)
+    sequences = np.zeros((len(motifs), lengths.max()), dtype=np.int64)
+    for t in range(lengths.max()):
+        actions = np.asarray(predict(observations))
+        sequences[:, t] = actions + 1
+        # Finished episodes are reset by the env, their next actions are dropped.
+        observations, _, _, _ = env.step(actions)
+    return [sequence[:length].tolist() for sequence, length in zip(sequences, lengths, strict=True)]
+
+
+class PredictDesigner:
+    """Design each request on its own, with a batch of one observation per policy call.
+
+    Parameters:
+    - predict: Batched deterministic actions of the policy.
+    - env_kwargs: Keyword arguments of the `BatchedEnvironment` of the designs.
+    """
+
+    def __init__(
+        self, predict: Callable[[NDArray], NDArray], env_kwargs: dict | None = None
+    ) -> None:
+        self.predict = predict
+        self.env_kwargs = env_kwargs or {}
+        # Env of the checks of the requests, whose residues and target motifs are not modified.
+        self._env = BatchedEnvironment(1, **self.env_kwargs)
+        # Env of each client thread.
+        self._local = threading.local()
+
+    def __call__(self, motif: Sequence[int], sequence_length: int) -> list[int]:
+        """Return the one-based amino acids designed for a request."""
+        check_request(motif, sequence_length, self._env)
+        if not hasattr(self._local, "env"):
+            self._local.env = BatchedEnvironment(1, **self.env_kwargs)
+        return design_sequences(self.predict, [motif], [sequence_length], self._local.env)[0]
+
+    def close(self) -> None:
+        """Nothing to release, for the interface of `BatchedDesigner`."""
+
+
+class BatchedDesigner:
+    """Design the concurrent requests together in a background thread.
+
+    The thread waits for a request, then gathers the next ones for up to `max_wait` seconds or
+    until `max_batch_size` requests, and designs them in one batched env. A request is blocked
+    until its batch is designed.
+
+    Parameters:
+    - predict: Batched deterministic actions of the policy.
+    - max_batch_size: Maximum number of requests designed at once.
+    - max_wait: Maximum time in seconds a request waits for other requests.
+    - env_kwargs: Keyword arguments of the `BatchedEnvironment` of the designs.
+    """
+
+    def __init__(
+        self,
+        predict: Callable[[NDArray], NDArray],
+        max_batch_size: int = 64,
+        max_wait: float = 0.002,
+        env_kwargs: dict | None = None,
+    ) -> None:
+        self.predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.env_kwargs = env_kwargs or {}
+        # Env of the checks of the requests, whose residues and target motifs are not modified.
+        self._env = BatchedEnvironment(1, **self.env_kwargs)
+        # Number of requests of each designed batch.
+        self.batch_sizes: list[int] = []
+        self._queue: queue.Queue = queue.Queue()
+        # Env of each batch size, since the number of episodes of an env is fixed.
+        self._envs: dict[int, BatchedEnvironment] = {}
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __call__(self, motif: Sequence[int], sequence_length: int) -> list[int]:
+        """Return the one-based amino acids designed for a request, once its batch is designed."""
+        check_request(motif, sequence_length, self._env)
+        future: Future = Future()
+        self._queue.put((motif, sequence_length, future))
+        return future.result()
+
+    def close(self) -> None:
+        """Design the queued requests and stop the thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+            batch = [request]
+            deadline = time.perf_counter() + self.max_wait
+            stop = False
+            while len(batch) < self.max_batch_size:
+                try:
+                    request = self._queue.get(timeout=max(deadline - time.perf_counter(), 0))
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                batch.append(request)
+            self._design(batch)
+            if stop:
+                return
+
+    def _design(self, batch: list) -> None:
+        n = len(batch)
+        if n not in self._envs:
+            self._envs[n] = BatchedEnvironment(n, **self.env_kwargs)
+        self.batch_sizes.append(n)
+        try:
+            sequences = design_sequences(
+                self.predict, [r[0] for r in batch], [r[1] for r in batch], self._envs[n]
+            )
+        except Exception as error:
+            for _, _, future in batch:
+                future.set_exception(error)
+        else:
+            for (_, _, future), sequence in zip(batch, sequences, strict=True):
+                future.set_result(sequence)
+
+
+def memory_usage() -> dict[str, int]:
+    """Return the current and maximum resident set size of the process, in bytes."""
+    try:
+        # The peak of the address space of the process: unlike ru_maxrss, it does not include the
+        # peak of the parent of a spawned server process.
+        with open("/proc/self/status") as f:
+            max_rss = next(int(line.split()[1]) * 1024 for line in f if line.startswith("VmHWM"))
+    except (OSError, StopIteration):
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes on Linux.
+        max_rss = max_rss if sys.platform == "darwin" else max_rss * 1024
+    return {"rss_bytes": process_rss_bytes(), "max_rss_bytes": max_rss}
+
+
+class DesignServer:
+    """Serve design requests on http://host:port in daemon threads.
+
+    POST /design with the json {"motif": [...], "sequence_length": n} answers {"sequence": [...]},
+    GET /stats answers the memory usage of the process and the batch sizes of a `BatchedDesigner`.
+
+    Parameters:
+    - designer: Backend designing the requests, e.g. a `BatchedDesigner`.
+    - port: Port of the server, a free one if 0.
+    - host: Host of the server.
+    """
+
+    def __init__(self, designer: Callable, port: int = 0, host: str = "127.0.0.1") -> None:
+        self.designer = designer
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:  # noqa: N802 - Name of the http.server API
+                if self.path != "/design":
+                    self.send_error(404)
+                    return
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                try:
+                    request = json.loads(body)
+                    sequence = server.designer(request["motif"], int(request["sequence_length"]))
+                except (KeyError, TypeError, ValueError) as error:
+                    self.send_error(400, str(error))
+                    return
+                self._send_json({"sequence": sequence})
+
+            def do_GET(self) -> None:  # noqa: N802 - Name of the http.server API
+                if self.path != "/stats":
+                    self.send_error(404)
+                    return
+                batch_sizes = getattr(server.designer, "batch_sizes", [])
+                self._send_json({"memory": memory_usage(), "batch_sizes": batch_sizes})
+
+            def _send_json(self, response: dict) -> None:
+                body = json.dumps(response).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                pass  # Requests are not logged.
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self) -> "DesignServer":
+        """Start serving the requests."""
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the server."""
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def make_designer(
+    predict: Callable[[NDArray], NDArray],
+    backend: str,
+    max_batch_size: int = 64,
+    max_wait: float = 0.002,
+    env_kwargs: dict | None = None,
+) -> PredictDesigner | BatchedDesigner:
+    """Return the in-process "predict" or "batched" backend of a policy."""
+    if backend == "predict":
+        return PredictDesigner(predict, env_kwargs)
+    if backend == "batched":
+        return BatchedDesigner(predict, max_batch_size, max_wait, env_kwargs)
+    raise ValueError(f"Unknown in-process backend: {backend}")
+
+
+def run_server(
+    algo: str,
+    model_path: str,
+    policy_format: str,
+    backend: str,
+    max_batch_size: int,
+    max_wait: float,
+    env_config: dict,
+    ready,
+) -> None:
+    """Serve a saved model with a `DesignServer` until the process is terminated.
+
+    This is the target of a server subprocess, which sends the url of the server to the `ready`
+    multiprocessing queue once it accepts requests. The designs are played in the env of the
+    `env_config` configuration, see `learner.env_config.env_config`.
+    """
+    env_kwargs = config_env_kwargs(env_config)
+    predict = load_predictor(algo, model_path, policy_format, env_kwargs)
+    designer = make_designer(predict, backend, max_batch_size, max_wait, env_kwargs)
+    server = DesignServer(designer).start()
+    ready.put(server.url)
+    threading.Event().wait()
+
+
+def check_url(url: str) -> None:
+    """Raise a ValueError if a server url is not an http or https one."""
+    if urllib.parse.urlparse(url).scheme not in ("http", "https"):
+        raise ValueError(f"Invalid server url: {url}")
+
+
+def http_designer(url: str, timeout: float = 60.0) -> Callable[[Sequence[int], int], list[int]]:
+    """Return the backend sending the requests to the `DesignServer` at `url`."""
+    check_url(url)
+
+    def design(motif: Sequence[int], sequence_length: int) -> list[int]:
+        body = json.dumps({"motif": list(motif), "sequence_length": sequence_length}).encode()
+        request = urllib.request.Request(  # noqa: S310 - Checked scheme
+            f"{url}/design", body, {"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=timeout) as response:  # noqa: S310
+            return json.loads(response.read())["sequence"]
+
+    return design
+
+
+def server_stats(url: str) -> dict:
+    """Return the memory usage and batch sizes of the `DesignServer` at `url`."""
+    check_url(url)
+    with urllib.request.urlopen(f"{url}/stats") as response:  # noqa: S310 - Checked scheme
+        return json.loads(response.read())
+
+
+def sample_requests(
+    n_requests: int,
+    variable_motif: bool = True,
+    variable_length: bool = True,
+    mix: list[dict] | None = None,
+    seed: int = 0,
+    env_kwargs: dict | None = None,
+) -> list[DesignRequest]:
+    """Draw design requests.
+
+    Parameters:
+    - n_requests: Number of requests.
+    - variable_motif, variable_length: Whether the motifs and sequence lengths are drawn as in the
+      training envs, else they are the default ones.
+    - mix: Requests drawn instead with probabilities proportional to their weights, as dicts of
+      a "motif" of one-letter codes, e.g. "RI", a "sequence_length" and an optional "weight".
+    - seed: Seed of the draws.
+    - env_kwargs: Keyword arguments of the `BatchedEnvironment` of the designs. The motifs are
+      drawn from its residues, or are its first target motif if it has target motifs.
+    """
+    if mix is None:
+        if env_kwargs is None:
+            motifs, lengths = sample_episodes(
+                n_requests, variable_motif, variable_length, seed=seed
+            )
+        else:
+            variable_motif = variable_motif and env_kwargs.get("motifs") is None
+            env = BatchedEnvironment(
+                n_requests, variable_motif, variable_length, seed=seed, **env_kwargs
+            )
+            env.reset()
+            motifs, lengths = env.motifs, env.sequence_lengths
+        return [
+            (motif[motif > 0].tolist(), int(n)) for motif, n in zip(motifs, lengths, strict=True)
+        ]
+    residues = (env_kwargs or {}).get("residues") or STANDARD_RESIDUES
+    weights = np.array([entry.get("weight", 1.0) for entry in mix], dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    choices = rng.choice(len(mix), n_requests, p=weights / weights.sum())
+    requests = [(residues.encode(entry["motif"]), int(entry["sequence_length"])) for entry in mix]
+    return [requests[i] for i in choices]
+
+
+def replay_returns(
+    sequences: NDArray, motifs: NDArray, sequence_lengths: NDArray, env_kwargs: dict
+) -> NDArray:
+    """Return the returns of designed sequences replayed in the env of `env_kwargs`.
+
+    Parameters:
+    - sequences: Array of shape (n_sequences, max_length) of one-based amino acid ids.
+    - motifs: Array of shape (n_sequences, motif_length) of motifs padded with zeros.
+    - sequence_lengths: Sequence length of each design.
+    - env_kwargs: Keyword arguments of the `BatchedEnvironment` of the designs.
+    """
+    env = BatchedEnvironment(len(sequences), **env_kwargs)
+    env.set_episodes(motifs, sequence_lengths)
+    returns = np.zeros(len(sequences))
+    for t in range(sequence_lengths.max()):
+        active = t < sequence_lengths
+        # Finished episodes are reset by the env, their next rewards are dropped.
+        _, rewards, _, _ = env.step(np.maximum(sequences[:, t] - 1, 0))
+        returns[active] += rewards[active]
+    return returns
+
+
+def run_load(
+    designer: Callable[[Sequence[int], int], list[int]],
+    requests: Sequence[DesignRequest],
+    concurrency: int = 1,
+    arrival_rate: float | None = None,
+    seed: int = 0,
+    env_kwargs: dict | None = None,
+) -> dict:
+    """Replay design requests against a backend and measure it.
+
+    Parameters:
+    - designer: Generation backend.
+    - requests: (motif, sequence_length) requests, sent in order.
+    - concurrency: Number of client threads.
+    - arrival_rate: Requests per second of the Poisson arrivals of the open loop. The loop is
+      closed if None: each client thread sends its next request once answered.
+    - seed: Seed of the arrival times.
+    - env_kwargs: Keyword arguments of the `BatchedEnvironment` the designs are replayed in for
+      their returns. They are scored in the default env if None.
+
+    Returns:
+    - The number of requests and of failed requests, the exception type and message of the first
+      MAX_REPORTED_ERRORS failed requests and the number of failures of each exception type, the
+      duration, the requests and designed amino acids per second, the latency percentiles in
+      milliseconds, and the mean return of the designs in the env.
+    """
+    n_requests = len(requests)
+    if arrival_rate is None:
+        arrivals = None
+    else:
+        gaps = np.random.default_rng(seed).exponential(1 / arrival_rate, n_requests)
+        arrivals = np.cumsum(gaps) - gaps[0]
+    sequences, latencies, failures, seconds = send_requests(
+        designer, requests, concurrency, arrivals
+    )
+    answered = [i for i in range(n_requests) if sequences[i] is not None]
+    answered_latencies = 1000 * latencies[answered]
+    latency_ms = {"mean": None, "max": None}
+    if answered:
+        percentiles = np.percentile(answered_latencies, LATENCY_PERCENTILES)
+        latency_ms = {
+            **{f"p{p}": float(v) for p, v in zip(LATENCY_PERCENTILES, percentiles, strict=True)},
+            "mean": float(np.mean(answered_latencies)),
+            "max": float(np.max(answered_latencies)),
+        }
+    return {
+        "n_requests": n_requests,
+        "n_errors": n_requests - len(answered),
+        **error_report(failures),
+        "concurrency": concurrency,
+        "arrival_rate": arrival_rate,
+        "seconds": seconds,
+        "requests_per_second": len(answered) / seconds,
+        "amino_acids_per_second": sum(len(sequences[i]) for i in answered) / seconds,
+        "latency_ms": latency_ms,
+        "mean_return": mean_return(
+            [requests[i] for i in answered], [sequences[i] for i in answered], env_kwargs
+        ),
+    }
+
+
+def send_requests(
+    designer: Callable[[Sequence[int], int], list[int]],
+    requests: Sequence[DesignRequest],
+    concurrency: int,
+    arrivals: NDArray | None,
+) -> tuple[list[list[int] | None], NDArray, dict[int, Exception], float]:
+    """Send design requests to a backend from client threads.
+
+    Parameters:
+    - designer: Generation backend.
+    - requests: (motif, sequence_length) requests, sent in order.
+    - concurrency: Number of client threads.
+    - arrivals: Arrival time in seconds of each request of the open loop, or None for the closed
+      loop.
+
+    Returns:
+    - The designed sequence of each request, None if it failed, the latency of each request in
+      seconds, the exception of each failed request, and the duration of the run in seconds.
+    """
+    n_requests = len(requests)
+    latencies = np.full(n_requests, np.nan)
+    sequences: list[list[int] | None] = [None] * n_requests
+    failures: dict[int, Exception] = {}
+    next_request = iter(range(n_requests))
+    lock = threading.Lock()
+
+    def send(i: int, sent: float) -> None:
+        try:
+            sequences[i] = designer(*requests[i])
+        except Exception as error:
+            failures[i] = error
+            return
+        latencies[i] = time.perf_counter() - sent
+
+    def client() -> None:
+        while True:
+            with lock:
+                i = next(next_request, None)
+            if i is None:
+                return
+            send(i, time.perf_counter())
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        if arrivals is None:
+            for _ in range(concurrency):
+                executor.submit(client)
+        else:
+            for i, arrival in enumerate(arrivals):
+                time.sleep(max(start + arrival - time.perf_counter(), 0))
+                # The latency includes the time waiting for a free client thread.
+                executor.submit(send, i, start + arrival)
+    return sequences, latencies, failures, time.perf_counter() - start
+
+
+def error_report(failures: dict[int, Exception]) -> dict:
+    """Return the errors of the first MAX_REPORTED_ERRORS failed requests and their type counts.
+
+    The error of a request is the index of the request and the type and message of its exception.
+    """
+    errors = [
+        {"request": i, "type": type(failures[i]).__name__, "message": str(failures[i])}
+        for i in sorted(failures)[:MAX_REPORTED_ERRORS]
+    ]
+    error_types = Counter(type(error).__name__ for error in failures.values())
+    return {"errors": errors, "error_types": dict(error_types)}
+
+
+def mean_return(
+    requests: Sequence[DesignRequest],
+    sequences: Sequence[list[int]],
+    env_kwargs: dict | None = None,
+) -> float | None:
+    """Return the mean return of the designed sequences of requests, None if there are none.
+
+    The sequences are replayed in the env of `env_kwargs`, or scored in the default env if None.
+    """
+    if not requests:
+        return None
+    lengths = np.array([sequence_length for _, sequence_length in requests])
+    padded_sequences = np.zeros((len(requests), lengths.max()), dtype=np.int64)
+    motifs = np.zeros((len(requests), max(len(motif) for motif, _ in requests)), np.int64)
+    for row, ((motif, _), sequence) in enumerate(zip(requests, sequences, strict=True)):
+        padded_sequences[row, : len(sequence)] = sequence
+        motifs[row, : len(motif)] = motif
+    if env_kwargs is None:
+        returns = score_sequences(padded_sequences, motifs, lengths).returns
+    else:
+        returns = replay_returns(padded_sequences, motifs, lengths, env_kwargs)
+    return float(returns.mean())
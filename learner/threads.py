@@ -0,0 +1,235 @@
+"""Thread and CPU layout of the learner process and of the subprocess env workers.
+
+A `ThreadLayout` sets the torch intra-op and inter-op threads and the BLAS threads of the learner,
+and optionally pins the learner and the env workers to disjoint sets of CPUs, so that torch
+threads do not contend with the env workers. The layout only uses the `cpu_list` CPUs of its run:
+the parallel jobs of a `main.py -m` sweep are given disjoint ones by `sweep_cpus`, and other runs
+sharing the machine are given theirs on the command line.
+
+The BLAS threads are limited with `threadpoolctl` if it is installed. The OMP_NUM_THREADS,
+OPENBLAS_NUM_THREADS and MKL_NUM_THREADS variables are also set, so processes started afterwards,
+such as the env workers, are limited as well.
+
+`autotune_layout` times a short rollout and a few policy updates with each candidate layout and
+keeps the fastest one for the current machine.
+"""
+
+import copy
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, replace
+
+import numpy as np
+import torch
+from stable_baselines3.common.policies import ActorCriticPolicy
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecEnv
+
+BLAS_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+AFFINITY_MODES = ("none", "split")
+# Workload of the benchmark of each candidate layout.
+AUTOTUNE_ROLLOUT_STEPS = 512
+AUTOTUNE_UPDATES = 32
+AUTOTUNE_BATCH_SIZE = 256
+
+logger = logging.getLogger(__name__)
+
+
+def available_cpus() -> tuple[int, ...]:
+    """Return the CPUs the process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return tuple(sorted(os.sched_getaffinity(0)))
+    return tuple(range(os.cpu_count() or 1))
+
+
+# CPUs of the process before a layout pins it to a subset of them.
+PROCESS_CPUS = available_cpus()
+
+
+def sweep_cpus(job_num: int, n_jobs: int, cpus: tuple[int, ...] = PROCESS_CPUS) -> tuple[int, ...]:
+    """Return the CPUs of a job of a sweep running `n_jobs` jobs at once.
+
+    The CPUs are split in `n_jobs` contiguous parts, and consecutive jobs get consecutive parts, so
+    the jobs running at once have disjoint CPUs. With more jobs than CPUs, the jobs share them.
+    """
+    if n_jobs < 1:
+        raise ValueError(f"Invalid number of jobs: {n_jobs}")
+    n_parts = min(n_jobs, len(cpus))
+    part = (job_num % n_jobs) % n_parts
+    return tuple(int(cpu) for cpu in np.array_split(np.array(cpus), n_parts)[part])
+
+
+@dataclass(frozen=True)
+class ThreadLayout:
+    """Threads of the learner process and CPUs of the learner and of the env workers.
+
+    Parameters:
+    - torch_threads: Torch intra-op threads of the learner.
+    - interop_threads: Torch inter-op threads of the learner, None for the torch default.
+    - blas_threads: BLAS threads of the learner and env workers, None for the library default.
+    - cpus: CPUs available to the run.
+    - learner_cpus: CPUs of the learner process, all the `cpus` if empty.
+    - env_cpus: CPUs of the subprocess env workers, all the `cpus` if empty.
+    """
+
+    torch_threads: int
+    interop_threads: int | None = None
+    blas_threads: int | None = None
+    cpus: tuple[int, ...] = ()
+    learner_cpus: tuple[int, ...] = ()
+    env_cpus: tuple[int, ...] = ()
+
+    @classmethod
+    def from_config(cls, args, cpus: tuple[int, ...] | None = None) -> "ThreadLayout":
+        """Return the layout of the thread, `cpu_list` and `cpu_affinity` fields of a configuration.
+
+        The torch threads default to the current ones and the CPUs to the `cpu_list` of the run,
+        else to the ones of the process at import time, before any layout was applied. With the
+        "split" affinity, the learner is pinned to the first `torch_threads` CPUs of the run and
+        the env workers to the other ones. If no CPU is left, the env workers share the learner
+        CPUs.
+        """
+        if args.cpu_list:
+            unknown_cpus = set(args.cpu_list) - set(PROCESS_CPUS)
+            if unknown_cpus:
+                raise ValueError(f"CPUs {sorted(unknown_cpus)} are not available to the process")
+        cpus = cpus or tuple(args.cpu_list or PROCESS_CPUS)
+        layout = cls(
+            torch_threads=args.torch_threads or torch.get_num_threads(),
+            interop_threads=args.torch_interop_threads,
+            blas_threads=args.blas_threads,
+            cpus=cpus,
+        )
+        if args.cpu_affinity not in AFFINITY_MODES:
+            raise ValueError(f"Unknown CPU affinity mode: {args.cpu_affinity}")
+        return layout.split() if args.cpu_affinity == "split" else layout
+
+    def split(self) -> "ThreadLayout":
+        """Return the layout with the learner and the env workers on disjoint CPUs."""
+        learner_cpus = self.cpus[: self.torch_threads]
+        return replace(
+            self, learner_cpus=learner_cpus, env_cpus=self.cpus[len(learner_cpus) :] or learner_cpus
+        )
+
+    def apply(self) -> None:
+        """Set the threads and the CPU affinity of the current process."""
+        torch.set_num_threads(self.torch_threads)
+        if self.interop_threads is not None and self.interop_threads != (
+            torch.get_num_interop_threads()
+        ):
+            try:
+                torch.set_num_interop_threads(self.interop_threads)
+            except RuntimeError as error:
+                # Torch only allows it once, before any inter-op parallel work.
+                logger.warning(f"Torch inter-op threads not set: {error}")
+        if self.blas_threads is not None:
+            for name in BLAS_ENV_VARS:
+                os.environ[name] = str(self.blas_threads)
+            try:
+                from threadpoolctl import threadpool_limits
+            except ImportError:
+                pass
+            else:
+                threadpool_limits(self.blas_threads, user_api="blas")
+        if hasattr(os, "sched_setaffinity") and self.cpus:
+            os.sched_setaffinity(0, self.learner_cpus or self.cpus)
+
+    def pin_env_workers(self, env) -> None:
+        """Set the CPU affinity of the worker processes of a `SubprocVecEnv`."""
+        if not isinstance(env, SubprocVecEnv) or not hasattr(os, "sched_setaffinity"):
+            return
+        for process in env.processes:
+            os.sched_setaffinity(process.pid, self.env_cpus or self.cpus)
+
+    def manifest(self) -> dict:
+        """Return the layout as a json serializable dict."""
+        return {name: list(v) if isinstance(v, tuple) else v for name, v in asdict(self).items()}
+
+    def save(self, path: str, benchmark: list[dict] | None = None) -> None:
+        """Write the layout, and the autotuning benchmark if any, as json."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"layout": self.manifest(), "benchmark": benchmark}, f, indent=2)
+
+
+def candidate_layouts(base: ThreadLayout, subproc_envs: bool) -> list[ThreadLayout]:
+    """Return the layouts compared by `autotune_layout`.
+
+    The torch threads are 1, 2, 4, half and all of the CPUs, and, with subprocess env workers,
+    each thread count is tried with and without splitting the CPUs between learner and workers.
+    """
+    n_cpus = len(base.cpus)
+    thread_counts = sorted({n for n in (1, 2, 4, n_cpus // 2, n_cpus) if 1 <= n <= n_cpus})
+    layouts = []
+    for torch_threads in thread_counts:
+        layout = replace(base, torch_threads=torch_threads, learner_cpus=(), env_cpus=())
+        layouts.append(layout)
+        if subproc_envs and torch_threads < n_cpus:
+            layouts.append(layout.split())
+    return layouts
+
+
+def _benchmark_loss(policy, observations: torch.Tensor, actions: torch.Tensor) -> torch.Tensor:
+    if isinstance(policy, ActorCriticPolicy):
+        values, log_prob, _ = policy.evaluate_actions(observations, actions)
+        return values.pow(2).mean() - log_prob.mean()
+    return policy.q_net(observations).pow(2).mean()
+
+
+def benchmark_layout(layout: ThreadLayout, make_env, policy) -> float:
+    """Return the time of a short rollout and of a few policy updates with a layout.
+
+    Parameters:
+    - layout: Layout applied to this process and to the workers of the env.
+    - make_env: Callable creating the training env, closed after the rollout.
+    - policy: SB3 policy, copied for the updates so it is not modified. Its actions are
+      deterministic, so the benchmark does not draw from the torch random generator.
+    """
+    layout.apply()
+    env = make_env()
+    layout.pin_env_workers(env)
+    if not isinstance(env, VecEnv):
+        single_env = env
+        env = DummyVecEnv([lambda: single_env])
+    observations = [env.reset()]
+    start = time.perf_counter()
+    for _ in range(AUTOTUNE_ROLLOUT_STEPS // env.num_envs):
+        actions, _ = policy.predict(observations[-1], deterministic=True)
+        observations.append(env.step(actions)[0])
+    env.close()
+
+    policy = copy.deepcopy(policy)
+    optimizer = torch.optim.Adam(policy.parameters(), lr=1e-4)
+    observations = torch.as_tensor(np.concatenate(observations), device=policy.device).float()
+    rng = np.random.default_rng(0)
+    for _ in range(AUTOTUNE_UPDATES):
+        batch = observations[rng.integers(0, len(observations), AUTOTUNE_BATCH_SIZE)]
+        actions = torch.as_tensor(rng.integers(0, policy.action_space.n, len(batch)))
+        loss = _benchmark_loss(policy, batch, actions.to(policy.device))
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+    return time.perf_counter() - start
+
+
+def autotune_layout(
+    base: ThreadLayout, make_env, policy, subproc_envs: bool
+) -> tuple[ThreadLayout, list[dict]]:
+    """Benchmark the candidate layouts, then apply and return the fastest one.
+
+    Returns:
+    - The fastest layout and the time of each candidate, not measured if there is only one.
+    """
+    layouts = candidate_layouts(base, subproc_envs)
+    if len(layouts) == 1:
+        layouts[0].apply()
+        return layouts[0], []
+    results = []
+    for layout in layouts:
+        seconds = benchmark_layout(layout, make_env, policy)
+        results.append({"layout": layout.manifest(), "seconds": seconds})
+        logger.info(f"Thread layout {layout.manifest()}: {seconds:.3f} s")
+    best = layouts[int(np.argmin([result["seconds"] for result in results]))]
+    best.apply()
+    return best, results
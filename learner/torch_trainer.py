@@ -0,0 +1,215 @@
+"""Lightweight PPO trainer running rollouts and updates entirely with torch tensors."""
+
+from dataclasses import dataclass
+
+import torch
+import torch.nn as nn
+from torch.distributions import Categorical
+
+from protein_design_env.torch_environment import TorchBatchedEnvironment
+
+
+class ActorCritic(nn.Module):
+    """Separate policy and value MLPs, as the default SB3 `MlpPolicy`."""
+
+    def __init__(self, observation_size: int, n_actions: int, net_arch: list[int]) -> None:
+        super().__init__()
+
+        def mlp(output_size: int) -> nn.Sequential:
+            layers: list[nn.Module] = []
+            input_size = observation_size
+            for size in net_arch:
+                layers += [nn.Linear(input_size, size), nn.Tanh()]
+                input_size = size
+            return nn.Sequential(*layers, nn.Linear(input_size, output_size))
+
+        self.policy_net = mlp(n_actions)
+        self.value_net = mlp(1)
+
+    def forward(self, observations: torch.Tensor) -> tuple[torch.Tensor, torch.Tensor]:
+        """Return the action logits and the values of a batch of observations."""
+        return self.policy_net(observations), self.value_net(observations).squeeze(-1)
+
+
+@dataclass
+class Rollout:
+    """Tensors of shape (n_steps, n_envs, ...) collected during a rollout."""
+
+    observations: torch.Tensor
+    actions: torch.Tensor
+    log_probs: torch.Tensor
+    values: torch.Tensor
+    rewards: torch.Tensor
+    dones: torch.Tensor
+
+
+class TorchPPOTrainer:
+    """PPO trainer on a `TorchBatchedEnvironment`, without any NumPy conversion.
+
+    The hyperparameters follow SB3's PPO. The policy and the env step can be compiled with
+    `torch.compile`.
+
+    Parameters:
+    - env: Torch environment on which the policy is trained.
+    - n_steps: Number of steps per env of each rollout.
+    - batch_size: Minibatch size of the updates.
+    - n_epochs: Number of passes over each rollout.
+    - learning_rate, gamma, gae_lambda, clip_range, ent_coef, vf_coef, max_grad_norm: As in SB3.
+    - net_arch: Hidden layers of the policy and value MLPs.
+    - compile: Compile the policy and the env step with `torch.compile`.
+    - seed: Seed of the policy initialization and of the action sampling.
+    - length_bucketing: Collect each rollout as one bucket of complete episodes sharing the same
+      sequence length, drawn as in the env, instead of `n_steps` steps of out of sync episodes.
+      Rollouts have no auto-reset boundary nor truncated episode, and minibatches only contain
+      episodes of one length.
+    """
+
+    def __init__(
+        self,
+        env: TorchBatchedEnvironment,
+        n_steps: int = 16,
+        batch_size: int = 256,
+        n_epochs: int = 4,
+        learning_rate: float = 3e-4,
+        gamma: float = 0.99,
+        gae_lambda: float = 0.95,
+        clip_range: float = 0.2,
+        ent_coef: float = 0.0,
+        vf_coef: float = 0.5,
+        max_grad_norm: float = 0.5,
+        net_arch: list[int] | None = None,
+        compile: bool = False,
+        seed: int = 0,
+        length_bucketing: bool = False,
+    ) -> None:
+        self.env = env
+        self.n_steps = n_steps
+        self.length_bucketing = length_bucketing
+        self.batch_size = batch_size
+        self.n_epochs = n_epochs
+        self.gamma = gamma
+        self.gae_lambda = gae_lambda
+        self.clip_range = clip_range
+        self.ent_coef = ent_coef
+        self.vf_coef = vf_coef
+        self.max_grad_norm = max_grad_norm
+
+        torch.manual_seed(seed)
+        self.policy = ActorCritic(env.observation_size, env.n_actions, net_arch or [64, 64]).to(
+            env.device
+        )
+        self.optimizer = torch.optim.Adam(self.policy.parameters(), lr=learning_rate, eps=1e-5)
+        self.forward = torch.compile(self.policy) if compile else self.policy
+        self.env_step = torch.compile(env.step) if compile else env.step
+
+        self.num_timesteps = 0
+        self.episode_returns: list[float] = []
+        self._observations = env.reset(seed=seed)
+        self._running_returns = torch.zeros(env.n_envs, dtype=torch.float64, device=env.device)
+
+    def learn(self, total_timesteps: int) -> "TorchPPOTrainer":
+        """Alternate rollouts and updates until `total_timesteps` env steps are collected."""
+        while self.num_timesteps < total_timesteps:
+            if self.length_bucketing:
+                rollout = self.collect_length_bucket()
+            else:
+                rollout = self.collect_rollout()
+            advantages, returns = self.compute_advantages(rollout)
+            self.update(rollout, advantages, returns)
+        return self
+
+    def collect_length_bucket(self) -> Rollout:
+        """Play one complete episode of the same sequence length in every env."""
+        sequence_length = self.env.sample_sequence_length()
+        self._observations = self.env.reset_with_sequence_length(sequence_length)
+        self._running_returns.zero_()
+        return self.collect_rollout(n_steps=sequence_length)
+
+    @torch.no_grad()
+    def collect_rollout(self, n_steps: int | None = None) -> Rollout:
+        """Play `n_steps` steps in every env with the current policy (default: `self.n_steps`)."""
+        n_steps = n_steps or self.n_steps
+        shape = (n_steps, self.env.n_envs)
+        device = self.env.device
+        rollout = Rollout(
+            observations=torch.zeros((*shape, self.env.observation_size), device=device),
+            actions=torch.zeros(shape, dtype=torch.long, device=device),
+            log_probs=torch.zeros(shape, device=device),
+            values=torch.zeros(shape, device=device),
+            rewards=torch.zeros(shape, device=device),
+            dones=torch.zeros(shape, dtype=torch.bool, device=device),
+        )
+        finished_returns = []
+        for step in range(n_steps):
+            logits, values = self.forward(self._observations)
+            distribution = Categorical(logits=logits)
+            actions = distribution.sample()
+            rollout.observations[step] = self._observations
+            rollout.actions[step] = actions
+            rollout.log_probs[step] = distribution.log_prob(actions)
+            rollout.values[step] = values
+
+            self._observations, rewards, dones = self.env_step(actions)
+            rollout.rewards[step] = rewards
+            rollout.dones[step] = dones
+            self._running_returns += rewards
+            finished_returns.append(self._running_returns[dones])
+            self._running_returns = torch.where(dones, 0.0, self._running_returns)
+
+        self.num_timesteps += n_steps * self.env.n_envs
+        self.episode_returns.extend(torch.cat(finished_returns).tolist())
+        return rollout
+
+    @torch.no_grad()
+    def compute_advantages(self, rollout: Rollout) -> tuple[torch.Tensor, torch.Tensor]:
+        """Compute the GAE advantages and the returns of a rollout."""
+        _, next_values = self.forward(self._observations)
+        advantages = torch.zeros_like(rollout.rewards)
+        last_advantage = torch.zeros_like(next_values)
+        for step in reversed(range(len(rollout.rewards))):
+            next_non_terminal = (~rollout.dones[step]).float()
+            delta = (
+                rollout.rewards[step]
+                + self.gamma * next_values * next_non_terminal
+                - rollout.values[step]
+            )
+            last_advantage = (
+                delta + self.gamma * self.gae_lambda * next_non_terminal * last_advantage
+            )
+            advantages[step] = last_advantage
+            next_values = rollout.values[step]
+        return advantages, advantages + rollout.values
+
+    def update(self, rollout: Rollout, advantages: torch.Tensor, returns: torch.Tensor) -> None:
+        """Run `n_epochs` epochs of clipped PPO updates on minibatches of the rollout."""
+        observations = rollout.observations.flatten(0, 1)
+        actions = rollout.actions.flatten()
+        old_log_probs = rollout.log_probs.flatten()
+        advantages = advantages.flatten()
+        returns = returns.flatten()
+        n_samples = len(actions)
+        for _ in range(self.n_epochs):
+            for indices in torch.randperm(n_samples, device=self.env.device).split(self.batch_size):
+                logits, values = self.forward(observations[indices])
+                distribution = Categorical(logits=logits)
+                log_probs = distribution.log_prob(actions[indices])
+                batch_advantages = advantages[indices]
+                batch_advantages = (batch_advantages - batch_advantages.mean()) / (
+                    batch_advantages.std() + 1e-8
+                )
+                ratio = torch.exp(log_probs - old_log_probs[indices])
+                policy_loss = -torch.min(
+                    batch_advantages * ratio,
+                    batch_advantages * ratio.clamp(1 - self.clip_range, 1 + self.clip_range),
+                ).mean()
+                value_loss = (returns[indices] - values).pow(2).mean()
+                loss = (
+                    policy_loss
+                    + self.vf_coef * value_loss
+                    - self.ent_coef * distribution.entropy().mean()
+                )
+
+                self.optimizer.zero_grad()
+                loss.backward()
+                nn.utils.clip_grad_norm_(self.policy.parameters(), self.max_grad_norm)
+                self.optimizer.step()
@@ -2,23 +2,27 @@ import logging
 import os
 import sys
 
-import hydra
 from omegaconf import OmegaConf
 
+from config.config_cache import load_config
 from config.config_schema import Config
 from config.config_utils import print_config_table
 from learner.learner import Agent
+from learner.threads import PROCESS_CPUS, sweep_cpus
 
 # Add src directory to path and import to register the environment
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, os.path.join(BASE_DIR, "src"))
 import protein_design_env  # noqa: E402, F401 - Import to register environment
 
+# Flags of the fast launch mode, which bypasses Hydra's job setup:
+# uv run python main.py --fast-launch [--print-config] algo=A2C seed=3
+FAST_LAUNCH_FLAG = "--fast-launch"
+PRINT_CONFIG_FLAG = "--print-config"
 
-@hydra.main(version_base=None, config_path="config", config_name="defaults")
-def main(cfg: Config) -> None:
-    """Main function for Problem 2."""
-    print_config_table(cfg, style="tree")
+
+def prepare_config(cfg: Config) -> None:
+    """Add BASE_DIR and the default model directory to the configuration."""
     # Temporarily disable struct mode to add BASE_DIR
     OmegaConf.set_struct(cfg, False)
     cfg.BASE_DIR = BASE_DIR
@@ -26,11 +30,72 @@ def main(cfg: Config) -> None:
 
     if cfg.dir is None:
         cfg.dir = os.path.join(BASE_DIR, "saved-model", f"{cfg.algo}_Protein_Design_rng_length")
+
+
+def assign_sweep_cpus(cfg: Config) -> None:
+    """Give the job of a parallel `-m` sweep its own part of the CPUs, unless `cpu_list` is set.
+
+    The number of jobs running at once is `sweep_jobs`, else the `n_jobs` of the Hydra launcher,
+    e.g. of the joblib launcher. The jobs of the default launcher run one after the other.
+    """
+    from hydra.core.hydra_config import HydraConfig
+    from hydra.types import RunMode
+
+    if cfg.cpu_list or not HydraConfig.initialized():
+        return
+    hydra_cfg = HydraConfig.get()
+    if hydra_cfg.mode != RunMode.MULTIRUN:
+        return
+    n_jobs = cfg.sweep_jobs or hydra_cfg.launcher.get("n_jobs") or 1
+    if n_jobs < 0:
+        # Joblib counts negative numbers of jobs from the number of CPUs, -1 being all of them.
+        n_jobs = max(len(PROCESS_CPUS) + 1 + n_jobs, 1)
+    if n_jobs > 1:
+        cfg.cpu_list = list(sweep_cpus(hydra_cfg.job.num, n_jobs))
+
+
+def run(cfg: Config) -> Agent:
+    """Create the agent and train it if the mode is 1."""
     agent = Agent(cfg)
     if cfg.mode == 1:
         logging.info(f"-----------Start Training with {cfg.algo}-----------")
         agent.train()
+    return agent
+
+
+def main(cfg: Config) -> None:
+    """Main function for Problem 2."""
+    print_config_table(cfg, style="tree")
+    prepare_config(cfg)
+    assign_sweep_cpus(cfg)
+    run(cfg)
+
+
+def fast_main(argv: list[str]) -> None:
+    """Run `main` with a cached pre-validated configuration and without Hydra's job setup.
+
+    The config tree is only printed with the --print-config flag.
+    """
+    logging.basicConfig(
+        level=logging.INFO, format="[%(asctime)s][%(name)s][%(levelname)s] - %(message)s"
+    )
+    cfg = load_config([arg for arg in argv if arg not in (FAST_LAUNCH_FLAG, PRINT_CONFIG_FLAG)])
+    if PRINT_CONFIG_FLAG in argv:
+        print_config_table(cfg, style="tree")
+    prepare_config(cfg)
+    run(cfg)
+
+
+def hydra_main() -> None:
+    """Run `main` with the configuration composed by Hydra from the command line."""
+    # Hydra is imported here, so that the fast launch mode does not import it on cache hits.
+    import hydra
+
+    hydra.main(version_base=None, config_path="config", config_name="defaults")(main)()
 
 
 if __name__ == "__main__":
-    main()
+    if FAST_LAUNCH_FLAG in sys.argv[1:]:
+        fast_main(sys.argv[1:])
+    else:
+        hydra_main()
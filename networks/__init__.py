@@ -1,2 +1,15 @@
-"""Network architectures package."""
+"""Neural network components for the policies."""
 
+from networks.features_extractor import (
+    FEATURES_EXTRACTORS,
+    FusedOneHotExtractor,
+    ResidueEmbeddingExtractor,
+    make_policy_kwargs,
+)
+
+__all__ = [
+    "FEATURES_EXTRACTORS",
+    "FusedOneHotExtractor",
+    "ResidueEmbeddingExtractor",
+    "make_policy_kwargs",
+]
@@ -0,0 +1,189 @@
+"""Features extractors encoding the amino acid ids of the protein design observation.
+
+With target motifs, the observation is followed by the motifs after the first one and the count
+of each motif: the extra motifs are encoded as tokens and the counts as scalar features.
+"""
+
+import math
+
+import gymnasium as gym
+import torch
+import torch.nn as nn
+from stable_baselines3.common.torch_layers import BaseFeaturesExtractor
+
+from protein_design_env.constants import (
+    MAX_MOTIF_LENGTH,
+    MAX_SEQUENCE_LENGTH,
+    NUM_AMINO_ACIDS,
+    OBS_CHARGE_INDEX,
+    OBS_MOTIF_START_INDEX,
+    OBS_SEQUENCE_LENGTH_INDEX,
+    OBS_SIZE,
+    OBS_TARGET_LENGTH_INDEX,
+)
+
+# Amino acid ids are one-based, 0 is the padding token.
+VOCABULARY_SIZE = NUM_AMINO_ACIDS + 1
+N_TOKENS = MAX_SEQUENCE_LENGTH + MAX_MOTIF_LENGTH
+N_SCALARS = 3
+
+
+def observation_sizes(observation_space: gym.spaces.Box) -> tuple[int, int, int]:
+    """Return the number of target motifs (0 without target motifs), tokens and scalar features.
+
+    Raises:
+        ValueError: If the observations are not the ones of the protein design environment.
+    """
+    n_target_features = observation_space.shape[0] - OBS_SIZE
+    # (n_motifs - 1) padded extra motifs and n_motifs counts.
+    n_motifs, remainder = divmod(n_target_features + MAX_MOTIF_LENGTH, MAX_MOTIF_LENGTH + 1)
+    is_valid = n_target_features == 0 or (n_target_features > 0 and remainder == 0)
+    if len(observation_space.shape) != 1 or not is_valid:
+        raise ValueError(f"Unsupported observation shape: {observation_space.shape}")
+    if not n_target_features:
+        return 0, N_TOKENS, N_SCALARS
+    return n_motifs, N_TOKENS + (n_motifs - 1) * MAX_MOTIF_LENGTH, N_SCALARS + n_motifs
+
+
+def split_observation(
+    observations: torch.Tensor, n_motifs: int = 0
+) -> tuple[torch.Tensor, torch.Tensor]:
+    """Split a batch of observations into amino acid tokens and scaled scalar features.
+
+    Args:
+        observations: Batch of observations.
+        n_motifs: Number of target motifs of the observations, see `observation_sizes`.
+
+    Returns:
+        The (batch, n_tokens) long tensor of sequence, motif then extra target motif ids, and the
+        (batch, n_scalars) sequence length, target length, charge and target motif counts divided
+        by MAX_SEQUENCE_LENGTH.
+    """
+    n_extra_tokens = max(n_motifs - 1, 0) * MAX_MOTIF_LENGTH
+    tokens = torch.cat(
+        [
+            observations[:, :MAX_SEQUENCE_LENGTH],
+            observations[:, OBS_MOTIF_START_INDEX : OBS_MOTIF_START_INDEX + MAX_MOTIF_LENGTH],
+            observations[:, OBS_SIZE : OBS_SIZE + n_extra_tokens],
+        ],
+        dim=1,
+    ).long()
+    scalars = torch.cat(
+        [
+            observations[:, [OBS_SEQUENCE_LENGTH_INDEX, OBS_TARGET_LENGTH_INDEX, OBS_CHARGE_INDEX]],
+            observations[:, OBS_SIZE + n_extra_tokens :],
+        ],
+        dim=1,
+    )
+    return tokens, scalars / MAX_SEQUENCE_LENGTH
+
+
+class ResidueEmbeddingExtractor(BaseFeaturesExtractor):
+    """Embed the amino acids of the sequence and of the motif.
+
+    Sequence and motif amino acids share a learned embedding, to which a learned position embedding
+    is added. The flattened embeddings and the scalar features go through a linear layer.
+
+    Args:
+        observation_space: Observation space of the protein design environment.
+        embedding_dim: Size of the amino acid and position embeddings.
+        features_dim: Number of output features.
+        vocabulary_size: Number of residues of the alphabet plus one for the padding id.
+    """
+
+    def __init__(
+        self,
+        observation_space: gym.spaces.Box,
+        embedding_dim: int = 16,
+        features_dim: int = 128,
+        vocabulary_size: int = VOCABULARY_SIZE,
+    ) -> None:
+        super().__init__(observation_space, features_dim)
+        self.n_motifs, n_tokens, n_scalars = observation_sizes(observation_space)
+        self.embedding = nn.Embedding(vocabulary_size, embedding_dim, padding_idx=0)
+        self.position_embedding = nn.Parameter(torch.zeros(n_tokens, embedding_dim))
+        self.linear = nn.Sequential(
+            nn.Linear(n_tokens * embedding_dim + n_scalars, features_dim), nn.ReLU()
+        )
+
+    def forward(self, observations: torch.Tensor) -> torch.Tensor:
+        """Compute the features of a batch of observations."""
+        tokens, scalars = split_observation(observations, self.n_motifs)
+        embedded = self.embedding(tokens) + self.position_embedding
+        return self.linear(torch.cat([embedded.flatten(start_dim=1), scalars], dim=1))
+
+
+class FusedOneHotExtractor(BaseFeaturesExtractor):
+    """One-hot encoding of the amino acids fused with the first linear layer.
+
+    A linear layer applied to the concatenated one-hot encodings of the tokens is the sum of one
+    weight row per token. The rows are gathered and summed with `nn.EmbeddingBag`, so the one-hot
+    vectors are never materialized.
+
+    Args:
+        observation_space: Observation space of the protein design environment.
+        features_dim: Number of output features.
+        vocabulary_size: Number of residues of the alphabet plus one for the padding id.
+    """
+
+    def __init__(
+        self,
+        observation_space: gym.spaces.Box,
+        features_dim: int = 128,
+        vocabulary_size: int = VOCABULARY_SIZE,
+    ) -> None:
+        super().__init__(observation_space, features_dim)
+        self.n_motifs, n_tokens, n_scalars = observation_sizes(observation_space)
+        self.token_weights = nn.EmbeddingBag(n_tokens * vocabulary_size, features_dim, mode="sum")
+        self.scalar_weights = nn.Linear(n_scalars, features_dim)
+        # Same initialization as a linear layer on the one-hot encodings.
+        bound = 1 / math.sqrt(n_tokens * vocabulary_size + n_scalars)
+        for parameter in (
+            self.token_weights.weight,
+            self.scalar_weights.weight,
+            self.scalar_weights.bias,
+        ):
+            nn.init.uniform_(parameter, -bound, bound)
+        self.register_buffer("offsets", torch.arange(n_tokens) * vocabulary_size)
+
+    def forward(self, observations: torch.Tensor) -> torch.Tensor:
+        """Compute the features of a batch of observations."""
+        tokens, scalars = split_observation(observations, self.n_motifs)
+        return torch.relu(self.token_weights(tokens + self.offsets) + self.scalar_weights(scalars))
+
+
+FEATURES_EXTRACTORS = {
+    "embedding": ResidueEmbeddingExtractor,
+    "onehot_fused": FusedOneHotExtractor,
+}
+
+
+def make_policy_kwargs(
+    features_extractor: str,
+    embedding_dim: int = 16,
+    features_dim: int = 128,
+    n_residues: int = NUM_AMINO_ACIDS,
+) -> dict:
+    """Return the SB3 `policy_kwargs` selecting a features extractor.
+
+    Args:
+        features_extractor: "mlp" for the default SB3 flatten extractor, or one of
+            FEATURES_EXTRACTORS.
+        embedding_dim: Size of the embeddings of the "embedding" extractor.
+        features_dim: Number of features of the extractor.
+        n_residues: Number of residues of the alphabet of the environment.
+    """
+    if features_extractor == "mlp":
+        return {}
+    if features_extractor not in FEATURES_EXTRACTORS:
+        raise ValueError(f"Unsupported features extractor: {features_extractor}")
+
+    features_extractor_kwargs = {"features_dim": features_dim}
+    if n_residues != NUM_AMINO_ACIDS:
+        features_extractor_kwargs["vocabulary_size"] = n_residues + 1
+    if features_extractor == "embedding":
+        features_extractor_kwargs["embedding_dim"] = embedding_dim
+    return {
+        "features_extractor_class": FEATURES_EXTRACTORS[features_extractor],
+        "features_extractor_kwargs": features_extractor_kwargs,
+    }
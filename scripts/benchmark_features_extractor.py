@@ -0,0 +1,123 @@
+"""This script benchmarks the features extractors of the `networks` package against `MlpPolicy`.
+
+For each extractor it reports:
+- the per-batch forward time of the PPO policy for several batch sizes,
+- the number of timesteps PPO needs to reach a target mean evaluation reward.
+
+Usage:
+    uv run python scripts/benchmark_features_extractor.py --target-reward 1.0 --max-timesteps 100000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import timeit
+
+import numpy as np
+import torch
+from stable_baselines3 import PPO
+from stable_baselines3.common.callbacks import EvalCallback, StopTrainingOnRewardThreshold
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+
+from networks import FEATURES_EXTRACTORS, make_policy_kwargs  # noqa: E402
+from protein_design_env.amino_acids import AMINO_ACIDS_TO_CHARGES_ARRAY  # noqa: E402
+from protein_design_env.constants import (  # noqa: E402
+    MAX_MOTIF_LENGTH,
+    MAX_SEQUENCE_LENGTH,
+    MIN_MOTIF_LENGTH,
+    MIN_SEQUENCE_LENGTH,
+    NUM_AMINO_ACIDS,
+)
+from protein_design_env.environment import Environment  # noqa: E402
+
+
+def random_observations(n_observations: int, rng: np.random.Generator) -> np.ndarray:
+    """Sample valid observations of partially built sequences."""
+    target_lengths = rng.integers(MIN_SEQUENCE_LENGTH, MAX_SEQUENCE_LENGTH + 1, n_observations)
+    lengths = rng.integers(0, target_lengths)
+    states = rng.integers(1, NUM_AMINO_ACIDS + 1, (n_observations, MAX_SEQUENCE_LENGTH))
+    states[np.arange(MAX_SEQUENCE_LENGTH) >= lengths[:, None]] = 0
+    motif_lengths = rng.integers(MIN_MOTIF_LENGTH, MAX_MOTIF_LENGTH + 1, n_observations)
+    motifs = rng.integers(1, NUM_AMINO_ACIDS + 1, (n_observations, MAX_MOTIF_LENGTH))
+    motifs[np.arange(MAX_MOTIF_LENGTH) >= motif_lengths[:, None]] = 0
+    charges = AMINO_ACIDS_TO_CHARGES_ARRAY[states].sum(axis=1)
+    return np.column_stack([states, lengths, motifs, target_lengths, charges]).astype(np.float64)
+
+
+def make_model(features_extractor: str, seed: int, log_dir: str | None = None) -> PPO:
+    """Create a PPO model on the environment of Problem 3 with the given features extractor."""
+    return PPO(
+        "MlpPolicy",
+        Environment(change_motif_at_each_episode=True, change_sequence_length_at_each_episode=True),
+        seed=seed,
+        policy_kwargs=make_policy_kwargs(features_extractor),
+        tensorboard_log=log_dir,
+    )
+
+
+def forward_times(features_extractor: str, batch_sizes: list[int], repeats: int) -> dict:
+    """Return the mean time in milliseconds of a policy forward pass for each batch size."""
+    policy = make_model(features_extractor, seed=0).policy
+    rng = np.random.default_rng(0)
+    times = {}
+    for batch_size in batch_sizes:
+        observations = torch.as_tensor(random_observations(batch_size, rng))
+        with torch.no_grad():
+            policy(observations)  # Warm up.
+            seconds = timeit.timeit(lambda: policy(observations), number=repeats)  # noqa: B023
+        times[batch_size] = 1000 * seconds / repeats
+    return times
+
+
+def timesteps_to_target(
+    features_extractor: str, target_reward: float, max_timesteps: int, seed: int
+) -> int | None:
+    """Train PPO until its mean evaluation reward reaches the target, None if it never does."""
+    model = make_model(features_extractor, seed)
+    with tempfile.TemporaryDirectory() as log_dir:
+        eval_callback = EvalCallback(
+            Environment(True, True, seed=seed + 1),
+            callback_on_new_best=StopTrainingOnRewardThreshold(target_reward),
+            n_eval_episodes=20,
+            eval_freq=2048,
+            log_path=log_dir,
+            verbose=0,
+        )
+        model.learn(total_timesteps=max_timesteps, callback=eval_callback)
+    if eval_callback.best_mean_reward < target_reward:
+        return None
+    return model.num_timesteps
+
+
+def main() -> None:
+    """Run the benchmark and print the results as json."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[64, 256, 1024, 4096])
+    parser.add_argument("--repeats", type=int, default=100)
+    parser.add_argument("--target-reward", type=float, default=1.0)
+    parser.add_argument("--max-timesteps", type=int, default=100_000)
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0])
+    parser.add_argument("--skip-training", action="store_true")
+    args = parser.parse_args()
+
+    results = {}
+    for features_extractor in ["mlp", *FEATURES_EXTRACTORS]:
+        result = {"forward_ms": forward_times(features_extractor, args.batch_sizes, args.repeats)}
+        if not args.skip_training:
+            result["timesteps_to_target"] = [
+                timesteps_to_target(
+                    features_extractor, args.target_reward, args.max_timesteps, seed
+                )
+                for seed in args.seeds
+            ]
+        results[features_extractor] = result
+        print(f"{features_extractor}: {result}", file=sys.stderr)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
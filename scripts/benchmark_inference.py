@@ -0,0 +1,141 @@
+"""This script benchmarks the exported policy runtimes against `PPO.load(...).predict`.
+
+For each backend it measures:
+- the cold start: wall-clock time of a fresh Python process importing the backend, loading the
+  policy and predicting the actions of one observation,
+- the latency of the deterministic actions of a batch of observations, for several batch sizes
+  (median over repetitions, in a warm process).
+
+The backends are sb3 (the saved zip), torchscript, onnx (with onnxruntime, if installed) and numpy.
+
+Usage:
+    uv run python scripts/benchmark_inference.py \
+        --model saved-model/PPO_Protein_Design/best_model.zip
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from importlib.util import find_spec
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+
+from learner.export import ALGOS, EXPORT_FORMATS, export_policy  # noqa: E402
+from protein_design_env.constants import OBS_SIZE  # noqa: E402
+
+# Code run in a fresh process by the cold start measurement, with the policy path as argument.
+COLD_START_CODE = {
+    "sb3": (
+        "import sys, numpy as np\n"
+        "from stable_baselines3 import {algo}\n"
+        "model = {algo}.load(sys.argv[1], device='cpu')\n"
+        "model.predict(np.zeros((1, {obs_size}), np.float32), deterministic=True)\n"
+    ),
+    "torchscript": (
+        "import sys, torch\n"
+        "torch.jit.load(sys.argv[1])(torch.zeros((1, {obs_size}))).argmax(dim=1)\n"
+    ),
+    "onnx": (
+        "import sys, numpy as np, onnxruntime\n"
+        "session = onnxruntime.InferenceSession(sys.argv[1])\n"
+        "observations = np.zeros((1, {obs_size}), np.float32)\n"
+        "session.run(None, {{'observations': observations}})[0].argmax(axis=1)\n"
+    ),
+    "numpy": (
+        "import sys, numpy as np\n"
+        "from learner.numpy_policy import NumpyPolicy\n"
+        "NumpyPolicy.load(sys.argv[1]).predict(np.zeros((1, {obs_size}), np.float32))\n"
+    ),
+}
+
+
+def cold_start_seconds(backend: str, algo: str, path: str, n_runs: int) -> float:
+    """Return the median wall-clock time of a process loading the policy and predicting once."""
+    code = COLD_START_CODE[backend].format(algo=algo, obs_size=OBS_SIZE)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([BASE_DIR, os.path.join(BASE_DIR, "src")]))
+    durations = []
+    for _ in range(n_runs):
+        start = time.perf_counter()
+        command = [sys.executable, "-c", code, path]
+        subprocess.run(command, check=True, env=env)  # noqa: S603 - This interpreter, own code
+        durations.append(time.perf_counter() - start)
+    return float(np.median(durations))
+
+
+def make_predictors(algo: str, paths: dict[str, str]) -> dict[str, Callable[[np.ndarray], object]]:
+    """Load each backend in this process and return its batched deterministic predict function."""
+    import torch
+
+    from learner.numpy_policy import NumpyPolicy
+
+    model = ALGOS[algo].load(paths["sb3"], device="cpu")
+    torchscript = torch.jit.load(paths["torchscript"])
+    numpy_policy = NumpyPolicy.load(paths["numpy"])
+    predictors = {
+        "sb3": lambda obs: model.predict(obs, deterministic=True)[0],
+        "torchscript": lambda obs: torchscript(torch.from_numpy(obs)).argmax(dim=1).numpy(),
+        "numpy": numpy_policy.predict,
+    }
+    if "onnx" in paths:
+        import onnxruntime
+
+        session = onnxruntime.InferenceSession(paths["onnx"])
+        predictors["onnx"] = lambda obs: session.run(None, {"observations": obs})[0].argmax(axis=1)
+    return predictors
+
+
+def batch_latency_seconds(predict: Callable, observations: np.ndarray, n_repeats: int) -> float:
+    """Return the median time of the predict function on a batch of observations."""
+    predict(observations)  # Warm up.
+    durations = []
+    for _ in range(n_repeats):
+        start = time.perf_counter()
+        predict(observations)
+        durations.append(time.perf_counter() - start)
+    return float(np.median(durations))
+
+
+def main() -> None:
+    """Export the model, run the benchmark and print the results as json."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", type=str, required=True, help="Path of the saved model")
+    parser.add_argument("--algo", type=str, default="PPO", choices=sorted(ALGOS))
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 64, 1024, 16384])
+    parser.add_argument("--n-repeats", type=int, default=50)
+    parser.add_argument("--n-cold-starts", type=int, default=3)
+    args = parser.parse_args()
+
+    formats = tuple(f for f in EXPORT_FORMATS if f != "onnx" or find_spec("onnxruntime"))
+    with tempfile.TemporaryDirectory() as export_dir:
+        paths = {"sb3": args.model, **export_policy(args.algo, args.model, export_dir, formats)}
+        predictors = make_predictors(args.algo, paths)
+        rng = np.random.default_rng(0)
+        results: dict[str, dict] = {}
+        for backend, predict in predictors.items():
+            results[backend] = {
+                "cold_start_seconds": cold_start_seconds(
+                    backend, args.algo, paths[backend], args.n_cold_starts
+                ),
+                "batch_latency_seconds": {
+                    batch_size: batch_latency_seconds(
+                        predict,
+                        rng.integers(0, 21, (batch_size, OBS_SIZE)).astype(np.float32),
+                        args.n_repeats,
+                    )
+                    for batch_size in args.batch_sizes
+                },
+            }
+            print(f"{backend}: {results[backend]}", file=sys.stderr)
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""This script benchmarks the launch-to-first-step latency of `main.py`.
+
+Each launch runs `main.py` in a fresh process and measures the wall-clock time from the process
+spawn to the first step of the training environment (the training itself is skipped), with:
+- hydra: the default launch, composing the config with Hydra and printing it with rich,
+- fast_cold: `--fast-launch` with an empty config cache, which composes and validates the config,
+- fast_cached: `--fast-launch` with the config already in the cache.
+
+It also reports the in-process time of each config step: Hydra composition and validation, cache
+hit and rich rendering.
+
+Usage:
+    uv run python scripts/benchmark_launch.py --n-launches 5 algo=A2C
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from rich.console import Console
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from config import config_utils  # noqa: E402
+from config.config_cache import compose_config, load_config  # noqa: E402
+
+# Run in the launched process: stop at the first env step and print the time since the spawn.
+FIRST_STEP_CODE = """
+import os, runpy, sys, time
+spawn_time = float(sys.argv[1])
+sys.argv = ["main.py", *sys.argv[2:]]
+sys.path.insert(0, os.getcwd())
+import learner.learner
+
+init = learner.learner.Agent.__init__
+
+def init_and_step(self, args):
+    init(self, args)
+    self.env.reset()
+    self.env.step(self.env.action_space.sample())
+    print(time.time() - spawn_time)
+    sys.stdout.flush()
+    os._exit(0)
+
+learner.learner.Agent.__init__ = init_and_step
+runpy.run_path("main.py", run_name="__main__")
+"""
+
+
+def launch_to_first_step_seconds(args: list[str], cache_dir: str | None) -> float:
+    """Launch `main.py` with the arguments and return the time until the first env step."""
+    env = dict(os.environ)
+    if cache_dir is not None:
+        env["PROTEIN_DESIGN_CONFIG_CACHE"] = cache_dir
+    output = subprocess.run(  # noqa: S603 - This interpreter running main.py
+        [sys.executable, "-c", FIRST_STEP_CODE, str(time.time()), *args],
+        check=True,
+        capture_output=True,
+        text=True,
+        cwd=BASE_DIR,
+        env=env,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def config_step_seconds(overrides: list[str], cache_dir: str, n_repeats: int) -> dict[str, float]:
+    """Return the median in-process time of composition, cache hit and rich rendering."""
+
+    def median_seconds(function) -> float:
+        durations = []
+        for _ in range(n_repeats):
+            start = time.perf_counter()
+            function()
+            durations.append(time.perf_counter() - start)
+        return float(np.median(durations))
+
+    cfg = load_config(overrides, cache_dir)
+    console = Console(file=io.StringIO())
+    config_utils.Console = lambda: console  # Render to a buffer instead of the terminal.
+    return {
+        "compose_and_validate": median_seconds(lambda: compose_config(overrides)),
+        "cache_hit": median_seconds(lambda: load_config(overrides, cache_dir)),
+        "rich_rendering": median_seconds(lambda: config_utils.print_config_table(cfg)),
+    }
+
+
+def main() -> None:
+    """Run the benchmark and print the results as json."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n-launches", type=int, default=5)
+    parser.add_argument("overrides", nargs="*", help="Config overrides, e.g. algo=A2C")
+    args = parser.parse_args()
+    overrides = ["mode=2", *args.overrides]
+
+    launches: dict[str, list[float]] = {"hydra": [], "fast_cold": [], "fast_cached": []}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for launch in range(args.n_launches):
+            cache_dir = os.path.join(tmp_dir, str(launch))
+            hydra_args = [*overrides, f"hydra.run.dir={os.path.join(tmp_dir, 'outputs')}"]
+            launches["hydra"].append(launch_to_first_step_seconds(hydra_args, None))
+            fast_args = ["--fast-launch", *overrides]
+            launches["fast_cold"].append(launch_to_first_step_seconds(fast_args, cache_dir))
+            launches["fast_cached"].append(launch_to_first_step_seconds(fast_args, cache_dir))
+        results = {
+            "launch_to_first_step_seconds": {
+                name: float(np.median(durations)) for name, durations in launches.items()
+            },
+            "config_step_seconds": config_step_seconds(
+                overrides, os.path.join(tmp_dir, "in_process"), n_repeats=20
+            ),
+        }
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""This script compares length-bucketed rollouts with standard rollouts on Problem 2.
+
+Problem 2 has the default motif and a sequence length drawn between MIN_SEQUENCE_LENGTH and
+MAX_SEQUENCE_LENGTH for each episode. For each mode and seed, `TorchPPOTrainer` is trained on a
+`TorchBatchedEnvironment` and evaluated at regular intervals with deterministic actions on one
+episode of every sequence length. The script prints, as json, the training throughput (env steps
+per second, rollouts plus updates) and the learning curves (mean evaluation return) of:
+- standard: rollouts of `n_steps` steps, whose episodes finish out of sync,
+- length_bucketing: rollouts of complete episodes sharing one sequence length.
+
+Usage:
+    uv run python scripts/benchmark_length_bucketing.py --n-envs 256 --timesteps 500000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+
+from learner.torch_trainer import TorchPPOTrainer  # noqa: E402
+from protein_design_env.constants import MAX_SEQUENCE_LENGTH, MIN_SEQUENCE_LENGTH  # noqa: E402
+from protein_design_env.torch_environment import TorchBatchedEnvironment  # noqa: E402
+
+SEQUENCE_LENGTHS = list(range(MIN_SEQUENCE_LENGTH, MAX_SEQUENCE_LENGTH + 1))
+
+
+@torch.no_grad()
+def evaluate(trainer: TorchPPOTrainer) -> float:
+    """Return the mean return of the greedy policy over one episode of each sequence length."""
+    env = TorchBatchedEnvironment(len(SEQUENCE_LENGTHS))
+    observations = env.set_episodes(env.motifs, torch.tensor(SEQUENCE_LENGTHS))
+    returns = torch.zeros(env.n_envs, dtype=torch.float64)
+    active = torch.ones(env.n_envs, dtype=torch.bool)
+    for _ in range(MAX_SEQUENCE_LENGTH):
+        logits, _ = trainer.policy(observations)
+        observations, rewards, dones = env.step(logits.argmax(dim=1))
+        returns += torch.where(active, rewards, 0.0)
+        active &= ~dones
+    return float(returns.mean())
+
+
+def train(
+    length_bucketing: bool, n_envs: int, timesteps: int, n_evaluations: int, seed: int
+) -> dict:
+    """Train one agent and return its throughput and learning curve."""
+    trainer = TorchPPOTrainer(
+        TorchBatchedEnvironment(n_envs, False, True, seed=seed),
+        seed=seed,
+        length_bucketing=length_bucketing,
+    )
+    curve, training_seconds = [], 0.0
+    for evaluation in range(1, n_evaluations + 1):
+        start = time.perf_counter()
+        trainer.learn(total_timesteps=timesteps * evaluation // n_evaluations)
+        training_seconds += time.perf_counter() - start
+        curve.append({"timesteps": trainer.num_timesteps, "eval_return": evaluate(trainer)})
+    return {"steps_per_second": trainer.num_timesteps / training_seconds, "curve": curve}
+
+
+def main() -> None:
+    """Run the benchmark and print the results as json."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n-envs", type=int, default=256)
+    parser.add_argument("--timesteps", type=int, default=500_000)
+    parser.add_argument("--n-evaluations", type=int, default=10)
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2])
+    args = parser.parse_args()
+
+    results = {}
+    for mode, length_bucketing in (("standard", False), ("length_bucketing", True)):
+        runs = [
+            train(length_bucketing, args.n_envs, args.timesteps, args.n_evaluations, seed)
+            for seed in args.seeds
+        ]
+        results[mode] = {
+            "steps_per_second": float(np.mean([run["steps_per_second"] for run in runs])),
+            "final_eval_return": float(np.mean([run["curve"][-1]["eval_return"] for run in runs])),
+            "runs": runs,
+        }
+        print(
+            f"{mode}: {results[mode]['steps_per_second']:.0f} steps/s, "
+            f"final eval return {results[mode]['final_eval_return']:.2f}",
+            file=sys.stderr,
+        )
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""This script measures the overhead of the live metrics on PPO training throughput.
+
+The same training job (PPO on Problem 2) runs alternately without metrics and with the metrics
+callbacks, the Prometheus endpoint scraped every second and the wandb file sink flushed every
+second. The script prints, as json, the median steps per second of both and their relative
+difference, which is within the run-to-run noise. The time spent in the metrics callback is also
+measured, which gives a less noisy estimate of the overhead of the training thread.
+
+Usage:
+    uv run python scripts/benchmark_metrics_overhead.py --timesteps 20480 --n-runs 3
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+import numpy as np
+from stable_baselines3 import PPO
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+
+from learner.metrics import (  # noqa: E402
+    MetricsCallback,
+    MetricsRecorder,
+    PrometheusExporter,
+    WandbFileSink,
+)
+from protein_design_env.environment import Environment  # noqa: E402
+
+
+class TimedMetricsCallback(MetricsCallback):
+    """`MetricsCallback` measuring the time spent in its steps."""
+
+    def _on_training_start(self) -> None:
+        super()._on_training_start()
+        self.step_seconds = 0.0
+
+    def _on_step(self) -> bool:
+        start = time.perf_counter()
+        result = super()._on_step()
+        self.step_seconds += time.perf_counter() - start
+        return result
+
+
+def steps_per_second(timesteps: int, with_metrics: bool, sample_every: int) -> tuple[float, float]:
+    """Train PPO for `timesteps` steps and return its throughput and the callback time per step."""
+    model = PPO("MlpPolicy", Environment(False, True, seed=0), seed=0)
+    callback, sinks, stop_scraping = None, [], threading.Event()
+    if with_metrics:
+        recorder = MetricsRecorder()
+        callback = TimedMetricsCallback(recorder, sample_every)
+        exporter = PrometheusExporter(recorder, port=0).start()
+        url = f"http://127.0.0.1:{exporter.port}/metrics"
+        sinks = [exporter, WandbFileSink(recorder, tempfile.mkdtemp(), flush_seconds=1.0).start()]
+
+        def scrape() -> None:
+            while not stop_scraping.wait(1.0):
+                urllib.request.urlopen(url).read()
+
+        threading.Thread(target=scrape, daemon=True).start()
+    start = time.perf_counter()
+    model.learn(total_timesteps=timesteps, callback=callback)
+    duration = time.perf_counter() - start
+    stop_scraping.set()
+    for sink in sinks:
+        sink.stop()
+    return timesteps / duration, callback.step_seconds / timesteps if with_metrics else 0.0
+
+
+def main() -> None:
+    """Run the benchmark and print the results as json."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--timesteps", type=int, default=20480)
+    parser.add_argument("--n-runs", type=int, default=3)
+    parser.add_argument("--sample-every", type=int, default=100)
+    args = parser.parse_args()
+
+    runs: dict[str, list[float]] = {"without_metrics": [], "with_metrics": []}
+    callback_seconds_per_step = []
+    for _ in range(args.n_runs):
+        throughput, _ = steps_per_second(args.timesteps, False, args.sample_every)
+        runs["without_metrics"].append(throughput)
+        throughput, callback_seconds = steps_per_second(args.timesteps, True, args.sample_every)
+        runs["with_metrics"].append(throughput)
+        callback_seconds_per_step.append(callback_seconds)
+    results = {name: float(np.median(values)) for name, values in runs.items()}
+    callback_seconds = float(np.median(callback_seconds_per_step))
+    print(
+        json.dumps(
+            {
+                "steps_per_second": results,
+                "throughput_difference": 1 - results["with_metrics"] / results["without_metrics"],
+                "callback_seconds_per_step": callback_seconds,
+                "callback_overhead": callback_seconds * results["with_metrics"],
+                "runs": runs,
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""This script benchmarks the torch environment backend against the SB3 + NumPy path.
+
+For each number of parallel envs it measures the env steps per second of PPO training (rollouts
+plus updates, same n_steps, batch size and epochs) with:
+- sb3: SB3's PPO on a DummyVecEnv of `Environment`,
+- torch: `TorchPPOTrainer` on a `TorchBatchedEnvironment`,
+- torch_compiled: the same with the policy and env step compiled with `torch.compile`.
+
+Usage:
+    uv run python scripts/benchmark_torch_backend.py --batch-sizes 64 256 1024 4096
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import torch
+from stable_baselines3 import PPO
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+
+from learner.torch_trainer import TorchPPOTrainer  # noqa: E402
+from protein_design_env.environment import Environment  # noqa: E402
+from protein_design_env.torch_environment import TorchBatchedEnvironment  # noqa: E402
+
+N_STEPS = 16
+BATCH_SIZE = 256
+N_EPOCHS = 4
+
+
+def sb3_steps_per_second(n_envs: int, n_rollouts: int) -> float:
+    """Measure SB3 PPO training throughput on `n_envs` NumPy environments."""
+    env = DummyVecEnv(
+        [lambda: Environment(True, True, seed=seed) for seed in range(n_envs)]  # noqa: B023
+    )
+    model = PPO("MlpPolicy", env, n_steps=N_STEPS, batch_size=BATCH_SIZE, n_epochs=N_EPOCHS)
+    model.learn(total_timesteps=n_envs * N_STEPS)  # Warm up.
+    start = time.perf_counter()
+    model.learn(total_timesteps=n_envs * N_STEPS * n_rollouts, reset_num_timesteps=False)
+    return n_envs * N_STEPS * n_rollouts / (time.perf_counter() - start)
+
+
+def torch_steps_per_second(n_envs: int, n_rollouts: int, compile: bool) -> float:
+    """Measure `TorchPPOTrainer` training throughput on a torch environment of `n_envs` envs."""
+    trainer = TorchPPOTrainer(
+        TorchBatchedEnvironment(n_envs, True, True),
+        n_steps=N_STEPS,
+        batch_size=BATCH_SIZE,
+        n_epochs=N_EPOCHS,
+        compile=compile,
+    )
+    # Warm up, which includes the compilation.
+    trainer.learn(total_timesteps=n_envs * N_STEPS)
+    start = time.perf_counter()
+    trainer.learn(total_timesteps=trainer.num_timesteps + n_envs * N_STEPS * n_rollouts)
+    return n_envs * N_STEPS * n_rollouts / (time.perf_counter() - start)
+
+
+def main() -> None:
+    """Run the benchmark and print the results as json."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[64, 256, 1024, 4096])
+    parser.add_argument("--n-rollouts", type=int, default=3)
+    parser.add_argument("--no-compile", action="store_true")
+    args = parser.parse_args()
+
+    results = {}
+    for n_envs in args.batch_sizes:
+        result = {
+            "sb3": sb3_steps_per_second(n_envs, args.n_rollouts),
+            "torch": torch_steps_per_second(n_envs, args.n_rollouts, compile=False),
+        }
+        if not args.no_compile:
+            result["torch_compiled"] = torch_steps_per_second(n_envs, args.n_rollouts, True)
+        results[n_envs] = result
+        print(f"{n_envs} envs: {result}", file=sys.stderr)
+    print(json.dumps({"env_steps_per_second": results, "torch_threads": torch.get_num_threads()}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""This script checks that a training job is reproducible.
+
+It trains the agent described by the Hydra configuration twice with the same seed and asserts that
+the training and evaluation reward curves are identical, e.g.:
+
+    uv run python scripts/check_reproducibility.py algo=A2C timesteps=5000 n_envs=4
+"""
+import logging
+import os
+import sys
+
+import hydra
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+
+from learner.reproducibility import check_reproducibility  # noqa: E402
+
+
+@hydra.main(version_base=None, config_path="../config", config_name="defaults")
+def main(cfg) -> None:
+    """Run the training job twice and compare the reward curves."""
+    curves = check_reproducibility(cfg, n_runs=2)
+    logging.info(
+        f"Reproducible: {len(curves['train'])} training episodes and "
+        f"{len(curves['eval'])} evaluation episodes are identical across runs"
+    )
+
+
+if __name__ == "__main__":
+    main()
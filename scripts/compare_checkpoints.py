@@ -0,0 +1,73 @@
+"""This script compares saved models on the same evaluation episodes, with cached results.
+
+Each model is evaluated on one episode per seed derived from --seed. The per-episode results are
+cached in saved-model/eval_cache by hash of the policy weights, env configuration and determinism
+(see learner/eval_cache.py), so only new checkpoints or new seeds are rolled out. The script prints
+the models sorted by mean return, as json.
+
+Usage:
+    uv run python scripts/compare_checkpoints.py saved-model/PPO_Protein_Design_rng_length \
+        saved-model/PPO_Protein_Design_rng_length/best_model.zip --n-episodes 200
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+
+from learner.eval_cache import (  # noqa: E402
+    DEFAULT_CACHE_DIR,
+    DEFAULT_MAX_BYTES,
+    EvalCache,
+    compare_checkpoints,
+    env_config,
+    evaluation_seeds,
+)
+from learner.export import ALGOS  # noqa: E402
+
+
+def main() -> None:
+    """Evaluate the models and print the comparison as json."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "models", type=str, nargs="+", help="Saved models, or directories of saved models"
+    )
+    parser.add_argument("--algo", type=str, default="PPO", choices=sorted(ALGOS))
+    parser.add_argument("--n-episodes", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0, help="Root seed of the episode seeds")
+    parser.add_argument("--stochastic", action="store_true", help="Sample the actions")
+    parser.add_argument("--env-name", type=str, default="Protein-Design-v0")
+    parser.add_argument("--variable-motif", action=argparse.BooleanOptionalAction, default=False)
+    parser.add_argument("--variable-length", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--held-out-motif-fraction", type=float, default=0.0)
+    parser.add_argument("--residue-table", type=str, default=None, help="Residue alphabet yaml")
+    parser.add_argument("--target-motifs", type=str, nargs="+", default=None, help="e.g. RI DEK")
+    parser.add_argument("--motif-reward", type=str, default="presence")
+    parser.add_argument("--motif-weights", type=float, nargs="+", default=None)
+    parser.add_argument("--cache-dir", type=str, default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--max-cache-mb", type=float, default=DEFAULT_MAX_BYTES / 2**20)
+    args = parser.parse_args()
+
+    model_paths = []
+    for path in args.models:
+        if os.path.isdir(path):
+            model_paths.extend(sorted(glob.glob(os.path.join(path, "*.zip"))))
+        else:
+            model_paths.append(path)
+    rows = compare_checkpoints(
+        args.algo,
+        model_paths,
+        evaluation_seeds(args.n_episodes, args.seed),
+        env_config(vars(args)),
+        deterministic=not args.stochastic,
+        cache=EvalCache(args.cache_dir, int(args.max_cache_mb * 2**20)),
+    )
+    print(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""This script exports the policy network of a saved model for lightweight inference.
+
+The network is saved to TorchScript (policy.pt), ONNX (policy.onnx) and NumPy weights
+(policy.npz, run by `learner.numpy_policy.NumpyPolicy`), in the output directory.
+
+Usage:
+    uv run python scripts/export_model.py --model saved-model/PPO_Protein_Design/best_model.zip \
+        --output-dir saved-model/PPO_Protein_Design/export
+"""
+import argparse
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+
+from learner.export import ALGOS, EXPORT_FORMATS, export_policy  # noqa: E402
+
+
+def main() -> None:
+    """Export the model and print the exported files."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", type=str, required=True, help="Path of the saved model")
+    parser.add_argument("--algo", type=str, default="PPO", choices=sorted(ALGOS))
+    parser.add_argument("--output-dir", type=str, required=True)
+    parser.add_argument("--formats", type=str, nargs="+", default=EXPORT_FORMATS)
+    args = parser.parse_args()
+
+    paths = export_policy(args.algo, args.model, args.output_dir, tuple(args.formats))
+    for name, path in paths.items():
+        print(f"{name}: {path}")
+
+
+if __name__ == "__main__":
+    main()
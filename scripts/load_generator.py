@@ -0,0 +1,192 @@
+r"""This script measures the design request backends of a saved model under load.
+
+A mix of (motif, sequence length) design requests, drawn as in the training envs or from a json
+mix file, is replayed against each backend of learner/serving.py:
+- predict: one policy call per amino acid and request, in this process,
+- batched: concurrent requests gathered and designed together, in this process,
+- server: a local HTTP design server started in a subprocess (or the one at --url), itself
+  designing with the --server-backend backend.
+The requests are sent by --concurrency client threads back to back (closed loop), or at each
+--arrival-rate requests per second (open loop, Poisson arrivals). The script writes, as json, the
+throughput, the latency percentiles, the mean return of the designs and the memory of the serving
+process of each run. The designs are played and scored in the env of the --residue-table,
+--target-motifs, --motif-reward and --motif-weights options, which must be the ones of the model.
+
+A mix file is a list of requests with optional weights, e.g.:
+    [{"motif": "RI", "sequence_length": 15, "weight": 3}, {"motif": "DEKW", "sequence_length": 25}]
+
+Usage:
+    uv run python scripts/load_generator.py --model saved-model/PPO_Protein_Design/best_model.zip \
+        --concurrency 1 8 32 --output saved-model/load.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+
+from learner.env_config import env_config, env_kwargs  # noqa: E402
+from learner.export import ALGOS  # noqa: E402
+from learner.serving import (  # noqa: E402
+    POLICY_FORMATS,
+    http_designer,
+    load_predictor,
+    make_designer,
+    memory_usage,
+    run_load,
+    run_server,
+    sample_requests,
+    server_stats,
+)
+
+BACKENDS = ("predict", "batched", "server")
+
+
+def start_server(args) -> tuple[str, multiprocessing.Process]:
+    """Start a design server subprocess and return its url and process."""
+    context = multiprocessing.get_context("spawn")
+    ready = context.Queue()
+    process = context.Process(
+        target=run_server,
+        args=(
+            args.algo,
+            args.model,
+            args.policy_format,
+            args.server_backend,
+            args.max_batch_size,
+            args.max_wait_ms / 1000,
+            env_config(vars(args)),
+            ready,
+        ),
+        daemon=True,
+    )
+    process.start()
+    return ready.get(timeout=300), process
+
+
+def serving_stats(backend: str, designer, url: str | None) -> dict:
+    """Return the memory usage of the serving process and the batch sizes of its designer."""
+    if backend == "server":
+        return server_stats(url)
+    return {"memory": memory_usage(), "batch_sizes": getattr(designer, "batch_sizes", [])}
+
+
+def run_backend(
+    args,
+    backend: str,
+    predict,
+    requests: list,
+    loads: list[tuple[int, float | None]],
+    design_env_kwargs: dict,
+) -> list[dict]:
+    """Run the load of each (concurrency, arrival rate) against a backend and return the results."""
+    process, url = None, None
+    if backend == "server":
+        url = args.url
+        if url is None:
+            url, process = start_server(args)
+        designer = http_designer(url)
+    else:
+        designer = make_designer(
+            predict, backend, args.max_batch_size, args.max_wait_ms / 1000, design_env_kwargs
+        )
+    results = []
+    for concurrency, arrival_rate in loads:
+        run_load(designer, requests[: args.n_warmup_requests], concurrency)
+        n_batches = len(serving_stats(backend, designer, url)["batch_sizes"])
+        result = {"backend": backend}
+        result |= run_load(
+            designer, requests, concurrency, arrival_rate, args.seed, design_env_kwargs
+        )
+        stats = serving_stats(backend, designer, url)
+        result["memory"] = stats["memory"]
+        batch_sizes = stats["batch_sizes"][n_batches:]
+        if batch_sizes:
+            result["mean_batch_size"] = sum(batch_sizes) / len(batch_sizes)
+        results.append(result)
+        print(json.dumps(result), file=sys.stderr)
+    if backend != "server":
+        designer.close()
+    if process is not None:
+        process.terminate()
+        process.join()
+    return results
+
+
+def main() -> None:
+    """Run the load of each backend, concurrency and arrival rate and write the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", type=str, required=True, help="Path of the saved model")
+    parser.add_argument("--algo", type=str, default="PPO", choices=sorted(ALGOS))
+    parser.add_argument("--policy-format", type=str, default="sb3", choices=POLICY_FORMATS)
+    parser.add_argument("--backends", type=str, nargs="+", default=list(BACKENDS))
+    parser.add_argument("--server-backend", type=str, default="batched", choices=BACKENDS[:2])
+    parser.add_argument("--url", type=str, default=None, help="Url of a running design server")
+    parser.add_argument("--n-requests", type=int, default=1000)
+    parser.add_argument("--n-warmup-requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--arrival-rate", type=float, nargs="+", default=None)
+    parser.add_argument("--variable-motif", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--variable-length", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--mix", type=str, default=None, help="Json file of weighted requests")
+    parser.add_argument("--env-name", type=str, default="Protein-Design-v0")
+    parser.add_argument("--held-out-motif-fraction", type=float, default=0.0)
+    parser.add_argument("--residue-table", type=str, default=None, help="Residue alphabet yaml")
+    parser.add_argument("--target-motifs", type=str, nargs="+", default=None, help="e.g. RI DEK")
+    parser.add_argument("--motif-reward", type=str, default="presence")
+    parser.add_argument("--motif-weights", type=float, nargs="+", default=None)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=str, default=None, help="Json file of the results")
+    args = parser.parse_args()
+    unknown_backends = set(args.backends) - set(BACKENDS)
+    if unknown_backends:
+        parser.error(f"Unknown backends: {sorted(unknown_backends)}")
+
+    mix = None
+    if args.mix:
+        with open(args.mix) as f:
+            mix = json.load(f)
+    design_env_kwargs = env_kwargs(env_config(vars(args)))
+    requests = sample_requests(
+        args.n_requests,
+        args.variable_motif,
+        args.variable_length,
+        mix,
+        args.seed,
+        design_env_kwargs,
+    )
+    # Closed loop runs at each concurrency, then open loop runs at the highest concurrency.
+    loads = [(concurrency, None) for concurrency in args.concurrency]
+    loads += [(max(args.concurrency), rate) for rate in args.arrival_rate or []]
+
+    predict = load_predictor(args.algo, args.model, args.policy_format, design_env_kwargs)
+    results = []
+    for backend in args.backends:
+        results += run_backend(args, backend, predict, requests, loads, design_env_kwargs)
+
+    report = {
+        "model": args.model,
+        "algo": args.algo,
+        "policy_format": args.policy_format,
+        "server_backend": args.server_backend,
+        "max_batch_size": args.max_batch_size,
+        "max_wait_ms": args.max_wait_ms,
+        "env": env_config(vars(args)),
+        "requests": {"n_requests": args.n_requests, "mix": mix, "seed": args.seed},
+        "results": results,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
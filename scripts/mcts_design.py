@@ -0,0 +1,76 @@
+"""This script compares MCTS designs with the greedy designs of a saved model.
+
+Each design is played once with the deterministic actions of the model and once with a parallel
+batched MCTS guided by the policy and value networks of the model (see learner/mcts.py), searching
+for --time-budget seconds per design. The script prints the returns and the search statistics as
+json.
+
+Usage:
+    uv run python scripts/mcts_design.py \
+        --model saved-model/PPO_Protein_Design_rng_length/best_model.zip --variable-motif \
+        --n-designs 50 --time-budget 2 --n-threads 4 --batch-size 16
+"""
+import argparse
+import json
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+
+import numpy as np  # noqa: E402
+from stable_baselines3 import A2C, PPO  # noqa: E402
+
+from learner.env_config import env_kwargs  # noqa: E402
+from learner.mcts import compare_with_greedy  # noqa: E402
+
+ALGOS = {"PPO": PPO, "A2C": A2C}
+
+
+def main() -> None:
+    """Run the comparison and print the results as json."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", type=str, required=True, help="Path of the saved model")
+    parser.add_argument("--algo", type=str, default="PPO", choices=sorted(ALGOS))
+    parser.add_argument("--n-designs", type=int, default=20)
+    parser.add_argument("--time-budget", type=float, default=1.0, help="Seconds per design")
+    parser.add_argument("--n-threads", type=int, default=os.cpu_count())
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--c-puct", type=float, default=1.5)
+    parser.add_argument("--variable-motif", action=argparse.BooleanOptionalAction, default=False)
+    parser.add_argument("--variable-length", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--residue-table", type=str, default=None, help="Residue alphabet yaml")
+    parser.add_argument("--target-motifs", type=str, nargs="+", default=None, help="e.g. RI DEK")
+    parser.add_argument("--motif-reward", type=str, default="presence")
+    parser.add_argument("--motif-weights", type=float, nargs="+", default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+
+    model = ALGOS[args.algo].load(args.model, device="cpu")
+    design_env_kwargs = {
+        "change_motif_at_each_episode": args.variable_motif,
+        "change_sequence_length_at_each_episode": args.variable_length,
+        **env_kwargs(vars(args)),
+    }
+    seeds = [int(s) for s in np.random.SeedSequence(args.seed).generate_state(args.n_designs)]
+    results = compare_with_greedy(
+        model,
+        design_env_kwargs,
+        seeds,
+        args.time_budget,
+        n_threads=args.n_threads,
+        batch_size=args.batch_size,
+        c_puct=args.c_puct,
+    )
+    results |= {"time_budget": args.time_budget, "n_threads": args.n_threads}
+    if args.output is None:
+        print(json.dumps(results, indent=2))
+    else:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""This script benchmarks the generalization of a saved model to held-out motifs.
+
+The motifs of the held-out split (the motifs never drawn in training with the same
+`held_out_motif_fraction`) are evaluated for every sequence length with deterministic actions. The
+script prints, as json, the success rate, the mean return and the gap to the return of an optimal
+sequence, overall and for each motif length and sequence length.
+
+Usage:
+    uv run python scripts/motif_generalization.py \
+        --model saved-model/PPO_Protein_Design/best_model.zip --held-out-fraction 0.2 \
+        --n-motifs 10000 --n-workers 8
+"""
+import argparse
+import json
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+
+from learner.export import ALGOS  # noqa: E402
+from learner.motif_benchmark import run_benchmark, sample_held_out_motifs  # noqa: E402
+
+
+def main() -> None:
+    """Run the benchmark and print or save the results as json."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", type=str, required=True, help="Path of the saved model")
+    parser.add_argument("--algo", type=str, default="PPO", choices=sorted(ALGOS))
+    parser.add_argument("--held-out-fraction", type=float, default=0.2)
+    parser.add_argument("--n-motifs", type=int, default=None, help="Default: all held-out motifs")
+    parser.add_argument("--n-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+
+    motifs = sample_held_out_motifs(args.held_out_fraction, args.n_motifs, args.seed)
+    results = run_benchmark(args.algo, args.model, motifs, n_workers=args.n_workers)
+    results["held_out_fraction"] = args.held_out_fraction
+    print(json.dumps(results["overall"]), file=sys.stderr)
+    if args.output is None:
+        print(json.dumps(results, indent=2))
+    else:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
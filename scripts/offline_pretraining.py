@@ -0,0 +1,100 @@
+"""This script measures the online timesteps saved by offline behavior cloning pretraining.
+
+The offline dataset `bc_dataset` is built first if it does not exist: `bc_episodes` episodes of
+the training env, drawn as it does, with the actions of the optimal sequences (bc_source=solver)
+or of the rollouts of a saved `algo` model (bc_source=path). Then an agent is trained online from
+scratch and another one after behavior cloning on the dataset, both until their evaluation reward
+reaches `bc_target_reward` (by default 90% of the mean return of the dataset) or `timesteps`. The
+script prints, as json, the timesteps to the target reward of both agents and the timesteps saved,
+e.g.:
+
+    uv run python scripts/offline_pretraining.py variable_motif=true bc_dataset=saved-model/bc_data
+"""
+import copy
+import json
+import logging
+import os
+import sys
+
+import hydra
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+
+from learner.env_config import env_config  # noqa: E402
+from learner.export import ALGOS  # noqa: E402
+from learner.learner import Agent  # noqa: E402
+from learner.offline import (  # noqa: E402
+    METADATA_FILE,
+    OfflineDataset,
+    build_dataset,
+    sample_episodes,
+    timesteps_to_target,
+)
+
+
+def train_to_target(cfg, target_reward: float, pretrain: bool) -> dict:
+    """Train an agent online until the target reward, after behavior cloning if `pretrain`."""
+    agent = Agent(cfg)
+    agent.model.verbose = 0
+    agent.model.tensorboard_log = None
+    result = {"behavior_cloning": agent.pretrain() if pretrain else None}
+    result |= timesteps_to_target(
+        agent.model,
+        agent.make_env(agent.seed_plan.eval_seeds),
+        target_reward,
+        cfg.timesteps,
+        cfg.bc_eval_freq,
+        cfg.pbt_eval_episodes,
+    )
+    return result
+
+
+@hydra.main(version_base=None, config_path="../config", config_name="defaults")
+def main(cfg) -> None:
+    """Build the dataset if needed, train both agents and print the comparison."""
+    cfg = copy.deepcopy(cfg)
+    cfg.bc_dataset = cfg.bc_dataset or os.path.join(BASE_DIR, "saved-model", "offline_dataset")
+    if not os.path.exists(os.path.join(cfg.bc_dataset, METADATA_FILE)):
+        motifs, lengths = sample_episodes(
+            cfg.bc_episodes,
+            cfg.variable_motif,
+            cfg.variable_length,
+            cfg.held_out_motif_fraction,
+            cfg.seed,
+        )
+        model = None if cfg.bc_source == "solver" else ALGOS[cfg.algo].load(cfg.bc_source)
+        # The returns to go are discounted with the default gamma of the SB3 algorithms.
+        build_dataset(cfg.bc_dataset, motifs, lengths, env_config(cfg), model, gamma=0.99)
+    dataset = OfflineDataset(cfg.bc_dataset)
+    logging.info(f"Offline dataset: {dataset.metadata}")
+    target_reward = cfg.bc_target_reward
+    if target_reward is None:
+        target_reward = 0.9 * dataset.metadata["mean_episode_return"]
+
+    scratch = train_to_target(cfg, target_reward, pretrain=False)
+    logging.info(f"From scratch: {scratch['timesteps_to_target']} timesteps to target")
+    pretrained = train_to_target(cfg, target_reward, pretrain=True)
+    logging.info(f"Pretrained: {pretrained['timesteps_to_target']} timesteps to target")
+
+    timesteps_saved = None
+    if scratch["timesteps_to_target"] is not None and pretrained["timesteps_to_target"] is not None:
+        timesteps_saved = scratch["timesteps_to_target"] - pretrained["timesteps_to_target"]
+    print(
+        json.dumps(
+            {
+                "target_reward": target_reward,
+                "dataset": dataset.metadata,
+                "scratch_timesteps_to_target": scratch["timesteps_to_target"],
+                "pretrained_timesteps_to_target": pretrained["timesteps_to_target"],
+                "timesteps_saved": timesteps_saved,
+                "scratch": scratch,
+                "pretrained": pretrained,
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
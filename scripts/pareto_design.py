@@ -0,0 +1,94 @@
+"""This script designs sequences in multi-objective mode and archives their Pareto front.
+
+Batched episodes of the environment are played with a trained model (or random actions), and the
+sequences of the finished episodes are inserted in a Pareto archive with their return for each
+objective: the motif and charge rewards, and the weighted property sums of --property-objectives.
+The script prints the front, and the throughput of the environment and of the archive.
+
+Usage:
+    uv run python scripts/pareto_design.py --n-envs 4096 --n-episodes 1000000
+    uv run python scripts/pareto_design.py --model saved-model/PPO_Protein_Design/best_model.zip
+    uv run python scripts/pareto_design.py --property-objectives hydrophobicity=1 mass=-0.01
+"""
+import argparse
+import time
+
+import numpy as np
+
+from protein_design_env.amino_acids import AminoAcids
+from protein_design_env.batched_environment import BatchedEnvironment
+from protein_design_env.constants import NUM_AMINO_ACIDS
+from protein_design_env.pareto import ParetoArchive
+
+
+def main() -> None:
+    """Fill the archive with batched rollouts and report the front and the throughputs."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n-envs", type=int, default=4096)
+    parser.add_argument("--n-episodes", type=int, default=1_000_000)
+    parser.add_argument("--model", type=str, default=None, help="Path of a saved PPO model")
+    parser.add_argument("--variable-motif", action="store_true")
+    parser.add_argument("--variable-length", action="store_true")
+    parser.add_argument("--max-sequences-per-point", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--property-objectives",
+        type=str,
+        nargs="*",
+        default=[],
+        help="Weighted residue property sums added as objectives, e.g. hydrophobicity=1 mass=-0.01",
+    )
+    args = parser.parse_args()
+    property_objectives = {}
+    for objective in args.property_objectives:
+        name, _, weight = objective.partition("=")
+        property_objectives[name] = float(weight or 1.0)
+
+    model = None
+    if args.model is not None:
+        from stable_baselines3 import PPO
+
+        model = PPO.load(args.model)
+    env = BatchedEnvironment(
+        args.n_envs,
+        args.variable_motif,
+        args.variable_length,
+        args.seed,
+        multi_objective=True,
+        property_objectives=property_objectives,
+    )
+    archive = ParetoArchive(len(env.objectives), args.max_sequences_per_point)
+    rng = np.random.default_rng(args.seed)
+
+    obs = env.reset()
+    returns = np.zeros((args.n_envs, len(env.objectives)))
+    n_steps = 0
+    env_time = archive_time = 0.0
+    while archive.n_inserted < args.n_episodes:
+        start = time.perf_counter()
+        if model is None:
+            actions = rng.integers(0, NUM_AMINO_ACIDS, args.n_envs)
+        else:
+            actions, _ = model.predict(obs, deterministic=False)
+        obs, _, dones, infos = env.step(actions)
+        returns += infos["reward_vectors"]
+        n_steps += args.n_envs
+        env_time += time.perf_counter() - start
+
+        if dones.any():
+            start = time.perf_counter()
+            archive.insert(infos["final_sequences"][dones], returns[dones])
+            archive_time += time.perf_counter() - start
+            returns[dones] = 0.0
+
+    print(f"Front of {len(archive)} sequences over {len(archive.points)} points {env.objectives}:")
+    for point_id, point in enumerate(archive.points):
+        sequence = archive.sequences[archive.point_ids == point_id][0]
+        names = [AminoAcids(int(amino_acid)).name for amino_acid in sequence if amino_acid != 0]
+        print(f"  {point.tolist()}: e.g. {names}")
+    print(f"Env: {n_steps / env_time:,.0f} steps/s (including action selection)")
+    print(f"Archive: {archive.n_inserted / archive_time:,.0f} sequences/s inserted")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""This script runs population-based training and compares it with sequential single runs.
+
+The population starts from hyperparameters drawn with `learner.pbt.sample_hyperparameters` and is
+trained in a process pool until an agent reaches `pbt_target_reward`. Then, as the sequential
+baseline, one agent per initial configuration is trained in turn with fixed hyperparameters. The
+script prints, as json, the wall-clock time to the target reward of PBT, of the best single
+configuration and of the sequential search trying the configurations in turn, e.g.:
+
+    uv run python scripts/pbt.py timesteps=200000 pbt_population_size=8 pbt_target_reward=40
+"""
+import json
+import logging
+import os
+import sys
+
+import hydra
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+
+from learner.pbt import run_pbt, run_single, sample_hyperparameters  # noqa: E402
+
+
+@hydra.main(version_base=None, config_path="../config", config_name="defaults")
+def main(cfg) -> None:
+    """Run PBT, then the sequential single runs, and print the comparison."""
+    output_dir = cfg.dir or os.path.join(BASE_DIR, "saved-model", "PPO_Protein_Design_pbt")
+    rng = np.random.default_rng(cfg.seed)
+    initial_hyperparameters = [
+        sample_hyperparameters(rng) for _ in range(cfg.pbt_population_size)
+    ]
+
+    pbt = run_pbt(cfg, output_dir, initial_hyperparameters)
+    logging.info(f"PBT: {pbt['seconds_to_target']} s to target, best {pbt['best_member']}")
+    singles = []
+    for i, hyperparameters in enumerate(initial_hyperparameters):
+        singles.append(run_single(cfg, os.path.join(output_dir, f"single_{i}"), hyperparameters))
+        logging.info(f"Single config {i}: {singles[-1]['seconds_to_target']} s to target")
+
+    times_to_target = [s["seconds_to_target"] for s in singles if s["seconds_to_target"]]
+    # Time until a configuration reaches the target when the configurations are tried in turn.
+    sequential_seconds_to_target, elapsed = None, 0.0
+    for single in singles:
+        if single["seconds_to_target"] is not None:
+            sequential_seconds_to_target = elapsed + single["seconds_to_target"]
+            break
+        elapsed += single["seconds"]
+    print(
+        json.dumps(
+            {
+                "target_reward": cfg.pbt_target_reward,
+                "pbt_seconds_to_target": pbt["seconds_to_target"],
+                "best_single_seconds_to_target": min(times_to_target, default=None),
+                "sequential_seconds_to_target": sequential_seconds_to_target,
+                "pbt": pbt,
+                "singles": singles,
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
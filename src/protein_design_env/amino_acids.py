@@ -1,5 +1,7 @@
 from enum import IntEnum
 
+import numpy as np
+
 
 class AminoAcids(IntEnum):
     """IntEnum representing the amino acids."""
@@ -48,3 +50,9 @@ AMINO_ACIDS_TO_CHARGES_DICT = {
     AminoAcids.TYROSINE.value: 0,  # Neutral
     AminoAcids.VALINE.value: 0,  # Neutral
 }
+
+# Charges indexed by amino acid id, index 0 is the padding value used in observations.
+AMINO_ACIDS_TO_CHARGES_ARRAY = np.array(
+    [0] + [AMINO_ACIDS_TO_CHARGES_DICT[amino_acid.value] for amino_acid in AminoAcids],
+    dtype=np.int8,
+)
@@ -0,0 +1,226 @@
+from collections.abc import Mapping
+from typing import Any
+
+import numpy as np
+from numpy._typing import ArrayLike, NDArray
+
+from protein_design_env.constants import (
+    CHARGE_PENALTY,
+    DEFAULT_MOTIF,
+    DEFAULT_SEQUENCE_LENGTH,
+    MAX_MOTIF_LENGTH,
+    MAX_SEQUENCE_LENGTH,
+    MIN_MOTIF_LENGTH,
+    MIN_SEQUENCE_LENGTH,
+)
+from protein_design_env.environment import Environment
+from protein_design_env.motif_targets import MotifTargets
+from protein_design_env.residues import STANDARD_RESIDUES, ResidueTable
+from protein_design_env.scoring import motif_ends_at, step_reward_components
+
+
+class BatchedEnvironment:
+    """Vectorized version of `Environment` stepping `n_envs` episodes at once with NumPy.
+
+    The rewards, observations and terminations of each episode are identical to the ones of
+    `Environment` for the same motif, sequence length and actions. The state of all the episodes is
+    stored in arrays, and the reward is updated incrementally: only the windows ending at the new
+    amino acid are checked for the motif.
+
+    Episodes are reset automatically when they terminate, as in SB3 vectorized environments: the
+    returned observation is the first one of the next episode, and the last observation and
+    sequence of the terminated episode are in the "final_observations" and "final_sequences"
+    entries of the info dict.
+    If the flag "multi_objective" is True, the reward of each objective of `objectives`, OBJECTIVES
+    and the "property_objectives" as in `Environment`, is also returned in the "reward_vectors"
+    entry of the info dict.
+    The sums of the properties of the `residues` table over each sequence are updated at each step
+    in `property_sums`, and given for terminated episodes in the "final_property_sums" entry.
+    If "motifs" are given, they are the fixed target motifs of every episode, as in `Environment`:
+    all the automata step together with one lookup in the transition table of `MotifTargets`.
+    """
+
+    def __init__(
+        self,
+        n_envs: int,
+        change_motif_at_each_episode: bool = False,
+        change_sequence_length_at_each_episode: bool = False,
+        seed: int = 0,
+        multi_objective: bool = False,
+        residues: ResidueTable | None = None,
+        motifs: list[list[int]] | None = None,
+        motif_reward: str = "presence",
+        motif_weights: list[float] | None = None,
+        property_objectives: Mapping[str, float] | None = None,
+    ) -> None:
+        self.n_envs = n_envs
+        self.change_motif_at_each_episode = change_motif_at_each_episode
+        self.change_sequence_length_at_each_episode = change_sequence_length_at_each_episode
+        self.multi_objective = multi_objective
+        self.rng = np.random.default_rng(seed)
+
+        self.residues = STANDARD_RESIDUES if residues is None else residues
+
+        single_env = Environment(
+            change_motif_at_each_episode=change_motif_at_each_episode,
+            residues=self.residues,
+            motifs=motifs,
+            motif_reward=motif_reward,
+            motif_weights=motif_weights,
+            multi_objective=multi_objective,
+            property_objectives=property_objectives,
+        )
+        self.targets: MotifTargets | None = single_env.targets
+        self.objectives = single_env.objectives
+        self.property_rewards = single_env.property_rewards
+        self.observation_space = single_env.observation_space
+        self.action_space = single_env.action_space
+
+        self.states = np.zeros((n_envs, MAX_SEQUENCE_LENGTH), dtype=np.int64)
+        self.lengths = np.zeros(n_envs, dtype=np.int64)
+        self.charges = np.zeros(n_envs, dtype=np.int64)
+        self.motifs = np.zeros((n_envs, MAX_MOTIF_LENGTH), dtype=np.int64)
+        self.motifs[:, : len(DEFAULT_MOTIF)] = DEFAULT_MOTIF
+        self.motif_lengths = np.full(n_envs, len(DEFAULT_MOTIF), dtype=np.int64)
+        self.sequence_lengths = np.full(n_envs, DEFAULT_SEQUENCE_LENGTH, dtype=np.int64)
+        self.motif_hits = np.zeros(n_envs, dtype=bool)
+        self.amino_acids_seen = np.zeros((n_envs, MAX_MOTIF_LENGTH), dtype=bool)
+        self.property_sums = np.zeros((n_envs, self.residues.properties.shape[1]))
+        if self.targets is not None:
+            first_motif = self.targets.padded[0]
+            self.motifs[:] = first_motif
+            self.motif_lengths[:] = np.count_nonzero(first_motif)
+            n_motifs = self.targets.n_motifs
+            self.automaton_states = np.zeros(n_envs, dtype=np.int64)
+            self.motif_counts = np.zeros((n_envs, n_motifs), dtype=np.int64)
+            self.motif_residues_present = np.zeros((n_envs, n_motifs), dtype=np.int64)
+            self.residues_seen = np.zeros((n_envs, self.residues.n_residues + 1), dtype=bool)
+            self._extra_motifs = np.broadcast_to(
+                self.targets.padded[1:].ravel(), (n_envs, (n_motifs - 1) * MAX_MOTIF_LENGTH)
+            )
+
+    def reset(self, seed: int | None = None) -> NDArray:
+        """Reset all the episodes and return their observations."""
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self._reset_episodes(np.ones(self.n_envs, dtype=bool))
+        return self._get_observations()
+
+    def set_episodes(self, motifs: ArrayLike, sequence_lengths: ArrayLike) -> NDArray:
+        """Reset all the episodes with the given motifs and sequence lengths.
+
+        Args:
+            motifs: One motif for all the episodes, or an array of shape (n_envs, motif_length)
+                of motifs padded with zeros. With target motifs, it must be the first of them.
+            sequence_lengths: One sequence length for all the episodes, or one per episode.
+
+        Returns:
+            The observations of the new episodes.
+        """
+        motifs = np.atleast_2d(np.asarray(motifs, dtype=np.int64))
+        motifs = np.pad(motifs, ((0, 0), (0, MAX_MOTIF_LENGTH - motifs.shape[1])))
+        if self.targets is not None and np.any(motifs != self.targets.padded[0]):
+            raise ValueError("The target motifs of the episodes are fixed")
+        self.motifs[:] = motifs
+        self.motif_lengths[:] = np.count_nonzero(self.motifs, axis=1)
+        self.sequence_lengths[:] = sequence_lengths
+        self._clear_sequences(np.ones(self.n_envs, dtype=bool))
+        return self._get_observations()
+
+    def step(self, actions: ArrayLike) -> tuple[NDArray, NDArray, NDArray, dict[str, Any]]:
+        """Add one amino acid to each sequence, compute the rewards and the terminations.
+
+        Args:
+            actions: Zero-based amino acid of each episode.
+
+        Returns:
+            The observations, rewards, terminations and info dict.
+        """
+        amino_acids = np.asarray(actions, dtype=np.int64).reshape(self.n_envs) + 1
+        if np.any(amino_acids < 1) or np.any(amino_acids > self.residues.n_residues):
+            raise ValueError(f"Invalid actions: {actions}")
+
+        rows = np.arange(self.n_envs)
+        self.states[rows, self.lengths] = amino_acids
+        self.lengths += 1
+        self.charges += self.residues.charges[amino_acids]
+        self.property_sums += self.residues.properties[amino_acids]
+        dones = self.lengths >= self.sequence_lengths
+        if self.targets is not None:
+            charge_penalties, motif_rewards = self._step_motif_counts(amino_acids, dones)
+        else:
+            self.amino_acids_seen |= (self.motifs == amino_acids[:, None]) & (
+                np.arange(MAX_MOTIF_LENGTH) < self.motif_lengths[:, None]
+            )
+            self.motif_hits |= motif_ends_at(
+                self.states, self.lengths, self.motifs, self.motif_lengths
+            )
+            charge_penalties, motif_rewards = step_reward_components(
+                self.motif_hits, self.amino_acids_seen, self.motif_lengths, self.charges, dones
+            )
+        rewards = charge_penalties + motif_rewards
+
+        infos: dict[str, Any] = {}
+        if self.multi_objective:
+            infos["reward_vectors"] = np.column_stack(
+                [motif_rewards, charge_penalties, self.property_rewards[amino_acids]]
+            )
+        if dones.any():
+            infos["final_observations"] = self._get_observations()
+            infos["final_sequences"] = self.states.copy()
+            infos["final_property_sums"] = self.property_sums.copy()
+            self._reset_episodes(dones)
+        return self._get_observations(), rewards, dones, infos
+
+    def _step_motif_counts(
+        self, amino_acids: NDArray[np.int64], dones: NDArray[np.bool_]
+    ) -> tuple[NDArray[np.int64], NDArray[np.float64]]:
+        """Update the target motif counts with the new amino acids and return the rewards."""
+        rows = np.arange(self.n_envs)
+        self.automaton_states = self.targets.transitions[self.automaton_states, amino_acids]
+        self.motif_counts += self.targets.matches[self.automaton_states]
+        new_residues = ~self.residues_seen[rows, amino_acids]
+        self.residues_seen[rows, amino_acids] = True
+        self.motif_residues_present += (
+            self.targets.residue_positions[amino_acids] * new_residues[:, None]
+        )
+        motif_rewards = self.targets.motif_rewards(self.motif_counts, self.motif_residues_present)
+        charge_penalties = np.where((self.charges != 0) & dones, CHARGE_PENALTY, 0)
+        return charge_penalties, motif_rewards
+
+    def _get_observations(self) -> NDArray:
+        """Return the observations of all the episodes, as `Environment._get_observation`."""
+        features = [self.states, self.lengths, self.motifs, self.sequence_lengths, self.charges]
+        if self.targets is not None:
+            features += [self._extra_motifs, self.motif_counts]
+        return np.column_stack(features).astype(np.float64)
+
+    def _reset_episodes(self, mask: NDArray[np.bool_]) -> None:
+        """Draw the motifs and sequence lengths of new episodes for the masked envs."""
+        n_resets = int(mask.sum())
+        if self.change_motif_at_each_episode:
+            motif_lengths = self.rng.integers(MIN_MOTIF_LENGTH, MAX_MOTIF_LENGTH + 1, n_resets)
+            motifs = self.rng.choice(self.residues.ids, size=(n_resets, MAX_MOTIF_LENGTH))
+            motifs[np.arange(MAX_MOTIF_LENGTH) >= motif_lengths[:, None]] = 0
+            self.motifs[mask] = motifs
+            self.motif_lengths[mask] = motif_lengths
+        if self.change_sequence_length_at_each_episode:
+            self.sequence_lengths[mask] = self.rng.integers(
+                MIN_SEQUENCE_LENGTH, MAX_SEQUENCE_LENGTH + 1, n_resets
+            )
+        self._clear_sequences(mask)
+
+    def _clear_sequences(self, mask: NDArray[np.bool_]) -> None:
+        """Empty the sequences of the masked envs."""
+        self.states[mask] = 0
+        self.lengths[mask] = 0
+        self.charges[mask] = 0
+        self.motif_hits[mask] = False
+        self.amino_acids_seen[mask] = False
+        self.property_sums[mask] = 0.0
+        if self.targets is not None:
+            self.automaton_states[mask] = 0
+            self.motif_counts[mask] = 0
+            self.motif_residues_present[mask] = 0
+            self.residues_seen[mask] = False
+
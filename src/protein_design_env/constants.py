@@ -3,6 +3,9 @@ from protein_design_env.amino_acids import AminoAcids
 CHARGE_PENALTY = -1
 REWARD_PER_MOTIF = 1
 
+# Objectives of the multi-objective mode, the scalar reward is the sum of their rewards.
+OBJECTIVES = ("motif", "charge")
+
 MIN_SEQUENCE_LENGTH = 15
 MAX_SEQUENCE_LENGTH = 25
 
@@ -11,6 +14,15 @@ DEFAULT_MOTIF = [AminoAcids.ARGININE, AminoAcids.ISOLEUCINE]
 
 MIN_MOTIF_LENGTH = 2
 MAX_MOTIF_LENGTH = 4
+# Rewards of the target motifs of `protein_design_env.motif_targets.MotifTargets`.
+MOTIF_REWARDS = ("presence", "count")
 
 NUM_AMINO_ACIDS = len(AminoAcids)
 AMINO_ACIDS_VALUES = [aa.value for aa in AminoAcids]
+
+# Layout of the flattened observation returned by `Environment._get_observation`.
+OBS_SEQUENCE_LENGTH_INDEX = MAX_SEQUENCE_LENGTH
+OBS_MOTIF_START_INDEX = OBS_SEQUENCE_LENGTH_INDEX + 1
+OBS_TARGET_LENGTH_INDEX = OBS_MOTIF_START_INDEX + MAX_MOTIF_LENGTH
+OBS_CHARGE_INDEX = OBS_TARGET_LENGTH_INDEX + 1
+OBS_SIZE = OBS_CHARGE_INDEX + 1
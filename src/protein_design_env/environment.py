@@ -1,23 +1,64 @@
+import functools
+from collections.abc import Mapping
+from dataclasses import dataclass
 from typing import Any
 import gymnasium as gym
 import numpy as np
 from numpy._typing import NDArray
-from numpy.lib.stride_tricks import sliding_window_view
 import logging
 
-from protein_design_env.amino_acids import AMINO_ACIDS_TO_CHARGES_DICT, AminoAcids
 from protein_design_env.constants import (
-    AMINO_ACIDS_VALUES,
     DEFAULT_MOTIF,
     DEFAULT_SEQUENCE_LENGTH,
     MAX_MOTIF_LENGTH,
     MAX_SEQUENCE_LENGTH,
     MIN_MOTIF_LENGTH,
     MIN_SEQUENCE_LENGTH,
-    NUM_AMINO_ACIDS,
-    REWARD_PER_MOTIF,
+    OBJECTIVES,
 )
 from protein_design_env.constants import CHARGE_PENALTY
+from protein_design_env.motif_targets import MotifTargets
+from protein_design_env.motifs import held_out_motifs, motif_ids
+from protein_design_env.residues import PROPERTIES, STANDARD_RESIDUES, ResidueTable
+
+
+def property_objective_rewards(
+    residues: ResidueTable, property_objectives: Mapping[str, float] | None
+) -> tuple[tuple[str, ...], NDArray[np.float64]]:
+    """Return the objectives and the reward of each residue for each property objective.
+
+    Returns:
+        OBJECTIVES followed by the property objectives, and the array of shape
+        (n_residues + 1, n_property_objectives) of the weighted properties of each residue id.
+    """
+    property_objectives = dict(property_objectives or {})
+    unknown = set(property_objectives) - set(PROPERTIES)
+    if unknown:
+        raise ValueError(f"Unknown property objectives: {sorted(unknown)}")
+    columns = [residues.column(name) * weight for name, weight in property_objectives.items()]
+    rewards = np.column_stack(columns) if columns else np.zeros((residues.n_residues + 1, 0))
+    return OBJECTIVES + tuple(property_objectives), rewards
+
+
+@functools.lru_cache(maxsize=4096)
+def single_motif_targets(motif: tuple[int, ...], n_residues: int) -> MotifTargets:
+    """Return the `MotifTargets` of a single motif, shared by the envs drawing the same motifs."""
+    return MotifTargets([motif], n_residues)
+
+
+@dataclass(frozen=True)
+class EnvironmentSnapshot:
+    """State of an episode of `Environment`, restored with `Environment.restore`.
+
+    Attributes:
+        state: Amino acids of the sequence.
+        motif: Target motif.
+        sequence_length: Target sequence length.
+    """
+
+    state: tuple[int, ...]
+    motif: tuple[int, ...]
+    sequence_length: int
 
 
 class Environment(gym.Env):
@@ -34,6 +75,23 @@ class Environment(gym.Env):
     The length of the episode is either DEFAULT_SEQUENCE_LENGTH if the flag
     "change_sequence_length_at_each_episode" is False or a random number between 15 and 25
     otherwise.
+    If "held_out_motif_fraction" is positive, random motifs are only drawn from the train split of
+    `protein_design_env.motifs.held_out_motifs`, the held-out motifs being kept for evaluation.
+    If the flag "multi_objective" is True, the reward of each objective of OBJECTIVES is also
+    returned in the "reward_vector" entry of the info dict, the scalar reward being their sum.
+    The "property_objectives", e.g. {"hydrophobicity": 1.0, "mass": -0.01}, append one objective
+    per property of the residues table to the reward vector, in `objectives`: its reward at each
+    step is the weight times the property of the new residue, so its return is the weighted sum
+    of the property over the sequence. They are not part of the scalar reward.
+    The residues of the actions and motifs, and their charges, are the ones of the `residues`
+    table, the 20 standard amino acids by default. The action and observation spaces are sized
+    from it.
+    The motif is counted incrementally, in O(1) per step, with the Aho-Corasick automaton of
+    `MotifTargets`, rebuilt when the motif changes and replayed when the state is assigned.
+    If "motifs" are given, they are the fixed targets of every episode instead of the single
+    motif: the motif reward is the one of `MotifTargets` ("motif_reward" and "motif_weights"),
+    and the observation is followed by the motifs after the first one, padded, and the occurrence
+    count of each motif.
     """
 
     def __init__(
@@ -41,20 +99,57 @@ class Environment(gym.Env):
         change_motif_at_each_episode: bool = False,
         change_sequence_length_at_each_episode: bool = False,
         seed: int = 0,
+        multi_objective: bool = False,
+        held_out_motif_fraction: float = 0.0,
+        residues: ResidueTable | None = None,
+        motifs: list[list[int]] | None = None,
+        motif_reward: str = "presence",
+        motif_weights: list[float] | None = None,
+        property_objectives: Mapping[str, float] | None = None,
     ) -> None:
         super().__init__()
+        self.multi_objective = multi_objective
+        self.residues = STANDARD_RESIDUES if residues is None else residues
+        self.objectives, self.property_rewards = property_objective_rewards(
+            self.residues, property_objectives
+        )
+        if property_objectives and not multi_objective:
+            raise ValueError("Property objectives require the multi-objective mode")
+        # Python lists of the property rewards of each residue, for scalar lookups.
+        self._property_rewards: list[list[float]] = self.property_rewards.tolist()
+        if held_out_motif_fraction > 0 and not self.residues.is_standard:
+            raise ValueError("Held-out motifs are only defined for the standard amino acids")
+        # Python list of the charges, faster than the NumPy array for scalar lookups.
+        self._charges: list[int] = self.residues.charges.tolist()
+        self.held_out_motifs = (
+            held_out_motifs(held_out_motif_fraction) if held_out_motif_fraction > 0 else None
+        )
 
         self.change_motif_at_each_episode = change_motif_at_each_episode
         self.change_sequence_length_at_each_episode = change_sequence_length_at_each_episode
         self.rng = np.random.default_rng(seed)
 
+        self.targets = None
         self.motif = DEFAULT_MOTIF
         self.sequence_length = DEFAULT_SEQUENCE_LENGTH
 
-        self.state: list[int] = []
-        #self.action_space = gym.spaces.Discrete(start=1, n=NUM_AMINO_ACIDS)
-        self.action_space = gym.spaces.Discrete(NUM_AMINO_ACIDS)
-        highest_value_possible_in_obs = max(MAX_SEQUENCE_LENGTH, MAX_MOTIF_LENGTH, NUM_AMINO_ACIDS)
+        n_target_features = 0
+        if motifs is not None:
+            if change_motif_at_each_episode:
+                raise ValueError("Target motifs are fixed, they cannot change at each episode")
+            self.targets = MotifTargets(
+                motifs, self.residues.n_residues, motif_reward, motif_weights
+            )
+            self.motif = list(self.targets.motifs[0])
+            self._extra_motifs = self.targets.padded[1:].ravel()
+            n_target_features = self._extra_motifs.size + self.targets.n_motifs
+
+        self.state = []
+        self.action_space = gym.spaces.Discrete(self.residues.n_residues)
+        max_abs_charge = max(1, int(np.abs(self.residues.charges).max()))
+        highest_value_possible_in_obs = max(
+            MAX_SEQUENCE_LENGTH * max_abs_charge, MAX_MOTIF_LENGTH, self.residues.n_residues
+        )
         self.observation_space = gym.spaces.Box(
             low=-highest_value_possible_in_obs,
             high=highest_value_possible_in_obs,
@@ -63,10 +158,37 @@ class Environment(gym.Env):
                 + 1  # sequence length.
                 + MAX_MOTIF_LENGTH  # padded motif.
                 + 1  # target sequence length.
-                + 1,  # charge
+                + 1  # charge
+                + n_target_features,  # other target motifs and occurrence counts.
             ),
             dtype=float,
         )
+        self.action_space.seed(seed)
+
+    @property
+    def motif(self) -> list[int]:
+        """Target motif of the episode, the first target motif if there are several."""
+        return self._motif
+
+    @motif.setter
+    def motif(self, motif: list[int]) -> None:
+        self._motif = motif
+        if self.targets is None:
+            # The automaton of the new motif is built when the motifs are next counted.
+            self._motif_targets = None
+        else:
+            self._motif_targets = self.targets
+
+    @property
+    def state(self) -> list[int]:
+        """Amino acids of the sequence."""
+        return self._state
+
+    @state.setter
+    def state(self, state: list[int]) -> None:
+        self._state = state
+        # The motifs are counted again from the start of the new sequence.
+        self._counted_targets = None
 
     def reset(
         self,
@@ -74,12 +196,19 @@ class Environment(gym.Env):
         seed: int | None = None,
         options: dict[str, Any] | None = None,
     ) -> tuple[NDArray, dict[str, Any]]:
-        """Resets the environment."""
+        """Resets the environment.
+
+        If a seed is given, the generator of motifs and sequence lengths is re-seeded with it, as
+        when the environment is created with this seed.
+        """
         super().reset(seed=seed, options=options)
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+            self.action_space.seed(seed)
 
         self.motif = self._generate_motif()
         self.sequence_length = self._generate_sequence_length()
-        self.state.clear()
+        self.state = []
         obs = self._get_observation()
         #logging.debug(f"motif: {self.motif}; sequence_lenght: {self.sequence_length}")
         return obs, {}
@@ -88,54 +217,110 @@ class Environment(gym.Env):
         """Adds an amino acid, compute the reward and the termination condition."""
         # Since algorithms use 0 starting then we map zero-based action to one-based action
         one_based_action = action + 1
-        if one_based_action not in range(1, NUM_AMINO_ACIDS + 1):
+        if not 1 <= one_based_action <= self.residues.n_residues:
             raise ValueError(f"Invalid action: {one_based_action}")
-            
-        self.state.append(AminoAcids(one_based_action).value)
 
-        reward = self._get_reward()
+        self._state.append(int(one_based_action))
+
+        charge_penalty, motif_reward = self._get_reward_components()
+        reward = charge_penalty + motif_reward
         terminated = truncated = len(self.state) >= self.sequence_length
         obs = self._get_observation()
-        return obs, reward, terminated, truncated, {}
+        info = {}
+        if self.multi_objective:
+            info["reward_vector"] = np.array(
+                [motif_reward, charge_penalty, *self._property_rewards[one_based_action]],
+                dtype=np.float64,
+            )
+        return obs, reward, terminated, truncated, info
+
+    def snapshot(self) -> EnvironmentSnapshot:
+        """Return the state of the episode, e.g. to explore several continuations of it.
+
+        The dynamics are deterministic given the actions, so restoring a snapshot and playing the
+        same actions gives the same rewards and observations. The random generator of the motifs
+        and sequence lengths of the next episodes is not part of the snapshot.
+        """
+        return EnvironmentSnapshot(tuple(self.state), tuple(self.motif), self.sequence_length)
+
+    def restore(self, snapshot: EnvironmentSnapshot) -> NDArray:
+        """Restore the state of an episode saved by `snapshot` and return its observation."""
+        self.state = list(snapshot.state)
+        self.motif = list(snapshot.motif)
+        self.sequence_length = snapshot.sequence_length
+        return self._get_observation()
 
     def _get_observation(self) -> NDArray:
         """Returns the observation of the current state."""
         charge = self._get_charge()
-        flattened_obs = np.hstack(
-            [self._pad_state(), len(self.state), self._pad_motif(), self.sequence_length, charge]
-        ).astype(np.float64)
+        features = [self._pad_state(), len(self.state), self._pad_motif(), self.sequence_length]
+        if self.targets is not None:
+            self._count_motifs()
+            features += [charge, self._extra_motifs, self.motif_counts]
+        else:
+            features.append(charge)
+        flattened_obs = np.hstack(features).astype(np.float64)
         return flattened_obs
 
     def _get_reward(self) -> int:
         """Compute the reward of a sequence."""
-        motif_coeff = 0.0
-        bonus_per_amino_acid_of_the_motif_in_state = 0.0
-        if len(self.state) >= len(self.motif):
-            possible_motifs = sliding_window_view(self.state, len(self.motif))
-            for motif in possible_motifs:
-                if all(motif == self.motif):
-                    motif_coeff = 1.0
-
-        if motif_coeff == 0.0:
-            for amino_acid_id in self.motif:
-                if amino_acid_id in self.state:
-                    bonus_per_amino_acid_of_the_motif_in_state += 1 / (5 * len(self.motif))
-
-        if self._get_charge() != 0 and len(self.state) >= self.sequence_length:
-            charge_penalty = CHARGE_PENALTY if self._get_charge() != 0 else 0
-        else:
-            charge_penalty = 0
-
-        reward: int = (
-            charge_penalty
-            + REWARD_PER_MOTIF * motif_coeff
-            + bonus_per_amino_acid_of_the_motif_in_state
-        )
+        charge_penalty, motif_reward = self._get_reward_components()
+        reward: int = charge_penalty + motif_reward
         return reward
 
+    def _get_reward_components(self) -> tuple[int, float]:
+        """Compute the charge penalty and the motif reward of a sequence."""
+        return self._charge_penalty(), self._count_motifs()
+
+    def _charge_penalty(self) -> int:
+        """Return CHARGE_PENALTY if the sequence is complete and not neutral, else 0."""
+        if len(self.state) >= self.sequence_length and self._get_charge() != 0:
+            return CHARGE_PENALTY
+        return 0
+
+    def _clear_motif_counts(self, targets: MotifTargets) -> None:
+        """Reset the automaton and the occurrence counts of the motifs."""
+        self._counted_targets = targets
+        self._n_counted = 0
+        self._automaton_state = 0
+        self.motif_counts = [0] * targets.n_motifs
+        self._motif_residues_present = [0] * targets.n_motifs
+        self._residues_seen = [False] * (self.residues.n_residues + 1)
+
+    def _count_motifs(self) -> float:
+        """Count the motifs in the amino acids added since the last call and return the reward.
+
+        The counts are kept from one call to the next, so each step costs O(1) per amino acid
+        whatever the motifs. They are started again for a new motif or an assigned state.
+        """
+        targets = self._motif_targets
+        if targets is None:
+            targets = single_motif_targets(tuple(self._motif), self.residues.n_residues)
+            self._motif_targets = targets
+        state = self._state
+        if targets is not self._counted_targets or self._n_counted > len(state):
+            self._clear_motif_counts(targets)
+        for position in range(self._n_counted, len(state)):
+            amino_acid = state[position]
+            self._automaton_state = targets.transitions_list[self._automaton_state][amino_acid]
+            for index in targets.matches_list[self._automaton_state]:
+                self.motif_counts[index] += 1
+            if not self._residues_seen[amino_acid]:
+                self._residues_seen[amino_acid] = True
+                for index, n in targets.residue_positions_list[amino_acid]:
+                    self._motif_residues_present[index] += n
+        self._n_counted = len(state)
+        return targets.motif_reward(self.motif_counts, self._motif_residues_present)
+
     def _get_charge(self) -> int:
         """Compute the charge of a sequence."""
-        return sum(AMINO_ACIDS_TO_CHARGES_DICT[amino_acid] for amino_acid in self.state)
+        charges = self._charges
+        return sum([charges[amino_acid] for amino_acid in self.state])
+
+    def sequence_properties(self) -> dict[str, float]:
+        """Return the sum of each property of the residues table over the sequence."""
+        sums = self.residues.properties[self.state].sum(axis=0)
+        return dict(zip(PROPERTIES, sums.tolist(), strict=True))
 
     def _generate_motif(self) -> list[int]:
         """Generate a random motif of amino acids and update the observation space.
@@ -143,12 +328,17 @@ class Environment(gym.Env):
         The motif length is between MIN_MOTIF_LENGTH and MAX_MOTIF_LENGTH.
         """
         if self.change_motif_at_each_episode:
-            motif_length = self.rng.integers(
-                low=MIN_MOTIF_LENGTH, high=MAX_MOTIF_LENGTH + 1, size=1
-            ).item()
-            self.motif: list[int] = self.rng.choice(  # type: ignore[no-redef]
-                AMINO_ACIDS_VALUES, replace=True, size=motif_length
-            ).tolist()
+            while True:
+                motif_length = self.rng.integers(
+                    low=MIN_MOTIF_LENGTH, high=MAX_MOTIF_LENGTH + 1, size=1
+                ).item()
+                self.motif: list[int] = self.rng.choice(  # type: ignore[no-redef]
+                    self.residues.ids, replace=True, size=motif_length
+                ).tolist()
+                # Draw again the motifs kept for evaluation.
+                held_out = self.held_out_motifs
+                if held_out is None or not held_out[motif_ids(self.motif)[0]]:
+                    break
         return self.motif  # type: ignore[no-any-return]
 
     def _generate_sequence_length(self) -> int:
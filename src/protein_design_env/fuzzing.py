@@ -0,0 +1,346 @@
+"""Property-based differential testing of the env backends against `Environment`.
+
+Random episodes (motif, sequence length and actions) are generated in bulk, with a bias towards
+the edge cases of the reward: motifs with repeated amino acids, motifs planted in the actions
+(possibly overlapping or at the last step), sequence lengths at the bounds or shorter than the
+motif, and actions drawn from the charged and motif amino acids. Each backend plays the episodes
+and returns its trajectories, which must be identical to the ones of the reference
+`Environment`:
+- "batched": `BatchedEnvironment`, all the episodes stepped at once,
+- "torch": `TorchBatchedEnvironment` on CPU, whose terminal observations are not returned,
+- "snapshot": `Environment` restored from a snapshot into a new env at every step,
+- "scoring": `score_sequences` of every prefix of the sequences, which only gives the returns,
+- "automaton": `Environment` with the motif as its only target motif, counted by the Aho-Corasick
+  automaton, whose observations start with the reference ones.
+
+Chunks of episodes are played by every backend in worker processes, which also time them.
+"""
+
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import torch
+from numpy._typing import NDArray
+
+from protein_design_env.amino_acids import AMINO_ACIDS_TO_CHARGES_ARRAY
+from protein_design_env.batched_environment import BatchedEnvironment
+from protein_design_env.constants import (
+    MAX_MOTIF_LENGTH,
+    MAX_SEQUENCE_LENGTH,
+    MIN_MOTIF_LENGTH,
+    MIN_SEQUENCE_LENGTH,
+    NUM_AMINO_ACIDS,
+    OBS_SIZE,
+)
+from protein_design_env.environment import Environment
+from protein_design_env.scoring import score_sequences
+from protein_design_env.torch_environment import TorchBatchedEnvironment
+
+# One-based ids of the charged amino acids.
+CHARGED_AMINO_ACIDS = np.flatnonzero(AMINO_ACIDS_TO_CHARGES_ARRAY)
+# Fields of the trajectories compared with the reference.
+FIELDS = ("observations", "rewards", "terminated", "returns")
+
+
+@dataclass(frozen=True)
+class FuzzCases:
+    """Batch of episodes played by every backend.
+
+    Attributes:
+        motifs: Array of shape (n_cases, MAX_MOTIF_LENGTH) of one-based motifs padded with zeros.
+        sequence_lengths: Target sequence length of each episode.
+        actions: Array of shape (n_cases, MAX_SEQUENCE_LENGTH) of zero-based actions, the ones
+            past the sequence length are not played.
+    """
+
+    motifs: NDArray[np.int64]
+    sequence_lengths: NDArray[np.int64]
+    actions: NDArray[np.int64]
+
+    def __len__(self) -> int:
+        """Return the number of cases."""
+        return len(self.sequence_lengths)
+
+    def __getitem__(self, index) -> "FuzzCases":
+        """Return the cases of an index, slice or mask of cases."""
+        return FuzzCases(self.motifs[index], self.sequence_lengths[index], self.actions[index])
+
+
+def generate_cases(n_cases: int, seed: int = 0) -> FuzzCases:
+    """Draw random episodes, biased towards the edge cases of the reward."""
+    rng = np.random.default_rng(seed)
+    motif_lengths = rng.integers(MIN_MOTIF_LENGTH, MAX_MOTIF_LENGTH + 1, n_cases)
+    motifs = rng.integers(1, NUM_AMINO_ACIDS + 1, (n_cases, MAX_MOTIF_LENGTH))
+    # Motifs with a single amino acid, e.g. [4, 4, 4], or a small alphabet, e.g. [2, 5, 2].
+    repeated = rng.random(n_cases) < 0.1
+    motifs[repeated] = motifs[repeated, :1]
+    small_alphabet = rng.random(n_cases) < 0.1
+    motifs[small_alphabet] = motifs[small_alphabet][:, rng.integers(0, 2, MAX_MOTIF_LENGTH)]
+    motifs[np.arange(MAX_MOTIF_LENGTH) >= motif_lengths[:, None]] = 0
+
+    sequence_lengths = rng.integers(MIN_SEQUENCE_LENGTH, MAX_SEQUENCE_LENGTH + 1, n_cases)
+    bounds = rng.random(n_cases)
+    sequence_lengths[bounds < 0.1] = MIN_SEQUENCE_LENGTH
+    sequence_lengths[(bounds >= 0.1) & (bounds < 0.2)] = MAX_SEQUENCE_LENGTH
+    short = (bounds >= 0.2) & (bounds < 0.3)
+    sequence_lengths[short] = rng.integers(1, MIN_SEQUENCE_LENGTH, short.sum())
+
+    actions = rng.integers(0, NUM_AMINO_ACIDS, (n_cases, MAX_SEQUENCE_LENGTH))
+    # Actions drawn from the motif and charged amino acids reach hits and neutral charges often.
+    charged = np.broadcast_to(CHARGED_AMINO_ACIDS, (n_cases, len(CHARGED_AMINO_ACIDS)))
+    alphabet = np.column_stack([motifs, charged])
+    focused = rng.random(n_cases) < 0.3
+    choices = rng.integers(0, alphabet.shape[1], (n_cases, MAX_SEQUENCE_LENGTH))
+    focused_actions = np.take_along_axis(alphabet, choices, axis=1) - 1
+    # Padding zeros of the motifs give -1: replace them by a random amino acid.
+    focused_actions = np.where(focused_actions < 0, actions, focused_actions)
+    actions[focused] = focused_actions[focused]
+    # Plant the motif once or twice, possibly overlapping or ending at the last step.
+    for _ in range(2):
+        planted = rng.random(n_cases) < 0.4
+        ends = rng.integers(motif_lengths, np.maximum(sequence_lengths, motif_lengths) + 1)
+        for offset in range(MAX_MOTIF_LENGTH):
+            positions = ends - motif_lengths + offset
+            rows = np.flatnonzero(planted & (offset < motif_lengths))
+            actions[rows, positions[rows]] = motifs[rows, offset] - 1
+    return FuzzCases(motifs, sequence_lengths, actions)
+
+
+def _empty_trajectories(n_cases: int) -> dict[str, NDArray]:
+    """Return trajectories filled with NaN, the value of the steps a backend does not give."""
+    return {
+        "observations": np.full((n_cases, MAX_SEQUENCE_LENGTH, OBS_SIZE), np.nan),
+        "rewards": np.full((n_cases, MAX_SEQUENCE_LENGTH), np.nan),
+        "terminated": np.full((n_cases, MAX_SEQUENCE_LENGTH), np.nan),
+        "returns": np.full((n_cases, MAX_SEQUENCE_LENGTH), np.nan),
+    }
+
+
+def play_environment(cases: FuzzCases) -> dict[str, NDArray]:
+    """Play the episodes one by one in the reference `Environment`."""
+    trajectories = _empty_trajectories(len(cases))
+    env = Environment()
+    for i in range(len(cases)):
+        env.reset()
+        env.motif = cases.motifs[i, cases.motifs[i] > 0].tolist()
+        env.sequence_length = int(cases.sequence_lengths[i])
+        for step in range(env.sequence_length):
+            obs, reward, terminated, _, _ = env.step(int(cases.actions[i, step]))
+            trajectories["observations"][i, step] = obs
+            trajectories["rewards"][i, step] = reward
+            trajectories["terminated"][i, step] = terminated
+    trajectories["returns"] = np.cumsum(trajectories["rewards"], axis=1)
+    return trajectories
+
+
+def play_snapshot(cases: FuzzCases) -> dict[str, NDArray]:
+    """Play each step in a new `Environment` restored from the snapshot of the previous step."""
+    trajectories = _empty_trajectories(len(cases))
+    for i in range(len(cases)):
+        env = Environment()
+        env.reset()
+        env.motif = cases.motifs[i, cases.motifs[i] > 0].tolist()
+        env.sequence_length = int(cases.sequence_lengths[i])
+        for step in range(env.sequence_length):
+            snapshot = env.snapshot()
+            env = Environment()
+            env.restore(snapshot)
+            obs, reward, terminated, _, _ = env.step(int(cases.actions[i, step]))
+            trajectories["observations"][i, step] = obs
+            trajectories["rewards"][i, step] = reward
+            trajectories["terminated"][i, step] = terminated
+    trajectories["returns"] = np.cumsum(trajectories["rewards"], axis=1)
+    return trajectories
+
+
+def play_automaton(cases: FuzzCases) -> dict[str, NDArray]:
+    """Play the episodes one by one in an `Environment` whose only target motif is the motif."""
+    trajectories = _empty_trajectories(len(cases))
+    for i in range(len(cases)):
+        env = Environment(motifs=[cases.motifs[i, cases.motifs[i] > 0].tolist()])
+        env.reset()
+        env.sequence_length = int(cases.sequence_lengths[i])
+        for step in range(env.sequence_length):
+            obs, reward, terminated, _, _ = env.step(int(cases.actions[i, step]))
+            trajectories["observations"][i, step] = obs[:OBS_SIZE]
+            trajectories["rewards"][i, step] = reward
+            trajectories["terminated"][i, step] = terminated
+    trajectories["returns"] = np.cumsum(trajectories["rewards"], axis=1)
+    return trajectories
+
+
+def play_batched(cases: FuzzCases) -> dict[str, NDArray]:
+    """Play all the episodes at once in a `BatchedEnvironment`."""
+    trajectories = _empty_trajectories(len(cases))
+    env = BatchedEnvironment(len(cases))
+    env.set_episodes(cases.motifs, cases.sequence_lengths)
+    for step in range(int(cases.sequence_lengths.max())):
+        obs, rewards, dones, infos = env.step(cases.actions[:, step])
+        if dones.any():
+            obs = np.where(dones[:, None], infos["final_observations"], obs)
+        _store_step(trajectories, cases, step, obs, rewards, dones)
+    trajectories["returns"] = np.cumsum(trajectories["rewards"], axis=1)
+    return trajectories
+
+
+def play_torch(cases: FuzzCases) -> dict[str, NDArray]:
+    """Play all the episodes at once in a `TorchBatchedEnvironment` on CPU."""
+    trajectories = _empty_trajectories(len(cases))
+    env = TorchBatchedEnvironment(len(cases))
+    env.set_episodes(torch.from_numpy(cases.motifs), torch.from_numpy(cases.sequence_lengths))
+    actions = torch.from_numpy(cases.actions)
+    for step in range(int(cases.sequence_lengths.max())):
+        obs, rewards, dones = env.step(actions[:, step])
+        obs = obs.double().numpy()
+        # The env is reset at the end of the episodes, its terminal observations are lost.
+        obs[dones.numpy()] = np.nan
+        _store_step(trajectories, cases, step, obs, rewards.numpy(), dones.numpy())
+    trajectories["returns"] = np.cumsum(trajectories["rewards"], axis=1)
+    return trajectories
+
+
+def play_scoring(cases: FuzzCases) -> dict[str, NDArray]:
+    """Score every prefix of the sequences with `score_sequences`, which only gives the returns."""
+    trajectories = _empty_trajectories(len(cases))
+    sequences = cases.actions + 1
+    for step in range(int(cases.sequence_lengths.max())):
+        active = step < cases.sequence_lengths
+        scores = score_sequences(
+            sequences[active], cases.motifs[active], cases.sequence_lengths[active], step + 1
+        )
+        trajectories["returns"][active, step] = scores.returns
+    return trajectories
+
+
+def _store_step(
+    trajectories: dict[str, NDArray],
+    cases: FuzzCases,
+    step: int,
+    obs: NDArray,
+    rewards: NDArray,
+    dones: NDArray,
+) -> None:
+    """Store a step of a batched backend for the episodes which are not finished."""
+    active = step < cases.sequence_lengths
+    trajectories["observations"][active, step] = obs[active]
+    trajectories["rewards"][active, step] = rewards[active]
+    trajectories["terminated"][active, step] = dones[active]
+
+
+BACKENDS: dict[str, Callable[[FuzzCases], dict[str, NDArray]]] = {
+    "environment": play_environment,
+    "batched": play_batched,
+    "torch": play_torch,
+    "snapshot": play_snapshot,
+    "scoring": play_scoring,
+    "automaton": play_automaton,
+}
+
+
+def find_mismatches(
+    reference: dict[str, NDArray], trajectories: dict[str, NDArray]
+) -> list[tuple[int, int, str]]:
+    """Return the first (case, step, field) differing from the reference in each case.
+
+    Steps which a backend does not give (NaN) are not compared.
+    """
+    first_mismatch: dict[int, tuple[int, str]] = {}
+    for field in FIELDS:
+        expected, actual = reference[field], trajectories[field]
+        differs = ~np.isnan(actual) & (actual != expected)
+        if differs.ndim == 3:
+            differs = differs.any(axis=2)
+        for case, step in zip(*np.nonzero(differs), strict=True):
+            if case not in first_mismatch or step < first_mismatch[case][0]:
+                first_mismatch[int(case)] = (int(step), field)
+    return sorted((case, step, field) for case, (step, field) in first_mismatch.items())
+
+
+def _init_worker() -> None:
+    # Workers share the cores of the machine.
+    torch.set_num_threads(1)
+
+
+def _play_chunk(
+    backends: dict[str, Callable], cases: FuzzCases
+) -> tuple[dict[str, float], list[tuple[str, int, int, str]]]:
+    """Play a chunk of cases with every backend.
+
+    Returns:
+    - The time taken by each backend, and the (backend, case, step, field) mismatches with the
+      reference, with case indices relative to the chunk.
+    """
+    seconds = {}
+    start = time.perf_counter()
+    reference = play_environment(cases)
+    seconds["environment"] = time.perf_counter() - start
+    mismatches = []
+    for name, play in backends.items():
+        if name == "environment":
+            continue
+        start = time.perf_counter()
+        trajectories = play(cases)
+        seconds[name] = time.perf_counter() - start
+        for case, step, field in find_mismatches(reference, trajectories):
+            mismatches.append((name, case, step, field))
+    return seconds, mismatches
+
+
+def run_fuzz(
+    n_cases: int,
+    seed: int = 0,
+    chunk_size: int = 2048,
+    n_workers: int = 1,
+    backends: dict[str, Callable] | None = None,
+    max_counterexamples: int = 10,
+) -> dict:
+    """Compare the backends with the reference on `n_cases` random episodes.
+
+    Parameters:
+    - n_cases: Number of generated episodes.
+    - seed: Seed of the episodes.
+    - chunk_size: Number of episodes played by each task.
+    - n_workers: Number of worker processes, the chunks are played in this process if 1.
+    - backends: Backends to check, BACKENDS by default.
+    - max_counterexamples: Maximum number of reported counterexamples.
+
+    Returns:
+    - The number of episodes and steps, the steps per second of each backend (per worker) and its
+      number of mismatching episodes, and counterexamples: the motif, sequence length and actions
+      up to the first mismatching step of mismatching episodes.
+    """
+    backends = BACKENDS if backends is None else backends
+    cases = generate_cases(n_cases, seed)
+    starts = range(0, n_cases, chunk_size)
+    chunks = [cases[start : start + chunk_size] for start in starts]
+    if n_workers == 1:
+        results = [_play_chunk(backends, chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(n_workers, initializer=_init_worker) as executor:
+            results = list(executor.map(_play_chunk, [backends] * len(chunks), chunks))
+
+    n_steps = int(cases.sequence_lengths.sum())
+    report: dict = {"n_cases": n_cases, "n_steps": n_steps, "backends": {}, "counterexamples": []}
+    for name in dict.fromkeys(["environment", *backends]):
+        seconds = sum(chunk_seconds[name] for chunk_seconds, _ in results)
+        report["backends"][name] = {"steps_per_second": n_steps / seconds, "mismatches": 0}
+    for start, (_, mismatches) in zip(starts, results, strict=True):
+        for name, case, step, field in mismatches:
+            report["backends"][name]["mismatches"] += 1
+            if len(report["counterexamples"]) < max_counterexamples:
+                case += start
+                motif = cases.motifs[case]
+                report["counterexamples"].append(
+                    {
+                        "backend": name,
+                        "field": field,
+                        "step": step,
+                        "motif": motif[motif > 0].tolist(),
+                        "sequence_length": int(cases.sequence_lengths[case]),
+                        "actions": cases.actions[case, : step + 1].tolist(),
+                    }
+                )
+    return report
@@ -0,0 +1,163 @@
+"""Several target motifs counted with an Aho-Corasick automaton.
+
+The automaton reads a sequence one residue at a time. Its state is the longest suffix of the
+sequence which is a prefix of a motif, and the motifs ending at the last residue only depend on
+this state. The transitions are precomputed for every (state, residue) pair, failure links
+included, so appending a residue is one table lookup whatever the number and length of the
+motifs, and the occurrence counts are updated from the motifs matched by the new state.
+
+The reward of the motifs generalizes the single motif reward of `Environment`: each motif gives
+REWARD_PER_MOTIF times its weight at each step once present ("presence") or per occurrence
+("count"), and the bonus of its residues present in the sequence until then.
+"""
+
+from collections import deque
+from collections.abc import Sequence
+
+import numpy as np
+from numpy._typing import NDArray
+
+from protein_design_env.constants import MAX_MOTIF_LENGTH, MOTIF_REWARDS, REWARD_PER_MOTIF
+
+
+def build_automaton(
+    motifs: Sequence[Sequence[int]], n_residues: int
+) -> tuple[NDArray[np.int64], NDArray[np.int64]]:
+    """Build the Aho-Corasick automaton of motifs of one-based residue ids.
+
+    Returns:
+        The transitions, of shape (n_states, n_residues + 1), giving the state after appending a
+        residue (the padding id 0 goes back to the root state 0), and the matches, of shape
+        (n_states, n_motifs), whether each motif ends when entering a state.
+    """
+    children: list[dict[int, int]] = [{}]
+    terminal: list[list[int]] = [[]]
+    for index, motif in enumerate(motifs):
+        state = 0
+        for residue in motif:
+            if residue not in children[state]:
+                children.append({})
+                terminal.append([])
+                children[state][residue] = len(children) - 1
+            state = children[state][residue]
+        terminal[state].append(index)
+
+    n_states = len(children)
+    transitions = np.zeros((n_states, n_residues + 1), dtype=np.int64)
+    matches = np.zeros((n_states, len(motifs)), dtype=np.int64)
+    failures = [0] * n_states
+    # Breadth-first order, so the failure state of a state is complete before the state.
+    queue = deque([0])
+    while queue:
+        state = queue.popleft()
+        matches[state, terminal[state]] = 1
+        if state != 0:
+            matches[state] |= matches[failures[state]]
+            transitions[state, 1:] = transitions[failures[state], 1:]
+        for residue, child in children[state].items():
+            failures[child] = transitions[state, residue] if state != 0 else 0
+            transitions[state, residue] = child
+            queue.append(child)
+    return transitions, matches
+
+
+class MotifTargets:
+    """Target motifs of an episode, their automaton and their reward.
+
+    Parameters:
+    - motifs: Motifs of one-based residue ids, of 1 to MAX_MOTIF_LENGTH residues.
+    - n_residues: Number of residues of the alphabet.
+    - reward: "presence" or "count", see the module docstring.
+    - weights: Weight of the reward of each motif, 1 by default.
+    """
+
+    def __init__(
+        self,
+        motifs: Sequence[Sequence[int]],
+        n_residues: int,
+        reward: str = "presence",
+        weights: Sequence[float] | None = None,
+    ) -> None:
+        self.motifs = tuple(tuple(int(residue) for residue in motif) for motif in motifs)
+        if not self.motifs:
+            raise ValueError("At least one motif is required")
+        for motif in self.motifs:
+            if not 1 <= len(motif) <= MAX_MOTIF_LENGTH or not all(
+                1 <= residue <= n_residues for residue in motif
+            ):
+                raise ValueError(f"Invalid motif: {motif}")
+        if reward not in MOTIF_REWARDS:
+            raise ValueError(f"Unknown motif reward: {reward}")
+        self.reward = reward
+        self.weights = tuple(float(w) for w in (weights or [1.0] * len(self.motifs)))
+        if len(self.weights) != len(self.motifs):
+            raise ValueError("There must be one weight per motif")
+
+        self.transitions, self.matches = build_automaton(self.motifs, n_residues)
+        # Number of residues of each motif equal to each residue id.
+        self.residue_positions = np.zeros((n_residues + 1, len(self.motifs)), dtype=np.int64)
+        for index, motif in enumerate(self.motifs):
+            np.add.at(self.residue_positions[:, index], list(motif), 1)
+        # Bonus of each number of motif residues present, summed one residue at a time as
+        # `Environment` does, so the rewards are identical floats.
+        self.bonus_values = np.zeros((len(self.motifs), MAX_MOTIF_LENGTH + 1))
+        for index, motif in enumerate(self.motifs):
+            for n in range(1, len(motif) + 1):
+                self.bonus_values[index, n] = self.bonus_values[index, n - 1] + 1 / (
+                    5 * len(motif)
+                )
+        self.padded = np.zeros((len(self.motifs), MAX_MOTIF_LENGTH), dtype=np.int64)
+        for index, motif in enumerate(self.motifs):
+            self.padded[index, : len(motif)] = motif
+
+        # Python lists for the scalar lookups of `Environment.step`, faster than NumPy indexing.
+        self.transitions_list: list[list[int]] = self.transitions.tolist()
+        self.matches_list = [np.flatnonzero(row).tolist() for row in self.matches]
+        self.residue_positions_list = [
+            [(index, n) for index, n in enumerate(row) if n]
+            for row in self.residue_positions.tolist()
+        ]
+        self.bonus_values_list: list[list[float]] = self.bonus_values.tolist()
+
+    @property
+    def n_motifs(self) -> int:
+        """Number of motifs."""
+        return len(self.motifs)
+
+    def count(self, sequence: Sequence[int]) -> tuple[list[int], list[int]]:
+        """Return the occurrences of each motif in a sequence and its number of residues present."""
+        counts = [0] * self.n_motifs
+        state = 0
+        for residue in sequence:
+            state = self.transitions_list[state][residue]
+            for index in self.matches_list[state]:
+                counts[index] += 1
+        bonus_hits = [0] * self.n_motifs
+        for residue in set(sequence):
+            for index, n in self.residue_positions_list[residue]:
+                bonus_hits[index] += n
+        return counts, bonus_hits
+
+    def motif_reward(self, counts: Sequence[int], bonus_hits: Sequence[int]) -> float:
+        """Return the motif reward of a step given the counts and residues present of each motif."""
+        reward = 0.0
+        for index, (count, weight) in enumerate(zip(counts, self.weights, strict=True)):
+            if count == 0:
+                reward += weight * self.bonus_values_list[index][bonus_hits[index]]
+            elif self.reward == "count":
+                reward += weight * (REWARD_PER_MOTIF * count)
+            else:
+                reward += weight * REWARD_PER_MOTIF
+        return reward
+
+    def motif_rewards(self, counts: NDArray, bonus_hits: NDArray) -> NDArray[np.float64]:
+        """Vectorized `motif_reward` of arrays of shape (n_sequences, n_motifs)."""
+        rewards = np.zeros(len(counts))
+        for index, weight in enumerate(self.weights):
+            present = counts[:, index] if self.reward == "count" else counts[:, index] > 0
+            rewards += np.where(
+                counts[:, index] == 0,
+                weight * self.bonus_values[index, bonus_hits[:, index]],
+                weight * (REWARD_PER_MOTIF * present),
+            )
+        return rewards
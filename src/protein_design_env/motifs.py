@@ -0,0 +1,92 @@
+"""Enumeration of all the motifs and fixed train/held-out motif splits.
+
+Motifs of length MIN_MOTIF_LENGTH to MAX_MOTIF_LENGTH are identified by an integer id: motifs are
+ordered by length, then by their amino acids written in base NUM_AMINO_ACIDS.
+"""
+
+import numpy as np
+from numpy._typing import ArrayLike, NDArray
+
+from protein_design_env.amino_acids import AMINO_ACIDS_TO_CHARGES_ARRAY, AminoAcids
+from protein_design_env.constants import (
+    MAX_MOTIF_LENGTH,
+    MIN_MOTIF_LENGTH,
+    NUM_AMINO_ACIDS,
+)
+
+MOTIF_LENGTHS = np.arange(MIN_MOTIF_LENGTH, MAX_MOTIF_LENGTH + 1)
+# Number of motifs of each length and id of the first motif of each length.
+N_MOTIFS_PER_LENGTH = NUM_AMINO_ACIDS**MOTIF_LENGTHS
+FIRST_MOTIF_ID_PER_LENGTH = np.concatenate([[0], np.cumsum(N_MOTIFS_PER_LENGTH)[:-1]])
+N_MOTIFS = int(N_MOTIFS_PER_LENGTH.sum())
+
+# Seed of the default train/held-out split, fixed so that splits are comparable across runs.
+MOTIF_SPLIT_SEED = 0
+
+
+def motif_ids(motifs: ArrayLike) -> NDArray[np.int64]:
+    """Return the ids of motifs, given as an array of shape (n_motifs, motif length <= 4).
+
+    Motifs are padded with zeros.
+    """
+    motifs = np.atleast_2d(np.asarray(motifs, dtype=np.int64))
+    lengths = np.count_nonzero(motifs, axis=1)
+    ids = np.zeros(len(motifs), dtype=np.int64)
+    for position in range(motifs.shape[1]):
+        in_motif = position < lengths
+        ids = np.where(in_motif, ids * NUM_AMINO_ACIDS + motifs[:, position] - 1, ids)
+    return ids + FIRST_MOTIF_ID_PER_LENGTH[lengths - MIN_MOTIF_LENGTH]
+
+
+def motifs_from_ids(ids: ArrayLike) -> NDArray[np.int64]:
+    """Return the motifs of the given ids, as an array of shape (n_motifs, MAX_MOTIF_LENGTH)."""
+    ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+    if np.any(ids < 0) or np.any(ids >= N_MOTIFS):
+        raise ValueError(f"Motif ids must be between 0 and {N_MOTIFS - 1}")
+    length_indices = np.searchsorted(FIRST_MOTIF_ID_PER_LENGTH, ids, side="right") - 1
+    lengths = MOTIF_LENGTHS[length_indices]
+    offsets = ids - FIRST_MOTIF_ID_PER_LENGTH[length_indices]
+    motifs = np.zeros((len(ids), MAX_MOTIF_LENGTH), dtype=np.int64)
+    for position in reversed(range(MAX_MOTIF_LENGTH)):
+        in_motif = position < lengths
+        motifs[:, position] = np.where(in_motif, offsets % NUM_AMINO_ACIDS + 1, 0)
+        offsets = np.where(in_motif, offsets // NUM_AMINO_ACIDS, offsets)
+    return motifs
+
+
+def held_out_motifs(fraction: float, seed: int = MOTIF_SPLIT_SEED) -> NDArray[np.bool_]:
+    """Return whether each motif id belongs to the held-out split of `fraction` of the motifs."""
+    if not 0.0 <= fraction <= 1.0:
+        raise ValueError(f"Invalid held-out fraction: {fraction}")
+    return np.random.default_rng(seed).random(N_MOTIFS) < fraction
+
+
+def optimal_sequences(motifs: ArrayLike, sequence_lengths: ArrayLike) -> NDArray[np.int64]:
+    """Return sequences of maximal return for the given motifs and sequence lengths.
+
+    The motif is placed first, since it gives REWARD_PER_MOTIF at every following step while the
+    bonus of motif amino acids is at most 1/5 per step, and the charge of the motif is neutralized
+    afterwards to avoid the charge penalty. The remaining amino acids are neutral.
+
+    Args:
+        motifs: Array of shape (n_motifs, MAX_MOTIF_LENGTH) of motifs padded with zeros.
+        sequence_lengths: Sequence length of each motif, or the same length for all motifs.
+
+    Returns:
+        The sequences, of shape (n_motifs, max sequence length), padded with zeros.
+    """
+    motifs = np.atleast_2d(np.asarray(motifs, dtype=np.int64))
+    sequence_lengths = np.broadcast_to(np.asarray(sequence_lengths), (len(motifs),))
+    motif_lengths = np.count_nonzero(motifs, axis=1)
+    charges = AMINO_ACIDS_TO_CHARGES_ARRAY[motifs].sum(axis=1)
+
+    positions = np.arange(sequence_lengths.max())
+    after_motif = positions - motif_lengths[:, None]
+    neutralizing = np.where(charges > 0, AminoAcids.ASPARTIC_ACID, AminoAcids.LYSINE)
+    sequences = np.where(
+        after_motif < np.abs(charges)[:, None], neutralizing[:, None], AminoAcids.ALANINE.value
+    )
+    in_motif = positions[:MAX_MOTIF_LENGTH] < motif_lengths[:, None]
+    sequences[:, :MAX_MOTIF_LENGTH] = np.where(in_motif, motifs, sequences[:, :MAX_MOTIF_LENGTH])
+    sequences[positions >= sequence_lengths[:, None]] = 0
+    return sequences
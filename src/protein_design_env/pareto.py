@@ -0,0 +1,148 @@
+"""Archive of the Pareto front of designed sequences."""
+
+import numpy as np
+from numpy._typing import ArrayLike, NDArray
+
+# Multiplier of the polynomial rolling hash of sequences, arithmetic wraps around 2**64.
+_HASH_MULTIPLIER = np.uint64(0x100000001B3)
+_HASH_OFFSET = np.uint64(0xCBF29CE484222325)
+_BLOCK_SIZE = 1024
+
+
+def hash_sequences(sequences: NDArray) -> NDArray[np.uint64]:
+    """Return a 64 bits hash of each row of a 2D array of amino acid ids."""
+    hashes = np.full(len(sequences), _HASH_OFFSET, dtype=np.uint64)
+    for column in np.asarray(sequences, dtype=np.uint64).T:
+        hashes = hashes * _HASH_MULTIPLIER + column + np.uint64(1)
+    return hashes
+
+
+def dominated_by(points: NDArray, front: NDArray) -> NDArray[np.bool_]:
+    """Return whether each point is dominated by a point of the front (objectives are maximized)."""
+    dominated = np.zeros(len(points), dtype=bool)
+    if len(front) == 0:
+        return dominated
+    # Compare blocks of points to bound the memory of the (block, front, objectives) comparisons.
+    block_size = max(1, _BLOCK_SIZE * 64 // len(front))
+    for start in range(0, len(points), block_size):
+        block = points[start : start + block_size, None, :]
+        dominated[start : start + block_size] = np.any(
+            np.all(front >= block, axis=2) & np.any(front > block, axis=2), axis=1
+        )
+    return dominated
+
+
+def non_dominated(points: NDArray) -> NDArray[np.bool_]:
+    """Return whether each point is on the Pareto front of the points (objectives are maximized).
+
+    Points are visited in decreasing lexicographic order, so a point can only be dominated by points
+    visited before it. Each block of points is compared with the front found so far and with
+    itself, so the cost is O(n * front size) instead of O(n ** 2).
+    """
+    order = np.lexsort(-points.T[::-1])
+    is_front = np.zeros(len(points), dtype=bool)
+    front = points[:0]
+    for start in range(0, len(points), _BLOCK_SIZE):
+        indices = order[start : start + _BLOCK_SIZE]
+        block = points[indices]
+        keep = ~dominated_by(block, front)
+        keep[keep] = ~dominated_by(block[keep], block[keep])
+        is_front[indices[keep]] = True
+        front = np.concatenate([front, block[keep]])
+    return is_front
+
+
+def _match_rows(rows: NDArray, reference: NDArray) -> NDArray:
+    """Return the index of each row in the reference rows, -1 if it is not in the reference."""
+    _, inverse = np.unique(np.concatenate([reference, rows]), axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    index_of_id = np.full(inverse.max() + 1, -1)
+    index_of_id[inverse[: len(reference)]] = np.arange(len(reference))
+    return index_of_id[inverse[len(reference) :]]
+
+
+class ParetoArchive:
+    """Archive of the sequences on the Pareto front of several objectives to maximize.
+
+    Sequences are inserted by batches. The front is maintained incrementally: the candidates of a
+    batch are only compared with the distinct objective vectors of the front and with each other,
+    never with all the sequences seen so far. Sequences are deduplicated by hash, and sequences with
+    the same objectives are all kept, up to `max_sequences_per_point` of them.
+
+    Parameters:
+    - n_objectives: Number of objectives.
+    - max_sequences_per_point: Maximum number of sequences kept per objective vector of the front.
+    """
+
+    def __init__(self, n_objectives: int, max_sequences_per_point: int | None = None) -> None:
+        self.n_objectives = n_objectives
+        self.max_sequences_per_point = max_sequences_per_point
+        self.n_inserted = 0
+        self.points = np.zeros((0, n_objectives))  # Distinct objective vectors of the front.
+        self.sequences: NDArray = np.zeros((0, 0), dtype=np.int8)
+        self.objectives = np.zeros((0, n_objectives))
+        self.hashes = np.zeros(0, dtype=np.uint64)
+        self.point_ids = np.zeros(0, dtype=np.int64)  # Index in `points` of each sequence.
+
+    def __len__(self) -> int:
+        """Return the number of sequences in the archive."""
+        return len(self.sequences)
+
+    def insert(self, sequences: ArrayLike, objectives: ArrayLike) -> int:
+        """Insert a batch of sequences with their objectives.
+
+        Args:
+            sequences: Array of shape (batch, length) of amino acid ids padded with zeros.
+            objectives: Array of shape (batch, n_objectives) of objective values.
+
+        Returns:
+            The number of inserted sequences that entered the front.
+        """
+        sequences = np.asarray(sequences, dtype=np.int8)
+        objectives = np.asarray(objectives, dtype=np.float64).reshape(-1, self.n_objectives)
+        self.n_inserted += len(sequences)
+        if len(self.sequences) == 0:
+            self.sequences = np.zeros((0, sequences.shape[1]), dtype=np.int8)
+
+        # Keep the new sequences that are distinct and not dominated by the front.
+        hashes = hash_sequences(sequences)
+        _, first = np.unique(hashes, return_index=True)
+        candidates = first[~np.isin(hashes[first], self.hashes)]
+        candidates = candidates[~dominated_by(objectives[candidates], self.points)]
+        if len(candidates) == 0:
+            return 0
+
+        # New front: non dominated distinct objective vectors of the front and the candidates.
+        points = np.concatenate([self.points, np.unique(objectives[candidates], axis=0)])
+        points = np.unique(points[non_dominated(points)], axis=0)
+
+        # Only the distinct points of the archive and the candidates are matched with the front.
+        old_point_ids = _match_rows(self.points, points)[self.point_ids]
+        candidate_point_ids = _match_rows(objectives[candidates], points)
+        keep_old = old_point_ids >= 0
+        keep_candidates = candidate_point_ids >= 0
+        if self.max_sequences_per_point is not None:
+            counts = np.bincount(old_point_ids[keep_old], minlength=len(points))
+            ranks = counts[candidate_point_ids] + self._rank_within_point(candidate_point_ids)
+            keep_candidates &= ranks < self.max_sequences_per_point
+        candidates = candidates[keep_candidates]
+
+        self.points = points
+        self.sequences = np.concatenate([self.sequences[keep_old], sequences[candidates]])
+        self.objectives = np.concatenate([self.objectives[keep_old], objectives[candidates]])
+        self.hashes = np.concatenate([self.hashes[keep_old], hashes[candidates]])
+        self.point_ids = np.concatenate(
+            [old_point_ids[keep_old], candidate_point_ids[keep_candidates]]
+        )
+        return len(candidates)
+
+    @staticmethod
+    def _rank_within_point(point_ids: NDArray) -> NDArray:
+        """Return the rank of each sequence among the sequences of the same point, by insertion."""
+        order = np.argsort(point_ids, kind="stable")
+        sorted_ids = point_ids[order]
+        group_starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+        group_sizes = np.diff(np.r_[group_starts, len(sorted_ids)])
+        ranks = np.empty(len(point_ids), dtype=np.int64)
+        ranks[order] = np.arange(len(point_ids)) - np.repeat(group_starts, group_sizes)
+        return ranks
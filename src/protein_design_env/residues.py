@@ -0,0 +1,150 @@
+"""Residue alphabet of the environments and per-residue property tables.
+
+A `ResidueTable` holds the residues the agent can add to a sequence and their properties in
+contiguous NumPy arrays indexed by residue id. Ids are one-based, row 0 is the padding value of the
+observations and has null properties, so the properties of the residues of padded sequences are
+`properties[sequences]`, and their sums are one vectorized call for one sequence or a batch.
+
+The default table, `STANDARD_RESIDUES`, has the 20 standard amino acids of `AminoAcids`, loaded
+from standard_residues.yaml next to this module. Other tables are loaded from yaml files (see
+config/residues), which define the residues and the pH of the pH-dependent charges:
+
+    base: standard  # Optional, the residues are appended to the standard ones
+    ph: 7.0
+    residues:
+      - {name: SELENOCYSTEINE, code: U, charge: -1, pka: 5.43, hydrophobicity: 2.5, mass: 150.04}
+"""
+
+import os
+from collections.abc import Mapping
+from dataclasses import dataclass
+
+import numpy as np
+import yaml
+from numpy._typing import NDArray
+
+# Columns of `ResidueTable.properties`.
+PROPERTIES = ("charge", "ph_charge", "hydrophobicity", "mass")
+STANDARD_CODES = "ARNDCEQGHILKMFPSTWYV"
+STANDARD_RESIDUES_PATH = os.path.join(os.path.dirname(__file__), "standard_residues.yaml")
+DEFAULT_PH = 7.0
+
+
+def ph_charge(charge: int, pka: float | None, ph: float) -> float:
+    """Return the mean charge of a side chain at a pH, with the Henderson-Hasselbalch equation.
+
+    Side chains with a positive formal charge are bases, the other ionizable ones are acids.
+    """
+    if pka is None:
+        return 0.0
+    if charge > 0:
+        return 1 / (1 + 10 ** (ph - pka))
+    return -1 / (1 + 10 ** (pka - ph))
+
+
+@dataclass(frozen=True, eq=False)
+class ResidueTable:
+    """Residues of the alphabet and their properties, indexed by one-based residue id.
+
+    Attributes:
+        names: Name of each residue, in id order.
+        codes: One-letter code of each residue.
+        ph: pH of the pH-dependent charges.
+        charges: Int8 array of the formal charges, used by the reward, with a 0 padding row.
+        properties: Float64 array of shape (n_residues + 1, len(PROPERTIES)) of the properties of
+            each residue, with a 0 padding row.
+    """
+
+    names: tuple[str, ...]
+    codes: tuple[str, ...]
+    ph: float
+    charges: NDArray[np.int8]
+    properties: NDArray[np.float64]
+
+    @classmethod
+    def from_residues(cls, residues: list[Mapping], ph: float = DEFAULT_PH) -> "ResidueTable":
+        """Build a table from residue definitions.
+
+        Args:
+            residues: Definition of each residue, in id order: its "name", one-letter "code",
+                integer formal "charge", side chain "pka" (optional), "hydrophobicity" and "mass".
+            ph: pH of the pH-dependent charges.
+
+        Raises:
+            ValueError: If names or codes are duplicated, or a formal charge is not an integer.
+        """
+        names = tuple(str(residue["name"]) for residue in residues)
+        codes = tuple(str(residue["code"]) for residue in residues)
+        if len(set(names)) != len(names) or len(set(codes)) != len(codes):
+            raise ValueError(f"Residue names and codes must be unique: {names}, {codes}")
+        charges = [residue.get("charge", 0) for residue in residues]
+        if any(int(charge) != charge for charge in charges):
+            raise ValueError(f"Formal charges must be integers, got {charges}")
+        properties = np.zeros((len(residues) + 1, len(PROPERTIES)))
+        for i, (residue, charge) in enumerate(zip(residues, charges, strict=True), start=1):
+            properties[i] = (
+                charge,
+                ph_charge(charge, residue.get("pka"), ph),
+                residue.get("hydrophobicity", 0.0),
+                residue.get("mass", 0.0),
+            )
+        return cls(
+            names=names,
+            codes=codes,
+            ph=ph,
+            charges=np.array([0, *charges], dtype=np.int8),
+            properties=np.ascontiguousarray(properties),
+        )
+
+    @classmethod
+    def from_config(cls, config: Mapping) -> "ResidueTable":
+        """Build a table from a config with the "residues", and optional "base" and "ph" keys."""
+        residues = list(config.get("residues") or [])
+        base = config.get("base")
+        if base == "standard":
+            residues = STANDARD_RESIDUE_DEFINITIONS + residues
+        elif base is not None:
+            raise ValueError(f"Unknown base residue table: {base}")
+        return cls.from_residues(residues, float(config.get("ph", DEFAULT_PH)))
+
+    @property
+    def n_residues(self) -> int:
+        """Number of residues, the size of the action space."""
+        return len(self.names)
+
+    @property
+    def ids(self) -> NDArray[np.int64]:
+        """One-based ids of the residues."""
+        return np.arange(1, self.n_residues + 1)
+
+    @property
+    def is_standard(self) -> bool:
+        """Whether the residues are the standard amino acids, which motif ids are defined for."""
+        return self.codes == tuple(STANDARD_CODES)
+
+    def encode(self, codes: str) -> list[int]:
+        """Return the residue ids of a sequence of one-letter codes, e.g. a motif "RI"."""
+        unknown = set(codes) - set(self.codes)
+        if unknown:
+            raise ValueError(f"Unknown residue codes: {sorted(unknown)}")
+        return [self.codes.index(code) + 1 for code in codes]
+
+    def column(self, name: str) -> NDArray[np.float64]:
+        """Return a property of every residue, indexed by residue id."""
+        return self.properties[:, PROPERTIES.index(name)]
+
+    def sequence_properties(self, sequences: NDArray) -> NDArray[np.float64]:
+        """Return the property sums of padded sequences, of shape (..., len(PROPERTIES))."""
+        return self.properties[sequences].sum(axis=-2)
+
+
+def load_residue_table(path: str) -> ResidueTable:
+    """Load a residue table from a yaml file."""
+    with open(path) as f:
+        return ResidueTable.from_config(yaml.safe_load(f))
+
+
+with open(STANDARD_RESIDUES_PATH) as _file:
+    _STANDARD_CONFIG = yaml.safe_load(_file)
+STANDARD_RESIDUE_DEFINITIONS = _STANDARD_CONFIG["residues"]
+STANDARD_RESIDUES = ResidueTable.from_config(_STANDARD_CONFIG)
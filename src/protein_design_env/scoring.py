@@ -0,0 +1,228 @@
+"""Batched scoring of amino acid sequences with the protein design reward.
+
+The functions of this module compute the same returns as replaying each sequence through
+`Environment.step`, but for many sequences at once. Sequences are given as a 2D array of one-based
+amino acid ids padded with zeros (or any value past `lengths`), which may be a `np.memmap`: rows are
+read chunk by chunk so that inputs larger than memory can be scored.
+"""
+
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+import numpy as np
+from numpy._typing import ArrayLike, NDArray
+
+from protein_design_env.amino_acids import AMINO_ACIDS_TO_CHARGES_ARRAY
+from protein_design_env.constants import (
+    CHARGE_PENALTY,
+    MAX_MOTIF_LENGTH,
+    NUM_AMINO_ACIDS,
+    REWARD_PER_MOTIF,
+)
+
+DEFAULT_CHUNK_SIZE = 65536
+
+
+@dataclass(frozen=True)
+class ScoringResult:
+    """Scores of a batch of sequences.
+
+    Attributes:
+        returns: Sum of the rewards collected while appending the amino acids one by one.
+        charges: Charge of the scored sequences.
+        motif_hits: Whether the motif is present in the scored sequences.
+    """
+
+    returns: NDArray[np.float64]
+    charges: NDArray[np.int64]
+    motif_hits: NDArray[np.bool_]
+
+
+def score_sequences(
+    sequences: ArrayLike,
+    motifs: ArrayLike,
+    target_lengths: ArrayLike,
+    lengths: ArrayLike | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> ScoringResult:
+    """Score sequences as if they were built step by step in the environment.
+
+    Only the first `target_length` amino acids of a sequence are scored, as the episode terminates
+    there. Shorter sequences are scored as unfinished episodes, without the charge penalty.
+
+    Args:
+        sequences: Array of shape (n_sequences, max_length) of one-based amino acid ids.
+        motifs: A single motif, or an array of shape (n_sequences, motif_length <= 4) of motifs
+            padded with zeros.
+        target_lengths: A single episode length, or one episode length per sequence.
+        lengths: Number of amino acids of each sequence. If None, sequences are zero-padded.
+        chunk_size: Number of sequences scored at once.
+
+    Returns:
+        The returns, charges and motif hits of the sequences.
+    """
+    chunks = list(iter_score_chunks(sequences, motifs, target_lengths, lengths, chunk_size))
+    if not chunks:
+        return ScoringResult(
+            returns=np.zeros(0), charges=np.zeros(0, dtype=np.int64), motif_hits=np.zeros(0, bool)
+        )
+    return ScoringResult(
+        returns=np.concatenate([chunk.returns for chunk in chunks]),
+        charges=np.concatenate([chunk.charges for chunk in chunks]),
+        motif_hits=np.concatenate([chunk.motif_hits for chunk in chunks]),
+    )
+
+
+def iter_score_chunks(
+    sequences: ArrayLike,
+    motifs: ArrayLike,
+    target_lengths: ArrayLike,
+    lengths: ArrayLike | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[ScoringResult]:
+    """Yield the scores of consecutive chunks of `chunk_size` sequences.
+
+    Use this instead of `score_sequences` to stream results when they do not fit in memory.
+    Arguments are the same as `score_sequences`.
+    """
+    if chunk_size < 1:
+        raise ValueError(f"Invalid chunk size: {chunk_size}")
+    if not isinstance(sequences, np.ndarray):
+        sequences = np.asarray(sequences)
+    if sequences.ndim != 2:
+        raise ValueError(f"Sequences must be a 2D array, got shape {sequences.shape}")
+    n_sequences = len(sequences)
+
+    # Per sequence motifs are padded chunk by chunk, so memory-mapped ones are not loaded at once.
+    if not isinstance(motifs, np.ndarray):
+        motifs = np.asarray(motifs, dtype=np.int64)
+    motifs = np.atleast_2d(motifs)
+    if motifs.ndim != 2 or motifs.shape[1] > MAX_MOTIF_LENGTH:
+        raise ValueError(f"Motifs must have at most {MAX_MOTIF_LENGTH} amino acids")
+    target_lengths = np.asarray(target_lengths, dtype=np.int64)
+    if lengths is not None:
+        lengths = np.asarray(lengths, dtype=np.int64)
+
+    for start in range(0, n_sequences, chunk_size):
+        stop = min(start + chunk_size, n_sequences)
+        yield _score_chunk(
+            np.asarray(sequences[start:stop], dtype=np.int64),
+            _pad_motifs(_take_rows(motifs, start, stop)),
+            _take_rows(target_lengths, start, stop),
+            None if lengths is None else _take_rows(lengths, start, stop),
+        )
+
+
+def _score_chunk(
+    sequences: NDArray[np.int64],
+    motifs: NDArray[np.int64],
+    target_lengths: NDArray[np.int64],
+    lengths: NDArray[np.int64] | None,
+) -> ScoringResult:
+    """Score a chunk of sequences, looping over the positions and vectorizing over sequences."""
+    n_sequences, max_length = sequences.shape
+    motifs = np.broadcast_to(motifs, (n_sequences, MAX_MOTIF_LENGTH))
+    target_lengths = np.broadcast_to(target_lengths, (n_sequences,))
+    if lengths is None:
+        lengths = np.count_nonzero(sequences, axis=1)
+    lengths = np.broadcast_to(lengths, (n_sequences,))
+    if np.any(lengths > max_length) or np.any(lengths < 0):
+        raise ValueError("Sequence lengths must be between 0 and the number of columns")
+
+    n_steps = np.minimum(lengths, target_lengths)
+    positions = np.arange(max_length)
+    in_sequence = positions < n_steps[:, None]
+    if np.any((sequences < 1)[in_sequence]) or np.any((sequences > NUM_AMINO_ACIDS)[in_sequence]):
+        raise ValueError(f"Invalid amino acid ids, they must be between 1 and {NUM_AMINO_ACIDS}")
+    sequences = np.where(in_sequence, sequences, 0)
+
+    motif_lengths = np.count_nonzero(motifs, axis=1)
+    in_motif = np.arange(MAX_MOTIF_LENGTH) < motif_lengths[:, None]
+
+    returns = np.zeros(n_sequences)
+    charges = np.zeros(n_sequences, dtype=np.int64)
+    motif_hits = np.zeros(n_sequences, dtype=bool)
+    amino_acids_seen = np.zeros((n_sequences, MAX_MOTIF_LENGTH), dtype=bool)
+    for step in range(max_length):
+        active = step < n_steps
+        if not active.any():
+            break
+        amino_acids = sequences[:, step]
+        charges += AMINO_ACIDS_TO_CHARGES_ARRAY[amino_acids]
+        amino_acids_seen |= in_motif & (motifs == amino_acids[:, None])
+
+        motif_hits |= active & motif_ends_at(sequences, step + 1, motifs, motif_lengths)
+
+        charge_penalties, motif_rewards = step_reward_components(
+            motif_hits, amino_acids_seen, motif_lengths, charges, step + 1 >= target_lengths
+        )
+        returns = np.where(active, returns + (charge_penalties + motif_rewards), returns)
+
+    return ScoringResult(returns=returns, charges=charges, motif_hits=motif_hits)
+
+
+def motif_ends_at(
+    sequences: NDArray[np.int64],
+    lengths: ArrayLike,
+    motifs: NDArray[np.int64],
+    motif_lengths: NDArray[np.int64],
+) -> NDArray[np.bool_]:
+    """Return whether the motif of each sequence ends at its last amino acid.
+
+    Args:
+        sequences: Array of shape (n_sequences, max_length) of amino acid ids.
+        lengths: Number of amino acids of each sequence, or the same number for all sequences.
+        motifs: Array of shape (n_sequences, MAX_MOTIF_LENGTH) of motifs padded with zeros.
+        motif_lengths: Number of amino acids of each motif.
+    """
+    lengths = np.asarray(lengths)
+    rows = np.arange(len(sequences))
+    match = motif_lengths <= lengths
+    for offset in range(MAX_MOTIF_LENGTH):
+        index = np.clip(lengths - motif_lengths + offset, 0, sequences.shape[1] - 1)
+        match &= (offset >= motif_lengths) | (sequences[rows, index] == motifs[:, offset])
+    return match
+
+
+def step_reward_components(
+    motif_hits: NDArray[np.bool_],
+    amino_acids_seen: NDArray[np.bool_],
+    motif_lengths: NDArray[np.int64],
+    charges: NDArray[np.int64],
+    terminal: ArrayLike,
+) -> tuple[NDArray[np.int64], NDArray[np.float64]]:
+    """Return the charge penalties and motif rewards of a step, as `Environment` computes them.
+
+    The motif bonus is accumulated in the same order as `Environment._get_reward_components`, so
+    the rewards `charge_penalties + motif_rewards` are identical floats.
+
+    Args:
+        motif_hits: Whether the motif is present in each sequence.
+        amino_acids_seen: Array of shape (n_sequences, MAX_MOTIF_LENGTH), whether each amino acid
+            of the motif is present in the sequence.
+        motif_lengths: Number of amino acids of each motif.
+        charges: Charge of each sequence.
+        terminal: Whether each sequence reached its target length.
+    """
+    bonus_per_amino_acid = 1 / (5 * np.maximum(motif_lengths, 1))
+    bonus = np.zeros(len(motif_hits))
+    for offset in range(MAX_MOTIF_LENGTH):
+        bonus += np.where(amino_acids_seen[:, offset], bonus_per_amino_acid, 0.0)
+    motif_rewards = REWARD_PER_MOTIF * motif_hits.astype(np.float64) + np.where(
+        motif_hits, 0.0, bonus
+    )
+    charge_penalties = np.where((charges != 0) & terminal, CHARGE_PENALTY, 0)
+    return charge_penalties, motif_rewards
+
+
+def _pad_motifs(motifs: ArrayLike) -> NDArray[np.int64]:
+    """Return motifs as an array of shape (n_motifs, MAX_MOTIF_LENGTH) padded with zeros."""
+    motifs = np.atleast_2d(np.asarray(motifs, dtype=np.int64))
+    return np.pad(motifs, ((0, 0), (0, MAX_MOTIF_LENGTH - motifs.shape[1])))
+
+
+def _take_rows(array: NDArray, start: int, stop: int) -> NDArray:
+    """Slice the rows of a per sequence array, arrays with a single row are broadcast."""
+    if array.ndim == 0 or len(array) == 1:
+        return array
+    return array[start:stop]
@@ -0,0 +1,218 @@
+import torch
+
+from protein_design_env.constants import (
+    CHARGE_PENALTY,
+    DEFAULT_MOTIF,
+    DEFAULT_SEQUENCE_LENGTH,
+    MAX_MOTIF_LENGTH,
+    MAX_SEQUENCE_LENGTH,
+    MIN_MOTIF_LENGTH,
+    MIN_SEQUENCE_LENGTH,
+    OBS_SIZE,
+    REWARD_PER_MOTIF,
+)
+from protein_design_env.residues import STANDARD_RESIDUES, ResidueTable
+
+
+class TorchBatchedEnvironment:
+    """Version of `BatchedEnvironment` whose state and dynamics are torch tensors.
+
+    Observations, rewards and terminations are tensors on `device`, so that a rollout with a torch
+    policy never converts data to NumPy. Rewards are float64 and identical to the ones of
+    `Environment`. Episodes are reset automatically when they terminate: the returned observation is
+    the first one of the next episode.
+
+    `step` has no data-dependent control flow, so it can be compiled with `torch.compile`: new
+    episodes are drawn for every env at every step and only kept where the episode terminated.
+    The residues of the actions and motifs and their charges are the ones of the `residues` table.
+    """
+
+    def __init__(
+        self,
+        n_envs: int,
+        change_motif_at_each_episode: bool = False,
+        change_sequence_length_at_each_episode: bool = False,
+        seed: int = 0,
+        device: torch.device | str = "cpu",
+        residues: ResidueTable | None = None,
+    ) -> None:
+        self.n_envs = n_envs
+        self.residues = STANDARD_RESIDUES if residues is None else residues
+        self.change_motif_at_each_episode = change_motif_at_each_episode
+        self.change_sequence_length_at_each_episode = change_sequence_length_at_each_episode
+        self.device = torch.device(device)
+        self.generator = torch.Generator(device=self.device).manual_seed(seed)
+
+        def zeros(*shape: int, dtype: torch.dtype = torch.long) -> torch.Tensor:
+            return torch.zeros(shape, dtype=dtype, device=self.device)
+
+        self.charges_by_amino_acid = torch.as_tensor(
+            self.residues.charges, dtype=torch.long, device=self.device
+        )
+        self.motif_positions = torch.arange(MAX_MOTIF_LENGTH, device=self.device)
+        self.rows = torch.arange(n_envs, device=self.device)
+
+        self.states = zeros(n_envs, MAX_SEQUENCE_LENGTH)
+        self.lengths = zeros(n_envs)
+        self.charges = zeros(n_envs)
+        self.motifs = zeros(n_envs, MAX_MOTIF_LENGTH)
+        self.motifs[:, : len(DEFAULT_MOTIF)] = torch.as_tensor(DEFAULT_MOTIF, device=self.device)
+        self.motif_lengths = torch.full((n_envs,), len(DEFAULT_MOTIF), device=self.device)
+        self.sequence_lengths = torch.full((n_envs,), DEFAULT_SEQUENCE_LENGTH, device=self.device)
+        self.motif_hits = zeros(n_envs, dtype=torch.bool)
+        self.amino_acids_seen = zeros(n_envs, MAX_MOTIF_LENGTH, dtype=torch.bool)
+
+    @property
+    def observation_size(self) -> int:
+        """Size of the observations."""
+        return OBS_SIZE
+
+    @property
+    def n_actions(self) -> int:
+        """Number of actions."""
+        return self.residues.n_residues
+
+    def reset(self, seed: int | None = None) -> torch.Tensor:
+        """Reset all the episodes and return their observations."""
+        if seed is not None:
+            self.generator.manual_seed(seed)
+        self._reset_episodes(torch.ones(self.n_envs, dtype=torch.bool, device=self.device))
+        return self._get_observations()
+
+    def reset_with_sequence_length(self, sequence_length: int) -> torch.Tensor:
+        """Reset all the episodes with the same sequence length and return their observations.
+
+        Motifs are drawn as in `reset`, so that a batch of episodes of one length can be played in
+        exactly `sequence_length` steps.
+        """
+        self._reset_episodes(torch.ones(self.n_envs, dtype=torch.bool, device=self.device))
+        self.sequence_lengths = torch.full_like(self.sequence_lengths, sequence_length)
+        return self._get_observations()
+
+    def sample_sequence_length(self) -> int:
+        """Draw a sequence length as for a new episode."""
+        if not self.change_sequence_length_at_each_episode:
+            return int(self.sequence_lengths[0])
+        return int(
+            torch.randint(
+                MIN_SEQUENCE_LENGTH,
+                MAX_SEQUENCE_LENGTH + 1,
+                (1,),
+                generator=self.generator,
+                device=self.device,
+            )
+        )
+
+    def set_episodes(self, motifs: torch.Tensor, sequence_lengths: torch.Tensor) -> torch.Tensor:
+        """Reset all the episodes with the given motifs and sequence lengths.
+
+        Args:
+            motifs: Tensor of shape (n_envs, MAX_MOTIF_LENGTH) of motifs padded with zeros.
+            sequence_lengths: Sequence length of each episode.
+
+        Returns:
+            The observations of the new episodes.
+        """
+        self.motifs = torch.as_tensor(motifs, dtype=torch.long, device=self.device).clone()
+        self.motif_lengths = (self.motifs != 0).sum(dim=1)
+        self.sequence_lengths = torch.as_tensor(
+            sequence_lengths, dtype=torch.long, device=self.device
+        ).expand(self.n_envs).clone()
+        self._clear_sequences(torch.ones(self.n_envs, dtype=torch.bool, device=self.device))
+        return self._get_observations()
+
+    def step(self, actions: torch.Tensor) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """Add one amino acid to each sequence, compute the rewards and the terminations.
+
+        Args:
+            actions: Zero-based amino acid of each episode. Actions are not validated, to avoid
+                synchronizing with the device.
+
+        Returns:
+            The observations of the next step, the float64 rewards and the terminations.
+        """
+        amino_acids = actions.long().reshape(self.n_envs) + 1
+        self.states = self.states.index_put((self.rows, self.lengths), amino_acids)
+        self.lengths = self.lengths + 1
+        self.charges = self.charges + self.charges_by_amino_acid[amino_acids]
+        in_motif = self.motif_positions < self.motif_lengths[:, None]
+        self.amino_acids_seen = self.amino_acids_seen | (
+            in_motif & (self.motifs == amino_acids[:, None])
+        )
+        self.motif_hits = self.motif_hits | self._motif_ends_at_last_amino_acid(in_motif)
+
+        dones = self.lengths >= self.sequence_lengths
+        rewards = self._get_rewards(dones)
+        self._reset_episodes(dones)
+        return self._get_observations(), rewards, dones
+
+    def _motif_ends_at_last_amino_acid(self, in_motif: torch.Tensor) -> torch.Tensor:
+        """Return whether the motif of each sequence ends at its last amino acid."""
+        indices = self.lengths[:, None] - self.motif_lengths[:, None] + self.motif_positions
+        window = self.states.gather(1, indices.clamp(0, MAX_SEQUENCE_LENGTH - 1))
+        matches = ~in_motif | (window == self.motifs)
+        return (self.motif_lengths <= self.lengths) & matches.all(dim=1)
+
+    def _get_rewards(self, dones: torch.Tensor) -> torch.Tensor:
+        """Compute the rewards in the same order as `Environment._get_reward_components`."""
+        bonus_per_amino_acid = 1 / (5 * self.motif_lengths.clamp(min=1).double())
+        bonus = torch.zeros(self.n_envs, dtype=torch.float64, device=self.device)
+        for offset in range(MAX_MOTIF_LENGTH):
+            bonus = bonus + torch.where(self.amino_acids_seen[:, offset], bonus_per_amino_acid, 0.0)
+        motif_rewards = REWARD_PER_MOTIF * self.motif_hits.double() + torch.where(
+            self.motif_hits, 0.0, bonus
+        )
+        charge_penalties = torch.where((self.charges != 0) & dones, CHARGE_PENALTY, 0)
+        return charge_penalties + motif_rewards
+
+    def _get_observations(self) -> torch.Tensor:
+        """Return the float32 observations, laid out as `Environment._get_observation`."""
+        return torch.cat(
+            [
+                self.states,
+                self.lengths[:, None],
+                self.motifs,
+                self.sequence_lengths[:, None],
+                self.charges[:, None],
+            ],
+            dim=1,
+        ).float()
+
+    def _reset_episodes(self, mask: torch.Tensor) -> None:
+        """Start new episodes for the masked envs."""
+        if self.change_motif_at_each_episode:
+            motif_lengths = torch.randint(
+                MIN_MOTIF_LENGTH,
+                MAX_MOTIF_LENGTH + 1,
+                (self.n_envs,),
+                generator=self.generator,
+                device=self.device,
+            )
+            motifs = torch.randint(
+                1,
+                self.residues.n_residues + 1,
+                (self.n_envs, MAX_MOTIF_LENGTH),
+                generator=self.generator,
+                device=self.device,
+            )
+            motifs = torch.where(self.motif_positions < motif_lengths[:, None], motifs, 0)
+            self.motifs = torch.where(mask[:, None], motifs, self.motifs)
+            self.motif_lengths = torch.where(mask, motif_lengths, self.motif_lengths)
+        if self.change_sequence_length_at_each_episode:
+            sequence_lengths = torch.randint(
+                MIN_SEQUENCE_LENGTH,
+                MAX_SEQUENCE_LENGTH + 1,
+                (self.n_envs,),
+                generator=self.generator,
+                device=self.device,
+            )
+            self.sequence_lengths = torch.where(mask, sequence_lengths, self.sequence_lengths)
+        self._clear_sequences(mask)
+
+    def _clear_sequences(self, mask: torch.Tensor) -> None:
+        """Empty the sequences of the masked envs."""
+        self.states = torch.where(mask[:, None], 0, self.states)
+        self.lengths = torch.where(mask, 0, self.lengths)
+        self.charges = torch.where(mask, 0, self.charges)
+        self.motif_hits = self.motif_hits & ~mask
+        self.amino_acids_seen = self.amino_acids_seen & ~mask[:, None]
@@ -0,0 +1,22 @@
+from typing import Any
+
+import gymnasium as gym
+import numpy as np
+from numpy._typing import NDArray
+
+
+class VectorRewardWrapper(gym.Wrapper):
+    """Return the reward of each objective of a multi-objective env as its reward."""
+
+    def __init__(self, env: gym.Env) -> None:
+        super().__init__(env)
+        if not env.unwrapped.multi_objective:
+            raise ValueError("VectorRewardWrapper requires an environment with multi_objective=True")
+        self.reward_space = gym.spaces.Box(
+            low=-np.inf, high=np.inf, shape=(len(env.unwrapped.objectives),), dtype=np.float64
+        )
+
+    def step(self, action: int) -> tuple[NDArray, NDArray, bool, bool, dict[str, Any]]:
+        """Step the environment and return the reward vector."""
+        obs, _, terminated, truncated, info = self.env.step(action)
+        return obs, info["reward_vector"], terminated, truncated, info
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from protein_design_env.batched_environment import BatchedEnvironment
+from protein_design_env.constants import NUM_AMINO_ACIDS, OBJECTIVES
+from protein_design_env.environment import Environment
+from protein_design_env.wrappers import VectorRewardWrapper
+
+
+def test_batched_environment_matches_environment() -> None:
+    n_envs = 8
+    batched_env = BatchedEnvironment(n_envs, True, True, seed=0, multi_objective=True)
+    obs = batched_env.reset()
+    envs = []
+    for i in range(n_envs):
+        env = Environment(multi_objective=True)
+        env.reset()
+        env.motif = batched_env.motifs[i, : batched_env.motif_lengths[i]].tolist()
+        env.sequence_length = int(batched_env.sequence_lengths[i])
+        np.testing.assert_array_equal(env._get_observation(), obs[i])
+        envs.append(env)
+
+    rng = np.random.default_rng(0)
+    # All the episodes are at most 25 steps long.
+    for _ in range(25):
+        actions = rng.integers(0, NUM_AMINO_ACIDS, n_envs)
+        obs, rewards, dones, infos = batched_env.step(actions)
+        for i, env in enumerate(envs):
+            if env.state and len(env.state) >= env.sequence_length:
+                continue
+            expected_obs, reward, terminated, _, info = env.step(actions[i])
+            assert rewards[i] == reward
+            assert dones[i] == terminated
+            np.testing.assert_array_equal(infos["reward_vectors"][i], info["reward_vector"])
+            if terminated:
+                np.testing.assert_array_equal(infos["final_observations"][i], expected_obs)
+            else:
+                np.testing.assert_array_equal(obs[i], expected_obs)
+
+
+def test_batched_environment_set_episodes() -> None:
+    batched_env = BatchedEnvironment(3)
+
+    obs = batched_env.set_episodes([[1, 2, 0, 0], [3, 4, 5, 0], [6, 7, 8, 9]], [15, 20, 25])
+
+    assert batched_env.motif_lengths.tolist() == [2, 3, 4]
+    assert obs[:, -2].tolist() == [15, 20, 25]
+    with pytest.raises(ValueError):
+        batched_env.step([0, 1, NUM_AMINO_ACIDS])
+
+
+def test_vector_reward_wrapper() -> None:
+    env = VectorRewardWrapper(Environment(multi_objective=True))
+    env.reset()
+
+    _, reward, _, _, _ = env.step(0)
+
+    assert reward.shape == (len(OBJECTIVES),)
+    assert reward in env.reward_space
+    with pytest.raises(ValueError):
+        VectorRewardWrapper(Environment())
+
+
+def test_property_objectives() -> None:
+    objectives = {"hydrophobicity": 1.0, "mass": -0.01}
+    batched_env = BatchedEnvironment(
+        4, True, True, seed=0, multi_objective=True, property_objectives=objectives
+    )
+    env = VectorRewardWrapper(Environment(multi_objective=True, property_objectives=objectives))
+    assert env.unwrapped.objectives == batched_env.objectives == (*OBJECTIVES, *objectives)
+    env.reset()
+    env.unwrapped.sequence_length = 25
+    batched_env.set_episodes(env.unwrapped.motif, 25)
+
+    returns = np.zeros(4)
+    for action in [0, 4, 9, 19, 3]:
+        _, reward, _, _, _ = env.step(action)
+        _, _, _, infos = batched_env.step([action] * 4)
+        np.testing.assert_array_equal(infos["reward_vectors"][0], reward)
+        returns += reward
+    sums = env.unwrapped.sequence_properties()
+    np.testing.assert_allclose(returns[2:], [sums["hydrophobicity"], -0.01 * sums["mass"]])
+    with pytest.raises(ValueError):
+        Environment(multi_objective=True, property_objectives={"volume": 1.0})
+    with pytest.raises(ValueError):
+        Environment(property_objectives=objectives)
@@ -0,0 +1,42 @@
+import os
+import shutil
+
+import pytest
+from config import config_cache
+from config.config_cache import cache_key, load_config
+from omegaconf import OmegaConf
+from omegaconf.errors import ConfigAttributeError, ValidationError
+
+
+def test_load_config_is_cached(tmp_path, monkeypatch) -> None:
+    cfg = load_config(["algo=A2C", "seed=3"], str(tmp_path))
+    assert len(os.listdir(tmp_path)) == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The config should not be composed on cache hits")
+
+    monkeypatch.setattr(config_cache, "compose_config", fail)
+    cached = load_config(["algo=A2C", "seed=3"], str(tmp_path))
+    assert cached == cfg
+    assert cached.algo == "A2C" and cached.seed == 3 and cached.dir is None
+    assert OmegaConf.is_struct(cached)
+    with pytest.raises(ConfigAttributeError):
+        cached.unknown_key = 1
+
+
+def test_load_config_validates_types(tmp_path) -> None:
+    with pytest.raises(ValidationError):
+        load_config(["seed=abc"], str(tmp_path))
+    assert not os.listdir(tmp_path)
+
+
+def test_cache_key_depends_on_overrides_and_config_files(tmp_path) -> None:
+    config_dir = str(tmp_path / "config")
+    shutil.copytree(config_cache.CONFIG_DIR, config_dir)
+    key = cache_key(["algo=A2C"], config_dir)
+    assert cache_key(["algo=A2C"], config_dir) == key
+    assert cache_key(["algo=DQN"], config_dir) != key
+
+    with open(os.path.join(config_dir, "defaults.yaml"), "a") as f:
+        f.write("\n# Edited\n")
+    assert cache_key(["algo=A2C"], config_dir) != key
@@ -114,6 +114,22 @@ class TestEnvironment:
         )
         np.testing.assert_array_equal(obs, extpected_obs)
 
+    def test_snapshot_restore_replays_the_episode(self) -> None:
+        env = Environment(True, True, seed=0)
+        env.reset()
+        actions = np.random.default_rng(0).integers(0, NUM_AMINO_ACIDS, env.sequence_length)
+        for action in actions[:5]:
+            snapshot_obs, _, _, _, _ = env.step(int(action))
+        snapshot = env.snapshot()
+        transitions = [env.step(int(action)) for action in actions[5:]]
+
+        env.reset()
+        np.testing.assert_array_equal(env.restore(snapshot), snapshot_obs)
+        for action, (obs, reward, terminated, _, _) in zip(actions[5:], transitions):
+            replayed_obs, replayed_reward, replayed_terminated, _, _ = env.step(int(action))
+            np.testing.assert_array_equal(replayed_obs, obs)
+            assert replayed_reward == reward and replayed_terminated == terminated
+
     def test_get_charge(self) -> None:
         self.env.state = []
         assert self.env._get_charge() == 0
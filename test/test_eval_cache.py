@@ -0,0 +1,106 @@
+import os
+
+import numpy as np
+from learner.eval_cache import (
+    EvalCache,
+    checkpoint_weights_hash,
+    compare_checkpoints,
+    env_config,
+    evaluate_cached,
+    evaluation_seeds,
+    run_episode,
+    weights_hash,
+)
+from omegaconf import OmegaConf
+from protein_design_env.environment import Environment
+from stable_baselines3 import PPO
+
+ENV = env_config(
+    OmegaConf.merge(
+        OmegaConf.load("config/defaults.yaml"), {"variable_motif": True, "variable_length": True}
+    )
+)
+
+
+def make_env() -> Environment:
+    return Environment(True, True)
+
+
+def test_evaluate_cached_only_rolls_out_new_seeds(tmp_path) -> None:
+    model = PPO("MlpPolicy", make_env(), seed=0)
+    cache = EvalCache(str(tmp_path))
+    calls = []
+
+    def load_model():
+        calls.append(1)
+        return model
+
+    seeds = evaluation_seeds(6)
+    first = evaluate_cached(load_model, make_env, seeds[:4], ENV, False, cache)
+    assert first["n_new"] == 4
+    second = evaluate_cached(load_model, make_env, seeds, ENV, False, cache, weights_hash(model))
+    assert second["n_new"] == 2
+    np.testing.assert_array_equal(second["returns"][:4], first["returns"])
+    expected = [run_episode(model, make_env(), seed, deterministic=False) for seed in seeds]
+    np.testing.assert_array_equal(second["returns"], [r for r, _ in expected])
+    np.testing.assert_array_equal(second["lengths"], [n for _, n in expected])
+
+    # Cached seeds do not need the model, other determinism or env configurations are new entries.
+    n_calls = len(calls)
+    weights = weights_hash(model)
+    third = evaluate_cached(load_model, make_env, seeds[::-1], ENV, False, cache, weights)
+    assert third["n_new"] == 0 and len(calls) == n_calls
+    np.testing.assert_array_equal(third["returns"], second["returns"][::-1])
+    assert evaluate_cached(load_model, make_env, seeds, ENV, True, cache)["n_new"] == 6
+    other_env = ENV | {"variable_motif": False}
+    assert evaluate_cached(load_model, make_env, seeds, other_env, True, cache)["n_new"] == 6
+    assert len(cache.entries()) == 3
+
+
+def test_checkpoint_hash_matches_loaded_model_and_comparison(tmp_path) -> None:
+    cache = EvalCache(str(tmp_path / "cache"))
+    paths = []
+    for seed in range(2):
+        model = PPO("MlpPolicy", make_env(), seed=seed)
+        paths.append(str(tmp_path / f"model_{seed}.zip"))
+        model.save(paths[-1])
+        assert checkpoint_weights_hash(paths[-1]) == weights_hash(model)
+        assert weights_hash(PPO.load(paths[-1])) == weights_hash(model)
+
+    seeds = evaluation_seeds(3)
+    rows = compare_checkpoints("PPO", paths, seeds, ENV, cache=cache)
+    assert sorted(row["model"] for row in rows) == paths
+    assert all(row["n_new"] == 3 for row in rows)
+    again = compare_checkpoints("PPO", paths, seeds, ENV, cache=cache)
+    assert [row["n_new"] for row in again] == [0, 0]
+    assert [row["mean_return"] for row in again] == [row["mean_return"] for row in rows]
+
+
+def test_eviction_removes_least_recently_used_entries(tmp_path) -> None:
+    cache = EvalCache(str(tmp_path), max_bytes=10**9)
+    results = {seed: (float(seed), 15) for seed in range(100)}
+    for i, weights in enumerate("abc"):
+        cache.store(EvalCache.key(weights, ENV, True), dict(results), {})
+        path = os.path.join(str(tmp_path), f"{EvalCache.key(weights, ENV, True)}.npz")
+        os.utime(path, (i, i))
+    assert cache.lookup(EvalCache.key("a", ENV, True), [3]) == {3: (3.0, 15)}
+    entry_size = cache.entries()[0]["size"]
+
+    cache.max_bytes = 2 * entry_size
+    removed = cache.evict()
+    assert removed == [EvalCache.key("b", ENV, True)]
+    assert {entry["key"] for entry in cache.entries()} == {
+        EvalCache.key("a", ENV, True),
+        EvalCache.key("c", ENV, True),
+    }
+
+
+def test_key_follows_the_residue_table_contents(tmp_path) -> None:
+    path = tmp_path / "residues.yaml"
+    path.write_text(open("config/residues/nonstandard.yaml").read())
+    env = ENV | {"residue_table": str(path)}
+    key = EvalCache.key("a", env, True)
+    assert EvalCache.key("a", env, True) == key != EvalCache.key("a", ENV, True)
+    # The same file with another charge is another env.
+    path.write_text(path.read_text().replace("charge: -1", "charge: 0"))
+    assert EvalCache.key("a", env, True) != key
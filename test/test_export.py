@@ -0,0 +1,53 @@
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+import torch
+from learner.export import export_policy, extract_policy_network, numpy_weights
+from learner.numpy_policy import NumpyPolicy
+from networks import make_policy_kwargs
+from protein_design_env.constants import OBS_SIZE
+from protein_design_env.environment import Environment
+from stable_baselines3 import DQN, PPO
+
+
+@pytest.mark.parametrize("algo", [PPO, DQN])
+def test_exported_policies_match_predict(algo, tmp_path) -> None:
+    model = algo("MlpPolicy", Environment(), seed=0)
+    model.save(tmp_path / "model.zip")
+    observations = np.random.default_rng(0).integers(0, 21, (500, OBS_SIZE)).astype(np.float32)
+    expected, _ = model.predict(observations, deterministic=True)
+
+    formats = ("torchscript", "numpy")
+    paths = export_policy(algo.__name__, str(tmp_path / "model.zip"), str(tmp_path), formats)
+
+    np.testing.assert_array_equal(NumpyPolicy.load(paths["numpy"]).predict(observations), expected)
+    assert NumpyPolicy.load(paths["numpy"]).predict(observations[0]) == expected[0]
+    logits = torch.jit.load(paths["torchscript"])(torch.from_numpy(observations))
+    np.testing.assert_array_equal(logits.argmax(dim=1).numpy(), expected)
+
+
+def test_onnx_export_matches_predict(tmp_path) -> None:
+    onnxruntime = pytest.importorskip("onnxruntime")
+    model = PPO("MlpPolicy", Environment(), seed=0)
+    model.save(tmp_path / "model.zip")
+    observations = np.random.default_rng(0).integers(0, 21, (500, OBS_SIZE)).astype(np.float32)
+
+    paths = export_policy("PPO", str(tmp_path / "model.zip"), str(tmp_path), ("onnx",))
+
+    session = onnxruntime.InferenceSession(paths["onnx"])
+    logits = session.run(None, {"observations": observations})[0]
+    expected, _ = model.predict(observations, deterministic=True)
+    np.testing.assert_array_equal(logits.argmax(axis=1), expected)
+
+
+def test_numpy_export_rejects_features_extractors() -> None:
+    model = PPO("MlpPolicy", Environment(), policy_kwargs=make_policy_kwargs("embedding"))
+    with pytest.raises(ValueError, match="MLP"):
+        numpy_weights(extract_policy_network(model))
+
+
+def test_numpy_policy_does_not_import_torch() -> None:
+    code = "import sys, learner.numpy_policy; assert 'torch' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], check=True)
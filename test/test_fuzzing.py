@@ -0,0 +1,54 @@
+import numpy as np
+from protein_design_env.constants import MAX_SEQUENCE_LENGTH, NUM_AMINO_ACIDS
+from protein_design_env.fuzzing import (
+    BACKENDS,
+    find_mismatches,
+    generate_cases,
+    play_batched,
+    play_environment,
+    run_fuzz,
+)
+
+
+def play_batched_without_charge_penalty(cases):
+    trajectories = play_batched(cases)
+    trajectories["rewards"] = np.maximum(trajectories["rewards"], 0.0)
+    return trajectories
+
+
+def test_backends_match_environment_in_worker_processes() -> None:
+    report = run_fuzz(600, seed=1, chunk_size=200, n_workers=2)
+
+    assert report["counterexamples"] == []
+    assert set(report["backends"]) == set(BACKENDS)
+    for backend in report["backends"].values():
+        assert backend["mismatches"] == 0
+        assert backend["steps_per_second"] > 0
+
+
+def test_generated_cases_cover_edge_cases() -> None:
+    cases = generate_cases(5000)
+
+    assert cases.actions.min() == 0 and cases.actions.max() == NUM_AMINO_ACIDS - 1
+    assert cases.sequence_lengths.max() == MAX_SEQUENCE_LENGTH
+    motif_lengths = np.count_nonzero(cases.motifs, axis=1)
+    assert np.any(cases.sequence_lengths < motif_lengths)
+    assert np.any((cases.motifs[:, 1] == cases.motifs[:, 0]) & (motif_lengths == 4))
+    returns = play_environment(cases[:500])["returns"]
+    final_returns = returns[np.arange(500), cases.sequence_lengths[:500] - 1]
+    # Episodes with a motif hit, with and without the charge penalty.
+    assert np.any(final_returns >= 1) and np.any(final_returns < 0)
+
+
+def test_harness_reports_a_wrong_backend() -> None:
+    backends = {"wrong": play_batched_without_charge_penalty}
+    report = run_fuzz(300, chunk_size=100, backends=backends, max_counterexamples=3)
+
+    assert report["backends"]["wrong"]["mismatches"] > 0
+    assert len(report["counterexamples"]) == 3
+    counterexample = report["counterexamples"][0]
+    assert counterexample["field"] == "rewards"
+    assert len(counterexample["actions"]) == counterexample["sequence_length"]
+    cases = generate_cases(10)
+    reference = play_environment(cases)
+    assert find_mismatches(reference, reference) == []
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from learner.mcts import MCTSPlanner, Node, SearchStats, compare_with_greedy, greedy_design
+from protein_design_env.environment import Environment
+from protein_design_env.residues import load_residue_table
+from stable_baselines3 import DQN, PPO
+
+
+def test_search_backs_up_every_simulation() -> None:
+    env = Environment()
+    planner = MCTSPlanner(PPO("MlpPolicy", env, seed=0), n_threads=2, batch_size=4)
+    obs, _ = env.reset(seed=0)
+    root = Node()
+    root.snapshot, root.observation = env.snapshot(), obs
+    stats = SearchStats()
+
+    action = planner.search(root, 0.5, stats)
+
+    assert stats.simulations > 0 and stats.network_calls > 1
+    assert root.visits.sum() == stats.simulations
+    assert action == int(np.argmax(root.visits))
+    # All the virtual losses are removed once the leaves are evaluated.
+    nodes = [root]
+    while nodes:
+        node = nodes.pop()
+        assert not node.virtual_losses.any()
+        nodes.extend(node.children.values())
+
+
+def test_mcts_design_beats_untrained_greedy_policy() -> None:
+    env = Environment()
+    model = PPO("MlpPolicy", env, seed=0)
+    greedy_return, _ = greedy_design(model, env, seed=0)
+
+    mcts_return, sequence, stats = MCTSPlanner(model, n_threads=2, batch_size=8).design(env, 3.0, 0)
+
+    assert len(sequence) == env.sequence_length
+    assert mcts_return > greedy_return
+    assert stats.simulations > env.sequence_length
+
+
+def test_mcts_requires_actor_critic_policy() -> None:
+    with pytest.raises(ValueError):
+        MCTSPlanner(DQN("MlpPolicy", Environment()))
+
+
+def test_mcts_with_nonstandard_residues() -> None:
+    residues = load_residue_table("config/residues/nonstandard.yaml")
+    model = PPO("MlpPolicy", Environment(residues=residues), seed=0)
+
+    results = compare_with_greedy(model, {"residues": residues}, [0], 0.2, batch_size=4)
+
+    assert results["simulations_per_design"] > 0
+    with pytest.raises(ValueError):
+        MCTSPlanner(model)
+
+
+def test_mcts_with_target_motifs() -> None:
+    env_kwargs = {"motifs": [[9], [2, 10]], "motif_reward": "count"}
+    env = Environment(**env_kwargs)
+    model = PPO("MlpPolicy", env, seed=0)
+    planner = MCTSPlanner(model, n_threads=2, batch_size=4, **env_kwargs)
+    obs, _ = env.reset(seed=0)
+    root = Node(env.action_space.n)
+    root.snapshot, root.observation = env.snapshot(), obs
+
+    planner.search(root, 0.5)
+
+    # The leaves are played with the target motif rewards of the design env.
+    assert root.children
+    for action, child in root.children.items():
+        env.restore(root.snapshot)
+        assert child.reward == env.step(action)[1]
+    with pytest.raises(ValueError):
+        MCTSPlanner(model)
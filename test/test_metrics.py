@@ -0,0 +1,108 @@
+import json
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pytest
+from learner.learner import Agent
+from learner.metrics import MetricsRecorder, PrometheusExporter, WandbFileSink
+from omegaconf import OmegaConf
+
+
+def test_recorder_keeps_the_last_records_in_order() -> None:
+    recorder = MetricsRecorder(capacity=4)
+    for i in range(6):
+        recorder.record("a" if i % 2 else "b", float(i), step=i)
+
+    records, n_records = recorder.records_since(0)
+
+    assert n_records == 6
+    np.testing.assert_array_equal(records["values"], [2.0, 3.0, 4.0, 5.0])
+    np.testing.assert_array_equal(records["steps"], [2, 3, 4, 5])
+    np.testing.assert_array_equal(recorder.recent_values("a"), [3.0, 5.0])
+    assert recorder.latest == {"b": 4.0, "a": 5.0}
+    assert recorder.counts == {"b": 3, "a": 3} and recorder.sums["a"] == 9.0
+    assert len(recorder.records_since(5)[0]["values"]) == 1
+
+
+def test_prometheus_exporter() -> None:
+    recorder = MetricsRecorder()
+    for reward in range(1, 101):
+        recorder.record("episode_reward", reward)
+    recorder.record("env_steps_per_second", 1234.5)
+    exporter = PrometheusExporter(recorder, port=0).start()
+    try:
+        url = f"http://127.0.0.1:{exporter.port}"
+        body = urllib.request.urlopen(f"{url}/metrics").read().decode()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"{url}/other")
+    finally:
+        exporter.stop()
+
+    assert "# TYPE protein_design_env_steps_per_second gauge" in body
+    assert "protein_design_env_steps_per_second 1234.5" in body
+    assert 'protein_design_episode_reward{quantile="0.5"} 50.5' in body
+    assert "protein_design_episode_reward_count 100" in body
+    assert "protein_design_episode_reward_sum 5050.0" in body
+
+
+def test_new_metrics_are_published_once_complete() -> None:
+    recorder = MetricsRecorder()
+    exporter = PrometheusExporter(recorder, port=0)
+    renders = []
+
+    class Names(list):
+        def append(self, name: str) -> None:
+            # A scrape between the registration of a metric and its first value.
+            super().append(name)
+            renders.append(exporter.render())
+
+    recorder.names = Names()
+    recorder.record("episode_reward", 1.0)
+    recorder.record("env_steps_per_second", 10.0)
+    exporter.server.server_close()
+
+    assert "protein_design_env_steps_per_second 10.0" in renders[-1]
+    assert "protein_design_episode_reward_count 1" in renders[0]
+
+
+def test_wandb_file_sink(tmp_path) -> None:
+    recorder = MetricsRecorder(capacity=8)
+    sink = WandbFileSink(recorder, str(tmp_path))
+    recorder.record("episode_reward", 1.0, step=10)
+    recorder.record("episode_reward", 2.0, step=10)
+    recorder.record("rss_bytes", 3.0, step=10)
+    assert sink.flush() == 2
+    for i in range(10):
+        recorder.record("timesteps", float(i), step=20 + i)
+    sink.stop()
+
+    with open(tmp_path / "files" / "wandb-history.jsonl") as f:
+        rows = [json.loads(line) for line in f]
+    assert [row["_step"] for row in rows[:2]] == [10, 10]
+    assert rows[0]["episode_reward"] == 1.0
+    assert rows[1]["episode_reward"] == 2.0 and rows[1]["rss_bytes"] == 3.0
+    assert [row["timesteps"] for row in rows[2:]] == [float(i) for i in range(2, 10)]
+    assert sink.n_dropped == 2
+    with open(tmp_path / "files" / "wandb-summary.json") as f:
+        assert json.load(f) == {"episode_reward": 2.0, "rss_bytes": 3.0, "timesteps": 9.0}
+
+
+def test_training_writes_metrics(tmp_path, monkeypatch) -> None:
+    cfg = OmegaConf.load("config/defaults.yaml")
+    monkeypatch.chdir(tmp_path)
+    cfg.algo = "A2C"
+    cfg.timesteps = 500
+    cfg.dir = str(tmp_path)
+    cfg.model_save_bool = False
+    cfg.metrics_port = 0
+    cfg.metrics_sample_every = 50
+    cfg.logging.wandb.mode = "offline"
+
+    Agent(cfg).train()
+
+    (run_dir,) = (tmp_path / "wandb").iterdir()
+    with open(run_dir / "files" / "wandb-history.jsonl") as f:
+        rows = [json.loads(line) for line in f]
+    metrics = set().union(*rows)
+    assert {"episode_reward", "env_steps_per_second", "rss_bytes", "update_seconds"} <= metrics
@@ -0,0 +1,139 @@
+import numpy as np
+import pytest
+from learner.learner import make_protein_env
+from protein_design_env.batched_environment import BatchedEnvironment
+from protein_design_env.constants import DEFAULT_MOTIF, OBS_SIZE, REWARD_PER_MOTIF
+from protein_design_env.environment import Environment
+from protein_design_env.motif_targets import MotifTargets
+from protein_design_env.residues import STANDARD_RESIDUES
+
+MOTIFS = [[1, 2], [2, 1, 2], [5, 6, 7, 8], [9], [2, 1]]
+WEIGHTS = [1.0, 2.0, 0.5, 1.0, 3.0]
+
+
+def brute_force_counts(sequence, motifs):
+    return [
+        sum(sequence[i : i + len(motif)] == motif for i in range(len(sequence)))
+        for motif in motifs
+    ]
+
+
+def test_automaton_counts_overlapping_occurrences() -> None:
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        motifs = [
+            rng.integers(1, 4, rng.integers(1, 5)).tolist() for _ in range(rng.integers(1, 6))
+        ]
+        targets = MotifTargets(motifs, 20)
+        sequence = rng.integers(1, 4, 30).tolist()
+        counts, bonus_hits = targets.count(sequence)
+        assert counts == brute_force_counts(sequence, motifs)
+        assert bonus_hits == [sum(r in sequence for r in motif) for motif in motifs]
+
+    targets = MotifTargets([[1, 1], [1]], 20, reward="count", weights=[2.0, 1.0])
+    assert targets.count([1, 1, 1]) == ([2, 3], [2, 1])
+    assert targets.motif_reward([2, 3], [2, 1]) == 7 * REWARD_PER_MOTIF
+
+
+def test_single_target_motif_matches_default_environment() -> None:
+    rng = np.random.default_rng(1)
+    motif = [amino_acid.value for amino_acid in DEFAULT_MOTIF]
+    default_env = Environment(change_sequence_length_at_each_episode=True, seed=3)
+    targets_env = Environment(change_sequence_length_at_each_episode=True, seed=3, motifs=[motif])
+    assert targets_env.observation_space.shape == (OBS_SIZE + 1,)
+    for _ in range(20):
+        obs, _ = default_env.reset()
+        targets_obs, _ = targets_env.reset()
+        np.testing.assert_array_equal(targets_obs[:OBS_SIZE], obs)
+        done = False
+        while not done:
+            action = int(rng.choice([1, 9, rng.integers(0, 20)]))
+            obs, reward, done, _, _ = default_env.step(action)
+            targets_obs, targets_reward, _, _, _ = targets_env.step(action)
+            assert targets_reward == reward
+            np.testing.assert_array_equal(targets_obs[:OBS_SIZE], obs)
+            assert targets_obs[-1] == targets_env.targets.count(targets_env.state)[0][0]
+
+
+def single_motif_reward(sequence, motif):
+    if brute_force_counts(sequence, [motif])[0]:
+        return REWARD_PER_MOTIF
+    return sum(1 / (5 * len(motif)) for residue in motif if residue in sequence)
+
+
+def test_single_motif_counts_follow_motif_and_state_changes() -> None:
+    rng = np.random.default_rng(2)
+    env = Environment(
+        change_motif_at_each_episode=True, change_sequence_length_at_each_episode=True
+    )
+    for _ in range(50):
+        env.reset()
+        for t in range(env.sequence_length):
+            if t == 5 and rng.random() < 0.3:
+                # Assigned motifs and states are counted again.
+                env.motif = rng.integers(1, 4, rng.integers(1, 5)).tolist()
+            if t == 8 and rng.random() < 0.3:
+                env.state = rng.integers(1, 4, 7).tolist()
+            _, reward, _, _, _ = env.step(int(rng.integers(0, 3)))
+            expected = single_motif_reward(env.state, env.motif)
+            assert reward - env._charge_penalty() == pytest.approx(expected)
+            assert env._get_reward() == reward
+
+
+def test_batched_target_motifs_match_environment() -> None:
+    n_envs = 16
+    kwargs = {"motifs": MOTIFS, "motif_reward": "count", "motif_weights": WEIGHTS}
+    batched_env = BatchedEnvironment(n_envs, False, True, seed=0, multi_objective=True, **kwargs)
+    batched_obs = batched_env.reset()
+    envs = []
+    for i in range(n_envs):
+        env = Environment(multi_objective=True, **kwargs)
+        env.reset()
+        env.sequence_length = int(batched_env.sequence_lengths[i])
+        np.testing.assert_array_equal(env._get_observation(), batched_obs[i])
+        envs.append(env)
+
+    rng = np.random.default_rng(0)
+    for _ in range(25):
+        actions = rng.integers(0, 10, n_envs)
+        batched_obs, rewards, dones, infos = batched_env.step(actions)
+        for i, env in enumerate(envs):
+            if len(env.state) >= env.sequence_length:
+                continue
+            obs, reward, terminated, _, info = env.step(int(actions[i]))
+            assert reward == rewards[i] and terminated == dones[i]
+            np.testing.assert_array_equal(infos["reward_vectors"][i], info["reward_vector"])
+            expected_obs = infos["final_observations"][i] if terminated else batched_obs[i]
+            np.testing.assert_array_equal(expected_obs, obs)
+
+    # The snapshot of an env replays its counts.
+    env = envs[0]
+    env.reset()
+    for action in (0, 1, 0, 1):
+        env.step(action)
+    restored = Environment(multi_objective=True, **kwargs)
+    np.testing.assert_array_equal(restored.restore(env.snapshot()), env._get_observation())
+
+
+def test_target_motifs_from_codes_and_invalid_targets() -> None:
+    assert STANDARD_RESIDUES.encode("RI") == [
+        STANDARD_RESIDUES.codes.index("R") + 1,
+        STANDARD_RESIDUES.codes.index("I") + 1,
+    ]
+    env = make_protein_env("Protein-Design-v0", False, False, 0, target_motifs=["RI", "DEK"])
+    assert env.observation_space.shape == (OBS_SIZE + 4 + 2,)
+
+    with pytest.raises(ValueError):
+        STANDARD_RESIDUES.encode("RZ")
+    with pytest.raises(ValueError):
+        MotifTargets([[1, 2, 3, 4, 5]], 20)
+    with pytest.raises(ValueError):
+        MotifTargets([[21]], 20)
+    with pytest.raises(ValueError):
+        MotifTargets([[1]], 20, reward="sum")
+    with pytest.raises(ValueError):
+        MotifTargets([[1], [2]], 20, weights=[1.0])
+    with pytest.raises(ValueError):
+        Environment(change_motif_at_each_episode=True, motifs=[[1]])
+    with pytest.raises(ValueError):
+        BatchedEnvironment(2, motifs=[[1]]).set_episodes([[2, 0, 0, 0]] * 2, [10, 10])
@@ -0,0 +1,60 @@
+import numpy as np
+from learner.motif_benchmark import run_benchmark, sample_held_out_motifs
+from protein_design_env.constants import MAX_MOTIF_LENGTH, NUM_AMINO_ACIDS
+from protein_design_env.environment import Environment
+from protein_design_env.motifs import (
+    N_MOTIFS,
+    held_out_motifs,
+    motif_ids,
+    motifs_from_ids,
+    optimal_sequences,
+)
+from protein_design_env.scoring import score_sequences
+from stable_baselines3 import PPO
+
+
+def test_motif_ids_roundtrip() -> None:
+    assert N_MOTIFS == sum(NUM_AMINO_ACIDS**length for length in range(2, MAX_MOTIF_LENGTH + 1))
+    ids = np.arange(N_MOTIFS)
+    np.testing.assert_array_equal(motif_ids(motifs_from_ids(ids)), ids)
+    assert motif_ids([1, 1])[0] == 0
+    assert motif_ids([20, 20, 20, 20])[0] == N_MOTIFS - 1
+
+
+def test_optimal_sequences_beat_random_sequences() -> None:
+    rng = np.random.default_rng(0)
+    motifs = motifs_from_ids(rng.choice(N_MOTIFS, 200, replace=False))
+    for sequence_length in (15, 25):
+        sequences = optimal_sequences(motifs, sequence_length)
+        optimal = score_sequences(sequences, motifs, sequence_length)
+        assert np.all(optimal.motif_hits)
+        assert np.all(optimal.charges == 0)
+        for _ in range(20):
+            sequences = rng.integers(1, NUM_AMINO_ACIDS + 1, (len(motifs), sequence_length))
+            scores = score_sequences(sequences, motifs, sequence_length)
+            assert np.all(optimal.returns >= scores.returns)
+
+
+def test_environment_never_draws_held_out_motifs() -> None:
+    held_out = held_out_motifs(0.5)
+    env = Environment(True, False, seed=0, held_out_motif_fraction=0.5)
+    ids = []
+    for _ in range(500):
+        env.reset()
+        ids.append(motif_ids(env.motif)[0])
+    assert not np.any(held_out[ids])
+    assert 0.45 < held_out.mean() < 0.55
+
+
+def test_motif_benchmark(tmp_path) -> None:
+    model_path = str(tmp_path / "model.zip")
+    PPO("MlpPolicy", Environment(), n_steps=64, batch_size=64).save(model_path)
+    motifs = sample_held_out_motifs(0.2, n_motifs=10)
+    sequence_lengths = np.array([15, 20])
+
+    results = run_benchmark("PPO", model_path, motifs, sequence_lengths, n_workers=2)
+
+    assert results["overall"]["n_episodes"] == 20
+    assert sum(group["n_episodes"] for group in results["groups"]) == 20
+    assert results["overall"]["mean_optimality_gap"] >= 0
+    assert results["overall"]["mean_optimal_return"] > results["overall"]["mean_return"]
@@ -0,0 +1,82 @@
+import gymnasium as gym
+import numpy as np
+import pytest
+import torch
+from networks import FEATURES_EXTRACTORS, make_policy_kwargs
+from networks.features_extractor import (
+    N_TOKENS,
+    VOCABULARY_SIZE,
+    observation_sizes,
+    split_observation,
+)
+from protein_design_env.constants import MAX_MOTIF_LENGTH, OBS_SIZE
+from protein_design_env.environment import Environment
+from stable_baselines3 import PPO
+
+
+def _observations(n_observations: int) -> torch.Tensor:
+    env = Environment(change_motif_at_each_episode=True, change_sequence_length_at_each_episode=True)
+    observations = [env.reset()[0]]
+    while len(observations) < n_observations:
+        obs, _, terminated, _, _ = env.step(env.action_space.sample())
+        observations.append(env.reset()[0] if terminated else obs)
+    return torch.as_tensor(np.array(observations))
+
+
+@pytest.mark.parametrize("features_extractor", list(FEATURES_EXTRACTORS))
+def test_features_extractor_forward(features_extractor: str) -> None:
+    env = Environment()
+    extractor = FEATURES_EXTRACTORS[features_extractor](env.observation_space, features_dim=32)
+
+    features = extractor(_observations(50).float())
+
+    assert features.shape == (50, 32)
+    assert torch.all(torch.isfinite(features))
+
+
+def test_fused_onehot_matches_onehot_linear() -> None:
+    env = Environment()
+    extractor = FEATURES_EXTRACTORS["onehot_fused"](env.observation_space, features_dim=8)
+    observations = _observations(20).float()
+
+    tokens, scalars = split_observation(observations)
+    one_hot = torch.nn.functional.one_hot(tokens, VOCABULARY_SIZE).flatten(start_dim=1).float()
+    weight = extractor.token_weights.weight.reshape(N_TOKENS * VOCABULARY_SIZE, 8)
+    expected = torch.relu(one_hot @ weight + extractor.scalar_weights(scalars))
+
+    torch.testing.assert_close(extractor(observations), expected)
+
+
+@pytest.mark.parametrize("features_extractor", list(FEATURES_EXTRACTORS))
+def test_features_extractor_encodes_target_motifs(features_extractor: str) -> None:
+    env = Environment(motifs=[[2, 10], [4, 6, 12], [9]], motif_reward="count")
+    assert observation_sizes(env.observation_space) == (3, N_TOKENS + 2 * MAX_MOTIF_LENGTH, 6)
+    extractor = FEATURES_EXTRACTORS[features_extractor](env.observation_space, features_dim=32)
+    obs, _ = env.reset(seed=0)
+    for action in (1, 9, 8):
+        obs, _, _, _, _ = env.step(action)
+    observations = torch.as_tensor(np.array([obs] * 3)).float()
+    # Another extra motif and other counts.
+    observations[1, OBS_SIZE] = 5
+    observations[2, -1] += 1
+
+    tokens, scalars = split_observation(observations, n_motifs=3)
+    assert tokens[0, -2 * MAX_MOTIF_LENGTH :].tolist() == [4, 6, 12, 0, 9, 0, 0, 0]
+    assert (scalars[0, -3:] * 25).tolist() == [1, 0, 1]
+    features = extractor(observations)
+    assert not torch.equal(features[0], features[1])
+    assert not torch.equal(features[0], features[2])
+
+    with pytest.raises(ValueError):
+        FEATURES_EXTRACTORS[features_extractor](
+            gym.spaces.Box(0, 1, (OBS_SIZE + 2,)), features_dim=32
+        )
+
+
+def test_make_policy_kwargs() -> None:
+    assert make_policy_kwargs("mlp") == {}
+    with pytest.raises(ValueError):
+        make_policy_kwargs("transformer")
+
+    model = PPO("MlpPolicy", Environment(), n_steps=64, policy_kwargs=make_policy_kwargs("embedding"))
+    model.learn(total_timesteps=64)
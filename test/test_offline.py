@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from learner.env_config import env_config
+from learner.learner import Agent
+from learner.offline import OfflineDataset, build_dataset, sample_episodes
+from omegaconf import OmegaConf
+from protein_design_env.environment import Environment
+from protein_design_env.motifs import held_out_motifs, motif_ids
+from stable_baselines3 import DQN, PPO
+
+
+def test_dataset_records_solver_episodes(tmp_path) -> None:
+    motifs, lengths = sample_episodes(50, True, True, held_out_motif_fraction=0.5, seed=0)
+    assert not held_out_motifs(0.5)[motif_ids(motifs)].any()
+    cfg = OmegaConf.load("config/defaults.yaml")
+    cfg.variable_motif, cfg.held_out_motif_fraction = True, 0.5
+    dataset = build_dataset(
+        str(tmp_path), motifs, lengths, env_config(cfg), gamma=0.9, batch_size=16
+    )
+    assert len(dataset) == lengths.sum() == dataset.metadata["n_transitions"]
+    assert dataset.metadata["env"]["held_out_motif_fraction"] == 0.5
+
+    start = 0
+    for motif, length in zip(motifs, lengths):
+        env = Environment()
+        obs, _ = env.reset()
+        env.motif = motif[motif > 0].tolist()
+        env.sequence_length = int(length)
+        rewards = []
+        for t in range(length):
+            np.testing.assert_array_equal(dataset.observations[start + t], env._get_observation())
+            _, reward, _, _, _ = env.step(int(dataset.actions[start + t]))
+            rewards.append(reward)
+        returns = [sum(r * 0.9**i for i, r in enumerate(rewards[t:])) for t in range(length)]
+        np.testing.assert_allclose(dataset.returns[start : start + length], returns, rtol=1e-5)
+        start += length
+
+    # Chunks of a memory-mapped reopened dataset are streamed once each.
+    reopened = OfflineDataset(str(tmp_path))
+    batches = list(reopened.iter_batches(32, chunk_size=100, rng=np.random.default_rng(0)))
+    actions = np.concatenate([batch[1] for batch in batches])
+    assert max(len(batch[1]) for batch in batches) == 32
+    np.testing.assert_array_equal(np.sort(actions), np.sort(dataset.actions))
+
+
+def test_agent_pretraining_imitates_solver(tmp_path, monkeypatch) -> None:
+    cfg = OmegaConf.load("config/defaults.yaml")
+    monkeypatch.chdir(tmp_path)
+    motifs, lengths = sample_episodes(2000, False, True)
+    build_dataset(str(tmp_path / "dataset"), motifs, lengths, env_config(cfg))
+    cfg.bc_dataset = str(tmp_path / "dataset")
+    cfg.bc_epochs = 2
+
+    agent = Agent(cfg)
+    history = agent.pretrain()
+    assert history[-1]["accuracy"] > 0.95
+    env = Environment(change_sequence_length_at_each_episode=True, seed=1)
+    obs, _ = env.reset()
+    episode_return, done = 0.0, False
+    while not done:
+        action, _ = agent.model.predict(obs, deterministic=True)
+        obs, reward, done, _, _ = env.step(int(action))
+        episode_return += reward
+    assert episode_return > 15
+
+    agent.model = DQN("MlpPolicy", agent.env)
+    with pytest.raises(ValueError):
+        agent.pretrain()
+
+
+def test_dataset_records_target_motif_env(tmp_path) -> None:
+    cfg = OmegaConf.load("config/defaults.yaml")
+    cfg.target_motifs, cfg.motif_reward = ["RI", "DEK"], "count"
+    motifs, lengths = sample_episodes(20, False, True)
+    with pytest.raises(ValueError):
+        build_dataset(str(tmp_path / "solver"), motifs, lengths, env_config(cfg))
+    env = Environment(motifs=[[2, 10], [4, 6, 12]], motif_reward="count")
+    model = PPO("MlpPolicy", env, seed=0)
+    dataset = build_dataset(str(tmp_path / "model"), motifs, lengths, env_config(cfg), model)
+    assert dataset.observations.shape == (lengths.sum(), *env.observation_space.shape)
+    assert dataset.metadata["env"]["target_motifs"] == ["RI", "DEK"]
+
+    # A model of another env configuration is not pretrained on the dataset.
+    cfg.bc_dataset = str(tmp_path / "model")
+    agent = Agent(cfg)
+    assert agent.pretrain()
+    cfg.motif_reward = "presence"
+    with pytest.raises(ValueError, match="env configuration"):
+        Agent(cfg).pretrain()
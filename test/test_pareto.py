@@ -0,0 +1,53 @@
+import numpy as np
+from protein_design_env.pareto import ParetoArchive, non_dominated
+
+
+def _brute_force_front(points: np.ndarray) -> np.ndarray:
+    return np.array(
+        [
+            not np.any(np.all(points >= point, axis=1) & np.any(points > point, axis=1))
+            for point in points
+        ]
+    )
+
+
+def test_non_dominated_matches_brute_force() -> None:
+    rng = np.random.default_rng(0)
+    for n_objectives in (2, 3):
+        points = rng.integers(0, 30, size=(3000, n_objectives)).astype(float)
+        np.testing.assert_array_equal(non_dominated(points), _brute_force_front(points))
+
+
+def test_archive_keeps_front_of_all_batches() -> None:
+    rng = np.random.default_rng(0)
+    archive = ParetoArchive(n_objectives=2)
+    all_sequences, all_objectives = [], []
+    for _ in range(10):
+        sequences = rng.integers(1, 21, size=(500, 6))
+        objectives = rng.normal(size=(500, 2)).round(1)
+        archive.insert(sequences, objectives)
+        all_sequences.append(sequences)
+        all_objectives.append(objectives)
+
+    objectives = np.concatenate(all_objectives)
+    expected = {
+        tuple(sequence)
+        for sequence in np.concatenate(all_sequences)[_brute_force_front(objectives)]
+    }
+    assert {tuple(sequence) for sequence in archive.sequences} == expected
+    assert archive.n_inserted == 5000
+
+
+def test_archive_deduplicates_and_caps_sequences_per_point() -> None:
+    archive = ParetoArchive(n_objectives=2, max_sequences_per_point=2)
+    sequences = np.array([[1, 2], [1, 2], [3, 4], [5, 6], [7, 8]])
+    objectives = np.array([[1.0, 1.0], [1.0, 1.0], [1.0, 1.0], [1.0, 1.0], [0.0, 0.0]])
+
+    assert archive.insert(sequences, objectives) == 2
+    assert archive.insert(sequences[:1], objectives[:1]) == 0
+    assert len(archive) == 2
+    np.testing.assert_array_equal(archive.points, [[1.0, 1.0]])
+
+    # A dominating sequence replaces the whole front.
+    assert archive.insert([[9, 9]], [[2.0, 1.0]]) == 1
+    np.testing.assert_array_equal(archive.sequences, [[9, 9]])
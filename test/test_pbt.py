@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from learner.pbt import (
+    HYPERPARAMETER_RANGES,
+    Member,
+    exploit_and_explore,
+    member_config,
+    perturb_hyperparameters,
+    run_pbt,
+    sample_hyperparameters,
+)
+from learner.threads import PROCESS_CPUS, ThreadLayout
+from omegaconf import OmegaConf
+
+
+def test_exploit_and_explore_copies_best_members(tmp_path) -> None:
+    rng = np.random.default_rng(0)
+    population = []
+    for i, reward in enumerate([1.0, 4.0, 3.0, 2.0]):
+        member = Member(i, sample_hyperparameters(rng), str(tmp_path / f"member_{i}.zip"))
+        member.eval_reward = reward
+        (tmp_path / f"member_{i}.zip").write_text(str(i))
+        population.append(member)
+    best_hyperparameters = dict(population[1].hyperparameters)
+
+    copies = exploit_and_explore(population, exploit_fraction=0.25, rng=rng)
+
+    assert copies == [(0, 1)]
+    assert (tmp_path / "member_0.zip").read_text() == "1"
+    for name, value in population[0].hyperparameters.items():
+        assert np.isclose(value / best_hyperparameters[name], [0.8, 1.2]).any()
+    assert population[1].hyperparameters == best_hyperparameters
+
+
+def test_members_keep_a_single_thread_on_their_own_cpu() -> None:
+    cfg = OmegaConf.load("config/defaults.yaml")
+    cfg.torch_threads, cfg.thread_autotune, cfg.cpu_affinity = 4, True, "split"
+    layouts = []
+    for i in range(3):
+        args = member_config(cfg, Member(i, {}, f"member_{i}.zip"), seed=i)
+        assert args.seed == i and not args.thread_autotune
+        layouts.append(ThreadLayout.from_config(args))
+    assert all(layout.torch_threads == 1 for layout in layouts)
+    n_cpus = min(3, len(PROCESS_CPUS))
+    assert len({layout.learner_cpus for layout in layouts}) == n_cpus
+    assert cfg.torch_threads == 4 and cfg.cpu_list is None
+
+
+def test_sampled_hyperparameters_are_in_range() -> None:
+    rng = np.random.default_rng(0)
+    for _ in range(100):
+        hyperparameters = sample_hyperparameters(rng)
+        for name, (low, high) in HYPERPARAMETER_RANGES.items():
+            assert low <= hyperparameters[name] <= high
+        assert perturb_hyperparameters(hyperparameters, rng).keys() == hyperparameters.keys()
+
+
+def test_run_pbt(tmp_path, monkeypatch) -> None:
+    cfg = OmegaConf.load("config/defaults.yaml")
+    monkeypatch.chdir(tmp_path)
+    cfg.timesteps = 200
+    cfg.pbt_generation_timesteps = 100
+    cfg.pbt_population_size = 2
+    cfg.pbt_eval_episodes = 2
+
+    results = run_pbt(cfg, str(tmp_path / "pbt"))
+
+    assert len(results["generations"]) == 2
+    assert results["generations"][0]["copies"][0][1] == results["generations"][0]["best_member"]
+    assert results["best_member"]["num_timesteps"] > 0
+    assert (tmp_path / "pbt" / "member_0.zip").exists()
+
+
+def test_run_pbt_raises_without_generations(tmp_path) -> None:
+    cfg = OmegaConf.load("config/defaults.yaml")
+    cfg.timesteps = 0
+    with pytest.raises(ValueError, match="one generation"):
+        run_pbt(cfg, str(tmp_path / "pbt"))
+    cfg.timesteps = 200
+    with pytest.raises(ValueError, match="no member"):
+        run_pbt(cfg, str(tmp_path / "pbt"), initial_hyperparameters=[])
@@ -0,0 +1,79 @@
+import numpy as np
+import torch as th
+from learner.replay_buffer import ProteinReplayBuffer
+from protein_design_env.environment import Environment
+from stable_baselines3 import DQN
+from stable_baselines3.common.buffers import ReplayBuffer
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+
+def _make_env() -> Environment:
+    return Environment(change_motif_at_each_episode=True, change_sequence_length_at_each_episode=True)
+
+
+def _fill_buffers(n_transitions: int) -> tuple[ReplayBuffer, ProteinReplayBuffer]:
+    env = DummyVecEnv([_make_env, _make_env])
+    reference = ReplayBuffer(100, env.observation_space, env.action_space, n_envs=2)
+    compact = ProteinReplayBuffer(100, env.observation_space, env.action_space, n_envs=2)
+
+    obs = env.reset()
+    rng = np.random.default_rng(0)
+    for _ in range(n_transitions):
+        actions = rng.integers(0, env.action_space.n, size=2)
+        next_obs, rewards, dones, infos = env.step(actions)
+        # Mimic `OffPolicyAlgorithm._store_transition` for terminal observations.
+        stored_next_obs = next_obs.copy()
+        for i, done in enumerate(dones):
+            if done:
+                stored_next_obs[i] = infos[i]["terminal_observation"]
+        for buffer in (reference, compact):
+            buffer.add(obs, stored_next_obs, actions, rewards, dones, infos)
+        obs = next_obs
+    return reference, compact
+
+
+class TestProteinReplayBuffer:
+    def test_samples_match_reference_buffer(self) -> None:
+        # 120 transitions wrap around the buffer and cross several episode ends.
+        reference, compact = _fill_buffers(120)
+
+        np.random.seed(0)
+        expected = reference.sample(64)
+        np.random.seed(0)
+        samples = compact.sample(64)
+
+        for expected_tensor, tensor in zip(expected, samples):
+            if expected_tensor is None:
+                assert tensor is None
+                continue
+            assert tensor.dtype == expected_tensor.dtype
+            assert th.equal(tensor, expected_tensor)
+
+    def test_memory_per_transition_is_reduced(self) -> None:
+        reference, compact = _fill_buffers(1)
+        reference_nbytes = (
+            reference.observations.nbytes
+            + reference.next_observations.nbytes
+            + reference.actions.nbytes
+            + reference.rewards.nbytes
+            + reference.dones.nbytes
+            + reference.timeouts.nbytes
+        )
+
+        assert compact.nbytes * 10 < reference_nbytes
+
+    def test_dqn_learning_is_identical(self) -> None:
+        parameters = []
+        for replay_buffer_class in (None, ProteinReplayBuffer):
+            model = DQN(
+                "MlpPolicy",
+                _make_env(),
+                learning_starts=50,
+                buffer_size=1000,
+                seed=0,
+                replay_buffer_class=replay_buffer_class,
+            )
+            model.learn(total_timesteps=300)
+            parameters.append(th.nn.utils.parameters_to_vector(model.policy.parameters()))
+
+        assert th.equal(parameters[0], parameters[1])
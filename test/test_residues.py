@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+from networks import make_policy_kwargs
+from protein_design_env.amino_acids import AMINO_ACIDS_TO_CHARGES_ARRAY, AminoAcids
+from protein_design_env.batched_environment import BatchedEnvironment
+from protein_design_env.environment import Environment
+from protein_design_env.residues import (
+    STANDARD_RESIDUES,
+    ResidueTable,
+    load_residue_table,
+    ph_charge,
+)
+from protein_design_env.torch_environment import TorchBatchedEnvironment
+from stable_baselines3 import PPO
+
+NONSTANDARD = load_residue_table("config/residues/nonstandard.yaml")
+
+
+def test_standard_residue_table_file_matches_default() -> None:
+    assert STANDARD_RESIDUES.names == tuple(amino_acid.name for amino_acid in AminoAcids)
+    np.testing.assert_array_equal(STANDARD_RESIDUES.charges, AMINO_ACIDS_TO_CHARGES_ARRAY)
+    assert STANDARD_RESIDUES.column("hydrophobicity")[AminoAcids.ISOLEUCINE] == 4.5
+    table = load_residue_table("config/residues/standard.yaml")
+    assert table.is_standard and table.names == STANDARD_RESIDUES.names
+    np.testing.assert_array_equal(table.charges, STANDARD_RESIDUES.charges)
+    np.testing.assert_allclose(table.properties, STANDARD_RESIDUES.properties)
+    assert NONSTANDARD.n_residues == 22 and not NONSTANDARD.is_standard
+    assert NONSTANDARD.codes[20:] == ("U", "O") and NONSTANDARD.charges[21] == -1
+
+
+def test_ph_charge() -> None:
+    assert ph_charge(1, 10.0, 10.0) == pytest.approx(0.5)
+    assert ph_charge(-1, 4.0, 4.0) == pytest.approx(-0.5)
+    assert ph_charge(-1, 4.0, 7.0) == pytest.approx(-1, abs=1e-3)
+    assert ph_charge(0, None, 7.0) == 0.0
+    charges = STANDARD_RESIDUES.column("ph_charge")
+    # Lysine is protonated at pH 7, histidine mostly not.
+    assert charges[STANDARD_RESIDUES.codes.index("K") + 1] > 0.99
+    assert charges[STANDARD_RESIDUES.codes.index("H") + 1] < 0.1
+    with pytest.raises(ValueError):
+        ResidueTable.from_residues([{"name": "A", "code": "A"}, {"name": "A", "code": "B"}])
+    with pytest.raises(ValueError):
+        ResidueTable.from_residues([{"name": "A", "code": "A", "charge": 0.5}])
+
+
+def test_nonstandard_residues_environments() -> None:
+    env = Environment(True, True, residues=NONSTANDARD)
+    assert env.action_space.n == 22
+    with pytest.raises(ValueError):
+        Environment(residues=NONSTANDARD, held_out_motif_fraction=0.2)
+    torch_env = TorchBatchedEnvironment(4, True, True, residues=NONSTANDARD)
+    assert torch_env.n_actions == 22
+
+    n_envs = 6
+    batched_env = BatchedEnvironment(n_envs, True, True, seed=0, residues=NONSTANDARD)
+    obs = batched_env.reset()
+    envs = []
+    for i in range(n_envs):
+        env = Environment(residues=NONSTANDARD)
+        env.reset()
+        env.motif = batched_env.motifs[i, : batched_env.motif_lengths[i]].tolist()
+        env.sequence_length = int(batched_env.sequence_lengths[i])
+        np.testing.assert_array_equal(env._get_observation(), obs[i])
+        envs.append(env)
+
+    rng = np.random.default_rng(0)
+    for _ in range(25):
+        actions = rng.integers(0, NONSTANDARD.n_residues, n_envs)
+        obs, rewards, dones, infos = batched_env.step(actions)
+        for i, env in enumerate(envs):
+            if env.state and len(env.state) >= env.sequence_length:
+                continue
+            expected_obs, reward, terminated, _, _ = env.step(actions[i])
+            assert rewards[i] == reward and dones[i] == terminated
+            properties = list(env.sequence_properties().values())
+            if terminated:
+                np.testing.assert_array_equal(infos["final_observations"][i], expected_obs)
+                np.testing.assert_allclose(infos["final_property_sums"][i], properties)
+            else:
+                np.testing.assert_array_equal(obs[i], expected_obs)
+                np.testing.assert_allclose(batched_env.property_sums[i], properties)
+    assert all(len(env.state) >= env.sequence_length for env in envs)
+    sequences = np.array([env.state + [0] * (25 - len(env.state)) for env in envs])
+    charges = NONSTANDARD.sequence_properties(sequences)[:, 0]
+    np.testing.assert_array_equal(charges, [env._get_charge() for env in envs])
+
+
+@pytest.mark.parametrize("features_extractor", ["embedding", "onehot_fused"])
+def test_features_extractors_with_nonstandard_residues(features_extractor) -> None:
+    env = Environment(True, True, residues=NONSTANDARD)
+    policy_kwargs = make_policy_kwargs(features_extractor, n_residues=NONSTANDARD.n_residues)
+    model = PPO("MlpPolicy", env, n_steps=32, batch_size=32, policy_kwargs=policy_kwargs)
+    model.learn(32)
+    obs, _ = env.reset(seed=0)
+    obs[:25] = 22
+    action, _ = model.predict(obs)
+    assert 0 <= action < 22
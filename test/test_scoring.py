@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from protein_design_env.amino_acids import AminoAcids
+from protein_design_env.constants import (
+    MAX_MOTIF_LENGTH,
+    MAX_SEQUENCE_LENGTH,
+    MIN_MOTIF_LENGTH,
+    NUM_AMINO_ACIDS,
+)
+from protein_design_env.environment import Environment
+from protein_design_env.scoring import iter_score_chunks, score_sequences
+
+
+def _replay(sequence: list[int], motif: list[int], target_length: int) -> tuple[float, int, bool]:
+    """Replay a sequence through the environment and return its return, charge and motif hit."""
+    env = Environment()
+    env.reset()
+    env.motif = motif
+    env.sequence_length = target_length
+    total_reward = 0
+    for amino_acid in sequence[:target_length]:
+        _, reward, terminated, _, _ = env.step(amino_acid - 1)
+        total_reward += reward
+        if terminated:
+            break
+    motif_hit = any(
+        env.state[i : i + len(motif)] == motif for i in range(len(env.state) - len(motif) + 1)
+    )
+    return total_reward, env._get_charge(), motif_hit
+
+
+def _random_batch(n_sequences: int, seed: int = 0) -> tuple[np.ndarray, ...]:
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(0, MAX_SEQUENCE_LENGTH + 1, size=n_sequences)
+    sequences = rng.integers(1, NUM_AMINO_ACIDS + 1, size=(n_sequences, MAX_SEQUENCE_LENGTH))
+    sequences[np.arange(MAX_SEQUENCE_LENGTH) >= lengths[:, None]] = 0
+    motif_lengths = rng.integers(MIN_MOTIF_LENGTH, MAX_MOTIF_LENGTH + 1, size=n_sequences)
+    # Small alphabet for motifs so that they often occur in the sequences.
+    motifs = rng.integers(1, 4, size=(n_sequences, MAX_MOTIF_LENGTH))
+    motifs[np.arange(MAX_MOTIF_LENGTH) >= motif_lengths[:, None]] = 0
+    sequences[:, ::3] = np.where(sequences[:, ::3] > 0, rng.integers(1, 4), 0)
+    target_lengths = rng.integers(1, MAX_SEQUENCE_LENGTH + 1, size=n_sequences)
+    return sequences, motifs, target_lengths
+
+
+def test_score_sequences_matches_environment_replay() -> None:
+    sequences, motifs, target_lengths = _random_batch(300)
+
+    result = score_sequences(sequences, motifs, target_lengths, chunk_size=64)
+
+    for i, (sequence, motif) in enumerate(zip(sequences, motifs)):
+        expected_return, expected_charge, expected_hit = _replay(
+            sequence[sequence > 0].tolist(), motif[motif > 0].tolist(), int(target_lengths[i])
+        )
+        assert result.returns[i] == expected_return
+        assert result.charges[i] == expected_charge
+        assert result.motif_hits[i] == expected_hit
+
+
+def test_score_sequences_with_single_motif_and_lengths() -> None:
+    motif = [AminoAcids.ARGININE.value, AminoAcids.GLUTAMIC_ACID.value]
+    sequences = np.array(
+        [
+            [AminoAcids.ALANINE, AminoAcids.ARGININE, AminoAcids.GLUTAMIC_ACID, 7],
+            [AminoAcids.GLUTAMIC_ACID, AminoAcids.ARGININE, AminoAcids.LYSINE, 7],
+        ]
+    )
+
+    result = score_sequences(sequences, motif, target_lengths=3, lengths=[3, 3])
+
+    assert result.motif_hits.tolist() == [True, False]
+    assert result.charges.tolist() == [0, 1]
+    assert result.returns[0] == _replay(sequences[0].tolist(), motif, 3)[0]
+    assert result.returns[1] == _replay(sequences[1].tolist(), motif, 3)[0]
+
+
+def test_iter_score_chunks_streams_memory_mapped_sequences(tmp_path) -> None:
+    sequences, motifs, target_lengths = _random_batch(1000, seed=1)
+    memmap = np.lib.format.open_memmap(
+        tmp_path / "sequences.npy", mode="w+", dtype=np.int8, shape=sequences.shape
+    )
+    memmap[:] = sequences
+    # Motifs of at most 3 amino acids, padded chunk by chunk.
+    motifs[:, 3] = 0
+    motifs_memmap = np.lib.format.open_memmap(
+        tmp_path / "motifs.npy", mode="w+", dtype=np.int8, shape=(len(motifs), 3)
+    )
+    motifs_memmap[:] = motifs[:, :3]
+
+    chunks = list(iter_score_chunks(memmap, motifs_memmap, target_lengths, chunk_size=256))
+
+    assert [len(chunk.returns) for chunk in chunks] == [256, 256, 256, 232]
+    expected = score_sequences(sequences, motifs, target_lengths)
+    np.testing.assert_array_equal(np.concatenate([c.returns for c in chunks]), expected.returns)
+
+
+@pytest.mark.parametrize("invalid_amino_acid", [-1, NUM_AMINO_ACIDS + 1])
+def test_score_sequences_raises_if_amino_acid_is_invalid(invalid_amino_acid: int) -> None:
+    with pytest.raises(ValueError):
+        score_sequences([[1, invalid_amino_acid]], [1, 2], target_lengths=2, lengths=[2])
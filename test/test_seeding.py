@@ -0,0 +1,47 @@
+import numpy as np
+from learner.reproducibility import check_reproducibility
+from learner.seeding import SeedPlan
+from omegaconf import OmegaConf
+from protein_design_env.environment import Environment
+
+
+def test_seed_plan_is_deterministic_and_independent() -> None:
+    plan = SeedPlan.from_seed(0, n_envs=4, n_eval_envs=2)
+
+    assert plan == SeedPlan.from_seed(0, n_envs=4, n_eval_envs=2)
+    assert len(set(plan.env_seeds + plan.eval_seeds + [plan.torch_seed])) == 7
+    # Adding workers does not change the seeds of the existing ones.
+    assert SeedPlan.from_seed(0, n_envs=8).env_seeds[:4] == plan.env_seeds
+    assert SeedPlan.from_seed(1, n_envs=4).env_seeds != plan.env_seeds
+
+
+def test_reset_seed_reseeds_motif_and_length_generator() -> None:
+    def episodes(env: Environment, seed: int) -> list[tuple[list[int], int]]:
+        env.reset(seed=seed)
+        result = []
+        for _ in range(5):
+            result.append((list(env.motif), env.sequence_length))
+            env.reset()
+        return result
+
+    env = Environment(change_motif_at_each_episode=True, change_sequence_length_at_each_episode=True)
+    first = episodes(env, seed=3)
+
+    assert episodes(env, seed=3) == first
+    assert episodes(Environment(True, True, seed=3), seed=3) == first
+    assert episodes(env, seed=4) != first
+
+
+def test_training_is_reproducible(tmp_path, monkeypatch) -> None:
+    cfg = OmegaConf.load("config/defaults.yaml")
+    # Agents write their tensorboard logs relative to the working directory.
+    monkeypatch.chdir(tmp_path)
+    cfg.algo = "A2C"
+    cfg.timesteps = 200
+    cfg.n_envs = 2
+    cfg.variable_motif = True
+
+    curves = check_reproducibility(cfg, n_runs=2)
+
+    assert len(curves["train"]) > 0
+    assert np.all(np.isfinite(curves["eval"]))
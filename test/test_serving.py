@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+from learner.env_config import env_kwargs
+from learner.serving import (
+    BatchedDesigner,
+    DesignServer,
+    PredictDesigner,
+    http_designer,
+    load_predictor,
+    run_load,
+    sample_requests,
+    server_stats,
+)
+from protein_design_env.environment import Environment
+from protein_design_env.residues import STANDARD_RESIDUES
+from stable_baselines3 import PPO
+
+
+@pytest.fixture(scope="module")
+def model_path(tmp_path_factory) -> str:
+    env = Environment(
+        change_motif_at_each_episode=True, change_sequence_length_at_each_episode=True
+    )
+    path = str(tmp_path_factory.mktemp("model") / "model.zip")
+    PPO("MlpPolicy", env, seed=0).save(path)
+    return path
+
+
+def test_backends_design_the_same_sequences(model_path) -> None:
+    requests = sample_requests(40, seed=1)
+    predict = load_predictor("PPO", model_path)
+    model = PPO.load(model_path, device="cpu")
+    env = Environment()
+    motif, sequence_length = requests[0]
+    env.reset()
+    env.motif, env.sequence_length = motif, sequence_length
+    expected = []
+    for _ in range(sequence_length):
+        action, _ = model.predict(env._get_observation(), deterministic=True)
+        env.step(int(action))
+        expected.append(int(action) + 1)
+
+    predict_designer = PredictDesigner(predict)
+    batched_designer = BatchedDesigner(predict, max_batch_size=8, max_wait=0.01)
+    server = DesignServer(batched_designer).start()
+    try:
+        assert predict_designer(motif, sequence_length) == expected
+        designs = [predict_designer(*request) for request in requests]
+        assert [len(design) for design in designs] == [length for _, length in requests]
+        for designer in (batched_designer, http_designer(server.url)):
+            report = run_load(designer, requests, concurrency=8)
+            assert report["n_errors"] == 0 and report["n_requests"] == 40
+            assert report["latency_ms"]["p50"] <= report["latency_ms"]["p99"]
+        assert max(batched_designer.batch_sizes) > 1
+        assert [batched_designer(*request) for request in requests[:5]] == designs[:5]
+        assert server_stats(server.url)["memory"]["rss_bytes"] > 0
+        with pytest.raises(ValueError):
+            batched_designer([21], 10)
+        # Invalid requests are answered with an error.
+        report = run_load(http_designer(server.url), [([1], 100)])
+        assert report["n_errors"] == 1 and report["error_types"] == {"HTTPError": 1}
+        assert "Invalid sequence length" in report["errors"][0]["message"]
+        with pytest.raises(ValueError, match="Invalid server url"):
+            http_designer("file:///etc/hosts")
+    finally:
+        server.stop()
+        batched_designer.close()
+
+
+def test_open_loop_load_and_request_mix(model_path) -> None:
+    mix = [
+        {"motif": "RI", "sequence_length": 15, "weight": 3},
+        {"motif": "DEKW", "sequence_length": 8},
+    ]
+    requests = sample_requests(200, mix=mix, seed=0)
+    ri = STANDARD_RESIDUES.encode("RI")
+    assert requests.count((ri, 15)) > requests.count((STANDARD_RESIDUES.encode("DEKW"), 8)) > 0
+    predict = load_predictor("PPO", model_path, "numpy")
+    report = run_load(PredictDesigner(predict), requests[:20], concurrency=2, arrival_rate=500.0)
+    assert report["n_errors"] == 0 and report["arrival_rate"] == 500.0
+    assert report["amino_acids_per_second"] > report["requests_per_second"] > 0
+    assert np.isfinite(report["mean_return"])
+
+
+def test_target_motif_model_is_served(tmp_path) -> None:
+    kwargs = env_kwargs({"target_motifs": ["RI", "DEK"], "motif_reward": "count"})
+    path = str(tmp_path / "model.zip")
+    PPO("MlpPolicy", Environment(**kwargs), seed=0).save(path)
+    with pytest.raises(ValueError, match="not one of the env"):
+        load_predictor("PPO", path)
+    predict = load_predictor("PPO", path, "numpy", kwargs)
+    requests = sample_requests(10, seed=0, env_kwargs=kwargs)
+    assert {tuple(motif) for motif, _ in requests} == {(2, 10)}
+    designer = BatchedDesigner(predict, env_kwargs=kwargs)
+    try:
+        report = run_load(designer, requests + [([4, 6, 12], 10)], env_kwargs=kwargs)
+    finally:
+        designer.close()
+    assert report["n_errors"] == 1 and np.isfinite(report["mean_return"])
+    assert report["errors"] == [
+        {
+            "request": 10,
+            "type": "ValueError",
+            "message": "The motif [4, 6, 12] is not the first target motif of the env",
+        }
+    ]
@@ -0,0 +1,76 @@
+import functools
+import json
+
+import pytest
+import torch
+from learner.learner import Agent, make_protein_env
+from learner.threads import (
+    PROCESS_CPUS,
+    ThreadLayout,
+    available_cpus,
+    benchmark_layout,
+    candidate_layouts,
+    sweep_cpus,
+)
+from omegaconf import OmegaConf
+
+
+def test_layouts_split_cpus_between_learner_and_env_workers() -> None:
+    cfg = OmegaConf.load("config/defaults.yaml")
+    cfg.torch_threads = 2
+    cfg.cpu_affinity = "split"
+    layout = ThreadLayout.from_config(cfg, cpus=tuple(range(8)))
+    assert layout.learner_cpus == (0, 1) and layout.env_cpus == tuple(range(2, 8))
+    assert ThreadLayout.from_config(cfg, cpus=(0, 1)).env_cpus == (0, 1)
+    # Parallel runs of a sweep split their own CPUs.
+    cfg.cpu_list = [PROCESS_CPUS[-1]]
+    layout = ThreadLayout.from_config(cfg)
+    assert layout.cpus == layout.learner_cpus == layout.env_cpus == (PROCESS_CPUS[-1],)
+    cfg.cpu_list = [max(PROCESS_CPUS) + 1]
+    with pytest.raises(ValueError):
+        ThreadLayout.from_config(cfg)
+    cfg.cpu_list = None
+    cfg.cpu_affinity = "pinned"
+    with pytest.raises(ValueError):
+        ThreadLayout.from_config(cfg)
+
+    layouts = candidate_layouts(ThreadLayout(1, cpus=tuple(range(8))), subproc_envs=True)
+    assert [layout.torch_threads for layout in layouts] == [1, 1, 2, 2, 4, 4, 8]
+    for layout in layouts[1::2]:
+        assert len(layout.learner_cpus) == layout.torch_threads
+        assert not set(layout.learner_cpus) & set(layout.env_cpus)
+    assert len(candidate_layouts(ThreadLayout(1, cpus=tuple(range(8))), False)) == 4
+
+
+def test_agent_applies_and_records_layout(tmp_path, monkeypatch) -> None:
+    cfg = OmegaConf.load("config/defaults.yaml")
+    monkeypatch.chdir(tmp_path)
+    cfg.dir = str(tmp_path)
+    cfg.timesteps = 64
+    cfg.model_save_bool = False
+    cfg.torch_threads = 1
+    cfg.cpu_affinity = "split"
+    cfg.thread_autotune = True
+    initial_threads = torch.get_num_threads()
+    try:
+        agent = Agent(cfg)
+        assert torch.get_num_threads() == 1
+        assert available_cpus() == (agent.thread_layout.learner_cpus or PROCESS_CPUS)
+        make_env = functools.partial(make_protein_env, "Protein-Design-v0", False, True, 0)
+        assert benchmark_layout(agent.thread_layout, make_env, agent.model.policy) > 0
+        agent.train()
+        with open(tmp_path / "thread_layout.json") as f:
+            assert json.load(f)["layout"] == agent.thread_layout.manifest()
+    finally:
+        ThreadLayout(initial_threads, cpus=PROCESS_CPUS).apply()
+
+
+def test_sweep_jobs_running_at_once_get_disjoint_cpus() -> None:
+    cpus = tuple(range(8))
+    parts = [sweep_cpus(job_num, 3, cpus) for job_num in range(3)]
+    assert parts == [(0, 1, 2), (3, 4, 5), (6, 7)]
+    assert sweep_cpus(4, 3, cpus) == parts[1]
+    # With more jobs than CPUs, the jobs share them.
+    assert [sweep_cpus(job_num, 3, (0, 1)) for job_num in range(3)] == [(0,), (1,), (0,)]
+    with pytest.raises(ValueError):
+        sweep_cpus(0, 0, cpus)
@@ -0,0 +1,71 @@
+import numpy as np
+import torch
+from learner.torch_trainer import TorchPPOTrainer
+from protein_design_env.constants import MAX_MOTIF_LENGTH, NUM_AMINO_ACIDS, OBS_TARGET_LENGTH_INDEX
+from protein_design_env.environment import Environment
+from protein_design_env.torch_environment import TorchBatchedEnvironment
+
+
+def test_torch_environment_matches_environment() -> None:
+    n_envs = 16
+    rng = np.random.default_rng(0)
+    motif_lengths = rng.integers(2, MAX_MOTIF_LENGTH + 1, n_envs)
+    motifs = rng.integers(1, 4, (n_envs, MAX_MOTIF_LENGTH))
+    motifs[np.arange(MAX_MOTIF_LENGTH) >= motif_lengths[:, None]] = 0
+    sequence_lengths = rng.integers(15, 26, n_envs)
+
+    torch_env = TorchBatchedEnvironment(n_envs)
+    obs = torch_env.set_episodes(torch.as_tensor(motifs), torch.as_tensor(sequence_lengths))
+    envs = []
+    for i in range(n_envs):
+        env = Environment()
+        env.reset()
+        env.motif = motifs[i, : motif_lengths[i]].tolist()
+        env.sequence_length = int(sequence_lengths[i])
+        np.testing.assert_array_equal(obs[i].numpy(), env._get_observation())
+        envs.append(env)
+
+    for _ in range(int(sequence_lengths.min())):
+        # Small alphabet so that motifs occur.
+        actions = rng.integers(0, 3, n_envs)
+        obs, rewards, dones = torch_env.step(torch.as_tensor(actions))
+        for i, env in enumerate(envs):
+            expected_obs, reward, terminated, _, _ = env.step(actions[i])
+            assert rewards[i].item() == reward
+            assert dones[i].item() == terminated
+            if not terminated:
+                np.testing.assert_array_equal(obs[i].numpy(), expected_obs)
+
+
+def test_torch_environment_resets_terminated_episodes() -> None:
+    torch_env = TorchBatchedEnvironment(32, True, True, seed=0)
+    torch_env.reset()
+    for _ in range(25):
+        obs, _, dones = torch_env.step(torch.randint(0, NUM_AMINO_ACIDS, (32,)))
+        assert torch.all(obs[dones, 0] == 0)
+    assert torch.all(torch_env.lengths < torch_env.sequence_lengths)
+
+
+def test_torch_trainer_learns() -> None:
+    trainer = TorchPPOTrainer(TorchBatchedEnvironment(64, seed=0), n_steps=15, batch_size=240)
+
+    trainer.learn(total_timesteps=64 * 15 * 20)
+
+    first, last = trainer.episode_returns[:64], trainer.episode_returns[-64:]
+    assert trainer.num_timesteps == 64 * 15 * 20
+    assert np.mean(last) > np.mean(first)
+
+
+def test_length_bucketing_collects_complete_episodes() -> None:
+    trainer = TorchPPOTrainer(TorchBatchedEnvironment(8, True, True, seed=0), length_bucketing=True)
+
+    rollout = trainer.collect_length_bucket()
+
+    sequence_length = len(rollout.rewards)
+    assert 15 <= sequence_length <= 25
+    assert torch.all(rollout.observations[:, :, OBS_TARGET_LENGTH_INDEX] == sequence_length)
+    assert not rollout.dones[:-1].any() and rollout.dones[-1].all()
+    assert len(trainer.episode_returns) == 8
+    assert trainer.num_timesteps == 8 * sequence_length
+    trainer.learn(total_timesteps=8 * 25 * 3)
+    assert len(trainer.episode_returns) % 8 == 0